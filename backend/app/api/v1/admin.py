@@ -10,6 +10,7 @@ from app.schemas.admin import (
     AdminCreate, AdminUpdate, AdminResponse, 
     AdminDetail, AdminPasswordUpdate
 )
+from app.schemas.token import TokenPayload
 from app.schemas.base import MessageResponse, PaginationParams, PaginatedResponse
 from app.core.security import get_password_hash
 from app.config.logging import get_api_logger
@@ -23,7 +24,7 @@ def create_admin(
     *,
     db: Session = Depends(get_db),
     admin_in: AdminCreate,
-    current_admin: Admin = Depends(get_current_super_admin),
+    claims: TokenPayload = Depends(get_current_super_admin),
 ) -> Any:
     """创建管理员（超级管理员专用）"""
     # 检查用户名是否已存在
@@ -48,18 +49,10 @@ def create_admin(
 def read_admins(
     db: Session = Depends(get_db),
     pagination: PaginationParams = Depends(),
-    current_admin: Admin = Depends(get_current_super_admin),
+    claims: TokenPayload = Depends(get_current_super_admin),
 ) -> Any:
     """获取管理员列表（超级管理员专用）"""
-    admins = admin_crud.get_multi(db, skip=pagination.get_offset(), limit=pagination.size)
-    total = admin_crud.count(db)
-    
-    return PaginatedResponse.create(
-        items=admins,
-        total=total,
-        page=pagination.page,
-        size=pagination.size
-    )
+    return admin_crud.paginate(admin_crud.query_active(db), pagination)
 
 
 @router.get("/me", response_model=AdminDetail)
@@ -123,7 +116,7 @@ def read_admin(
     *,
     db: Session = Depends(get_db),
     admin_id: int,
-    current_admin: Admin = Depends(get_current_super_admin),
+    claims: TokenPayload = Depends(get_current_super_admin),
 ) -> Any:
     """获取管理员详情（超级管理员专用）"""
     admin = admin_crud.get(db, id=admin_id)
@@ -142,7 +135,7 @@ def update_admin(
     db: Session = Depends(get_db),
     admin_id: int,
     admin_in: AdminUpdate,
-    current_admin: Admin = Depends(get_current_super_admin),
+    claims: TokenPayload = Depends(get_current_super_admin),
 ) -> Any:
     """更新管理员信息（超级管理员专用）"""
     admin = admin_crud.get(db, id=admin_id)
@@ -179,7 +172,7 @@ def delete_admin(
     *,
     db: Session = Depends(get_db),
     admin_id: int,
-    current_admin: Admin = Depends(get_current_super_admin),
+    claims: TokenPayload = Depends(get_current_super_admin),
 ) -> Any:
     """删除管理员（超级管理员专用）"""
     admin = admin_crud.get(db, id=admin_id)
@@ -190,7 +183,7 @@ def delete_admin(
         )
     
     # 不能删除自己
-    if admin.id == current_admin.id:
+    if admin.id == claims.sub:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="不能删除自己"
@@ -205,7 +198,7 @@ def activate_admin(
     *,
     db: Session = Depends(get_db),
     admin_id: int,
-    current_admin: Admin = Depends(get_current_super_admin),
+    claims: TokenPayload = Depends(get_current_super_admin),
 ) -> Any:
     """激活管理员（超级管理员专用）"""
     admin = admin_crud.get(db, id=admin_id)
@@ -224,7 +217,7 @@ def deactivate_admin(
     *,
     db: Session = Depends(get_db),
     admin_id: int,
-    current_admin: Admin = Depends(get_current_super_admin),
+    claims: TokenPayload = Depends(get_current_super_admin),
 ) -> Any:
     """停用管理员（超级管理员专用）"""
     admin = admin_crud.get(db, id=admin_id)
@@ -235,7 +228,7 @@ def deactivate_admin(
         )
     
     # 不能停用自己
-    if admin.id == current_admin.id:
+    if admin.id == claims.sub:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="不能停用自己"
@@ -250,7 +243,7 @@ def search_admin_by_username(
     *,
     db: Session = Depends(get_db),
     username: str,
-    current_admin: Admin = Depends(get_current_super_admin),
+    claims: TokenPayload = Depends(get_current_super_admin),
 ) -> Any:
     """根据用户名搜索管理员（超级管理员专用）"""
     admin = admin_crud.get_by_username(db, username=username)
@@ -269,7 +262,7 @@ def reset_admin_password(
     db: Session = Depends(get_db),
     admin_id: int,
     new_password: str = Query(..., description="新密码"),
-    current_admin: Admin = Depends(get_current_super_admin),
+    claims: TokenPayload = Depends(get_current_super_admin),
 ) -> Any:
     """重置管理员密码（超级管理员专用）"""
     admin = admin_crud.get(db, id=admin_id)
@@ -283,7 +276,7 @@ def reset_admin_password(
     hashed_password = get_password_hash(new_password)
     admin_crud.update(db, db_obj=admin, obj_in={"password_hash": hashed_password})
     
-    logger.info(f"超级管理员 {current_admin.username} 重置了管理员 {admin.username} 的密码")
+    logger.info(f"超级管理员 ID={claims.sub} 重置了管理员 {admin.username} 的密码")
     
     return MessageResponse(message="密码重置成功")
 
@@ -294,7 +287,7 @@ def update_admin_permissions(
     db: Session = Depends(get_db),
     admin_id: int,
     permissions: dict,
-    current_admin: Admin = Depends(get_current_super_admin),
+    claims: TokenPayload = Depends(get_current_super_admin),
 ) -> Any:
     """更新管理员权限（超级管理员专用）"""
     admin = admin_crud.get(db, id=admin_id)
@@ -305,7 +298,7 @@ def update_admin_permissions(
         )
     
     # 不能修改超级管理员的权限（除非是自己）
-    if admin.role == AdminRole.SUPER_ADMIN and admin.id != current_admin.id:
+    if admin.role == AdminRole.SUPER_ADMIN and admin.id != claims.sub:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="不能修改其他超级管理员的权限"
@@ -313,7 +306,7 @@ def update_admin_permissions(
     
     admin = admin_crud.update(db, db_obj=admin, obj_in={"permissions": permissions})
     
-    logger.info(f"超级管理员 {current_admin.username} 更新了管理员 {admin.username} 的权限")
+    logger.info(f"超级管理员 ID={claims.sub} 更新了管理员 {admin.username} 的权限")
     
     return admin
 
@@ -324,7 +317,7 @@ def update_admin_role(
     db: Session = Depends(get_db),
     admin_id: int,
     new_role: AdminRole,
-    current_admin: Admin = Depends(get_current_super_admin),
+    claims: TokenPayload = Depends(get_current_super_admin),
 ) -> Any:
     """更新管理员角色（超级管理员专用）"""
     admin = admin_crud.get(db, id=admin_id)
@@ -335,7 +328,7 @@ def update_admin_role(
         )
     
     # 不能修改自己的角色
-    if admin.id == current_admin.id:
+    if admin.id == claims.sub:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="不能修改自己的角色"
@@ -344,11 +337,11 @@ def update_admin_role(
     # 如果要设置为超级管理员角色，需要额外检查
     if new_role == AdminRole.SUPER_ADMIN:
         # 可以在这里添加额外的安全检查
-        logger.warning(f"超级管理员 {current_admin.username} 将管理员 {admin.username} 提升为超级管理员")
+        logger.warning(f"超级管理员 ID={claims.sub} 将管理员 {admin.username} 提升为超级管理员")
     
     admin = admin_crud.update(db, db_obj=admin, obj_in={"role": new_role})
     
-    logger.info(f"超级管理员 {current_admin.username} 更新管理员 {admin.username} 的角色为 {new_role}")
+    logger.info(f"超级管理员 ID={claims.sub} 更新管理员 {admin.username} 的角色为 {new_role}")
     
     return admin
 
@@ -356,35 +349,19 @@ def update_admin_role(
 @router.get("/statistics/overview", response_model=dict)
 def get_admin_statistics(
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_super_admin),
+    claims: TokenPayload = Depends(get_current_super_admin),
 ) -> Any:
     """获取管理员统计信息（超级管理员专用）"""
-    # 统计各角色管理员数量
-    total_admins = admin_crud.count(db)
-    super_admins = len(admin_crud.get_super_admins(db))
-    active_admins = len(admin_crud.get_active_admins(db))
-    
     # 统计各状态管理员数量
-    from sqlalchemy import func
-    status_stats = db.query(
-        Admin.status,
-        func.count(Admin.id).label('count')
-    ).filter(Admin.is_deleted == False).group_by(Admin.status).all()
-    
-    status_distribution = {stat.status.value: stat.count for stat in status_stats}
+    status_distribution = admin_crud.status_counts(db)
     
     # 统计各角色管理员数量
-    role_stats = db.query(
-        Admin.role,
-        func.count(Admin.id).label('count')
-    ).filter(Admin.is_deleted == False).group_by(Admin.role).all()
-    
-    role_distribution = {stat.role.value: stat.count for stat in role_stats}
+    role_distribution = admin_crud.status_counts(db, column=Admin.role)
     
     return {
-        "total_admins": total_admins,
-        "super_admins": super_admins,
-        "active_admins": active_admins,
+        "total_admins": sum(status_distribution.values()),
+        "super_admins": role_distribution.get(AdminRole.SUPER_ADMIN.value, 0),
+        "active_admins": status_distribution.get(AdminStatus.ACTIVE.value, 0),
         "status_distribution": status_distribution,
         "role_distribution": role_distribution
     }
@@ -394,7 +371,7 @@ def get_admin_statistics(
 def get_recent_admin_activity(
     db: Session = Depends(get_db),
     limit: int = Query(10, description="返回记录数量"),
-    current_admin: Admin = Depends(get_current_super_admin),
+    claims: TokenPayload = Depends(get_current_super_admin),
 ) -> Any:
     """获取最近管理员活动（超级管理员专用）"""
     # 获取最近登录的管理员
@@ -420,7 +397,7 @@ def get_recent_admin_activity(
 @router.post("/system/check", response_model=dict)
 def system_health_check(
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_super_admin),
+    claims: TokenPayload = Depends(get_current_super_admin),
 ) -> Any:
     """系统健康检查（超级管理员专用）"""
     health_status = {
@@ -466,7 +443,7 @@ def create_emergency_super_admin(
     *,
     db: Session = Depends(get_db),
     admin_in: AdminCreate,
-    current_admin: Admin = Depends(get_current_super_admin),
+    claims: TokenPayload = Depends(get_current_super_admin),
 ) -> Any:
     """创建紧急超级管理员（超级管理员专用）"""
     # 检查用户名是否已存在
@@ -492,6 +469,6 @@ def create_emergency_super_admin(
     
     admin = admin_crud.create(db, obj_in=super_admin_create)
     
-    logger.warning(f"超级管理员 {current_admin.username} 创建了紧急超级管理员账号: {admin.username}")
+    logger.warning(f"超级管理员 ID={claims.sub} 创建了紧急超级管理员账号: {admin.username}")
     
     return admin 
\ No newline at end of file
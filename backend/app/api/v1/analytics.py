@@ -1,43 +1,50 @@
 from typing import Any, Dict
 from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 
-from app.config.database import get_db
-from app.core.deps import get_current_active_admin
+from app.config.database import get_async_db, get_db
+from app.core.deps import get_admin_claims, get_admin_claims_async
 from app.crud.user import user_crud
 from app.crud.vehicle import vehicle_crud
 from app.crud.repair_order import repair_order_crud
 from app.crud.repair_worker import repair_worker_crud
 from app.crud.admin import admin_crud
 from app.crud.analytics import analytics_crud
-from app.models.admin import Admin
+from app.core.cache import analytics_cache, principal_cache
+from app.models.admin import AdminStatus
 from app.schemas.analytics import ComprehensiveAnalyticsResponse
+from app.schemas.token import TokenPayload
 
 router = APIRouter()
 
 
 @router.get("/dashboard", response_model=Dict[str, Any])
-def get_dashboard_data(
-    db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_active_admin),
+async def get_dashboard_data(
+    db: AsyncSession = Depends(get_async_db),
+    claims: TokenPayload = Depends(get_admin_claims_async),
 ) -> Any:
     """获取仪表板数据（管理员专用）"""
+    return await analytics_cache.get_or_set_async("dashboard", None, lambda: _build_dashboard_data(db))
+
+
+async def _build_dashboard_data(db: AsyncSession) -> Dict[str, Any]:
     # 基础统计
-    total_users = user_crud.count(db)
-    total_vehicles = vehicle_crud.count(db)
-    total_orders = repair_order_crud.count(db)
-    total_workers = repair_worker_crud.count(db)
+    total_users = await user_crud.count_async(db)
+    total_vehicles = await vehicle_crud.count_async(db)
+    total_orders = await repair_order_crud.count_async(db)
+    total_workers = await repair_worker_crud.count_async(db)
     
     # 订单统计
-    order_stats = repair_order_crud.get_statistics(db)
+    order_stats = await repair_order_crud.get_statistics_async(db)
     
     # 可用工人数量
-    available_workers = len(repair_worker_crud.get_available_workers(db))
+    available_workers = await repair_worker_crud.count_available_async(db)
     
     # 本月收入
     now = datetime.now()
-    monthly_revenue = repair_order_crud.get_revenue_by_month(db, year=now.year, month=now.month)
+    monthly_revenue = await repair_order_crud.get_revenue_by_month_async(db, year=now.year, month=now.month)
     
     return {
         "basic_stats": {
@@ -56,13 +63,17 @@ def get_dashboard_data(
 @router.get("/overview", response_model=Dict[str, Any])
 def get_system_overview(
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_active_admin),
+    claims: TokenPayload = Depends(get_admin_claims),
 ) -> Any:
     """获取系统概览（管理员专用）"""
+    return analytics_cache.get_or_set("overview", None, lambda: _build_system_overview(db))
+
+
+def _build_system_overview(db: Session) -> Dict[str, Any]:
     # 用户统计
     user_stats = {
         "total_users": user_crud.count(db),
-        "active_users": len(user_crud.get_active_users(db))
+        "active_users": user_crud.count_active(db)
     }
     
     # 车辆统计
@@ -77,13 +88,13 @@ def get_system_overview(
     # 工人统计
     worker_stats = {
         "total_workers": repair_worker_crud.count(db),
-        "available_workers": len(repair_worker_crud.get_available_workers(db))
+        "available_workers": repair_worker_crud.count_available(db)
     }
     
     # 管理员统计
     admin_stats = {
         "total_admins": admin_crud.count(db),
-        "active_admins": len(admin_crud.get_active_admins(db))
+        "active_admins": admin_crud.count_by_status(db, status=AdminStatus.ACTIVE)
     }
     
     return {
@@ -100,7 +111,7 @@ def get_system_overview(
 def get_order_trends(
     db: Session = Depends(get_db),
     days: int = 30,
-    current_admin: Admin = Depends(get_current_active_admin),
+    claims: TokenPayload = Depends(get_admin_claims),
 ) -> Any:
     """获取订单趋势数据（管理员专用）"""
     # 这里应该实现按日期统计订单数量的逻辑
@@ -130,18 +141,18 @@ def get_order_trends(
 @router.get("/performance/workers", response_model=Dict[str, Any])
 def get_worker_performance(
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_active_admin),
+    claims: TokenPayload = Depends(get_admin_claims),
 ) -> Any:
     """获取工人绩效数据（管理员专用）"""
+    return analytics_cache.get_or_set("worker_performance", None, lambda: _build_worker_performance(db))
+
+
+def _build_worker_performance(db: Session) -> Dict[str, Any]:
     total_workers = repair_worker_crud.count(db)
-    available_workers = len(repair_worker_crud.get_available_workers(db))
+    available_workers = repair_worker_crud.count_available(db)
     
     # 按技能类型统计
-    from app.models.repair_worker import SkillType
-    skill_stats = {}
-    for skill_type in SkillType:
-        workers = repair_worker_crud.get_by_skill_type(db, skill_type=skill_type)
-        skill_stats[skill_type.value] = len(workers)
+    skill_stats = repair_worker_crud.get_skill_distribution(db)
     
     return {
         "worker_summary": {
@@ -159,7 +170,7 @@ def get_monthly_report(
     db: Session = Depends(get_db),
     year: int = None,
     month: int = None,
-    current_admin: Admin = Depends(get_current_active_admin),
+    claims: TokenPayload = Depends(get_admin_claims),
 ) -> Any:
     """获取月度报告（管理员专用）"""
     if not year:
@@ -196,10 +207,17 @@ def get_monthly_report(
 def get_comprehensive_analytics(
     db: Session = Depends(get_db),
     cost_period: str = Query("month", enum=["month", "quarter"]),
-    current_admin: Admin = Depends(get_current_active_admin),
+    claims: TokenPayload = Depends(get_admin_claims),
 ) -> Any:
     """获取综合数据分析报告"""
-    
+    return analytics_cache.get_or_set(
+        "comprehensive",
+        {"cost_period": cost_period},
+        lambda: _build_comprehensive_analytics(db, cost_period)
+    )
+
+
+def _build_comprehensive_analytics(db: Session, cost_period: str) -> ComprehensiveAnalyticsResponse:
     vehicle_stats = analytics_crud.get_vehicle_repair_stats(db)
     cost_trends_data = analytics_crud.get_cost_trends(db, period=cost_period)
     negative_feedback = analytics_crud.get_negative_feedback_cases(db)
@@ -215,4 +233,15 @@ def get_comprehensive_analytics(
         negative_feedback_cases=negative_feedback,
         worker_task_distribution=task_distribution,
         unfinished_order_stats=unfinished_stats,
-    ) 
\ No newline at end of file
+    )
+
+
+@router.get("/cache/stats", response_model=Dict[str, Any])
+def get_cache_stats(
+    claims: TokenPayload = Depends(get_admin_claims),
+) -> Any:
+    """获取缓存命中统计（管理员专用）"""
+    return {
+        "analytics": analytics_cache.get_stats(),
+        "principals": principal_cache.get_stats(),
+    }
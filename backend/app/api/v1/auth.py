@@ -1,6 +1,7 @@
 from datetime import timedelta
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from app.api import deps
@@ -20,7 +21,7 @@ logger = get_api_logger()
 
 @router.post("/login/user", response_model=Token)
 @log_api_call
-def login_user(
+async def login_user(
     request: Request,
     login_data: UserLoginRequest,
     db: Session = Depends(deps.get_db)
@@ -34,7 +35,7 @@ def login_user(
     logger.info(f"用户登录尝试 - 用户名: {login_data.username}, IP: {client_ip}")
     
     # 验证用户凭据
-    user = user_crud.authenticate(
+    user = await user_crud.authenticate_async(
         db, username=login_data.username, password=login_data.password
     )
     if not user:
@@ -63,8 +64,8 @@ def login_user(
     
     # 生成访问令牌
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = security.create_access_token(
-        user.id, expires_delta=access_token_expires
+    access_token = security.create_principal_token(
+        user, security.SubjectType.USER, expires_delta=access_token_expires
     )
     
     logger.info(f"用户登录成功 - 用户ID: {user.id}, 姓名: {user.name}, IP: {client_ip}")
@@ -89,7 +90,7 @@ def login_user(
 
 @router.post("/login/admin", response_model=Token)
 @log_api_call
-def login_admin(
+async def login_admin(
     request: Request,
     login_data: AdminLoginRequest,
     db: Session = Depends(deps.get_db)
@@ -103,7 +104,7 @@ def login_admin(
     logger.info(f"管理员登录尝试 - 用户名: {login_data.username}, IP: {client_ip}")
     
     # 验证管理员凭据
-    admin = admin_crud.authenticate(
+    admin = await admin_crud.authenticate_async(
         db, username=login_data.username, password=login_data.password
     )
     if not admin:
@@ -131,12 +132,12 @@ def login_admin(
         )
     
     # 更新最后登录时间
-    admin_crud.update_last_login(db, admin=admin)
+    await run_in_threadpool(admin_crud.update_last_login, db, admin=admin)
     
     # 生成访问令牌
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = security.create_access_token(
-        admin.id, expires_delta=access_token_expires    #, user_type="admin"
+    access_token = security.create_principal_token(
+        admin, security.SubjectType.ADMIN, expires_delta=access_token_expires
     )
     
     logger.info(f"管理员登录成功 - 管理员ID: {admin.id}, 用户名: {admin.username}, IP: {client_ip}")
@@ -161,7 +162,7 @@ def login_admin(
 
 @router.post("/login/worker", response_model=Token)
 @log_api_call
-def login_worker(
+async def login_worker(
     request: Request,
     login_data: WorkerLoginRequest,
     db: Session = Depends(deps.get_db)
@@ -175,7 +176,7 @@ def login_worker(
     logger.info(f"维修工人登录尝试 - 工号: {login_data.username}, IP: {client_ip}")
     
     # 验证工人凭据
-    worker = repair_worker_crud.authenticate(
+    worker = await repair_worker_crud.authenticate_async(
         db, employee_id=login_data.username, password=login_data.password
     )
     if not worker:
@@ -204,8 +205,8 @@ def login_worker(
     
     # 生成访问令牌
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = security.create_access_token(
-        worker.id, expires_delta=access_token_expires#, user_type="worker"
+    access_token = security.create_principal_token(
+        worker, security.SubjectType.WORKER, expires_delta=access_token_expires
     )
     
     logger.info(f"维修工人登录成功 - 工人ID: {worker.id}, 姓名: {worker.name}, IP: {client_ip}")
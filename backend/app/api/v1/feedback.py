@@ -139,27 +139,12 @@ def read_all_feedback_admin(
 ) -> Any:
     """获取所有反馈（管理员专用）"""
     if status_filter:
-        feedback_list = feedback_crud.get_by_status(
-            db, status=status_filter, skip=pagination.get_offset(), limit=pagination.size
-        )
-        total = len(feedback_crud.get_by_status(db, status=status_filter, skip=0, limit=10000))
+        query = feedback_crud.query_by_status(db, status=status_filter)
     elif feedback_type:
-        feedback_list = feedback_crud.get_by_type(
-            db, feedback_type=feedback_type, skip=pagination.get_offset(), limit=pagination.size
-        )
-        total = len(feedback_crud.get_by_type(db, feedback_type=feedback_type, skip=0, limit=10000))
+        query = feedback_crud.query_by_type(db, feedback_type=feedback_type)
     else:
-        feedback_list = feedback_crud.get_multi(
-            db, skip=pagination.get_offset(), limit=pagination.size
-        )
-        total = feedback_crud.count(db)
-    
-    return PaginatedResponse.create(
-        items=feedback_list,
-        total=total,
-        page=pagination.page,
-        size=pagination.size
-    )
+        query = feedback_crud.query_active(db)
+    return feedback_crud.paginate(query, pagination)
 
 
 @router.get("/admin/pending", response_model=List[FeedbackResponse])
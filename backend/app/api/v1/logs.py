@@ -1,6 +1,9 @@
 from typing import Any, List, Optional
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import FileResponse, StreamingResponse
+import asyncio
+import re
 from sqlalchemy.orm import Session
 import os
 import json
@@ -9,44 +12,43 @@ from pathlib import Path
 from app.api import deps
 from app.schemas.user import User
 from app.schemas.admin import Admin
-from app.config.logging import get_api_logger
+from app.config.logging import get_active_log_files, get_api_logger, get_logging_stats, log_compressor
 from app.config import settings
+from app.core import log_reader
+from app.core.log_index import log_indexer
+from app.core.log_stream import log_stream_hub
 
 router = APIRouter()
 logger = get_api_logger()
 
-def get_log_files() -> List[str]:
-    """获取所有日志文件列表"""
+# 日志文件名：当前文件 xxx.log、轮转文件 xxx.log.N、压缩的轮转文件 xxx.log.N.gz
+LOG_FILE_PATTERN = re.compile(r"^[\w.-]+\.log(\.\d+)?(\.gz)?$")
+
+def get_log_dir_files() -> List[Path]:
+    """日志目录中的日志文件，包括轮转文件 xxx.log.N 和压缩的轮转文件 xxx.log.N.gz"""
     log_dir = Path("logs")
     if not log_dir.exists():
         return []
-    
-    log_files = []
-    for file in log_dir.glob("*.log"):
-        log_files.append(file.name)
-    
-    return sorted(log_files, reverse=True)
+    return [file for file in log_dir.iterdir() if LOG_FILE_PATTERN.match(file.name) and file.is_file()]
+
+def get_log_files() -> List[str]:
+    """获取所有日志文件列表（含轮转文件）"""
+    return sorted((file.name for file in get_log_dir_files()), reverse=True)
 
 def read_log_file(filename: str, lines: int = 100, search: Optional[str] = None) -> List[str]:
-    """读取日志文件内容"""
+    """
+    读取日志文件最后 lines 行（有搜索关键词时为最后 lines 条匹配行），从文件末尾向前读取；
+    压缩的轮转文件（.gz）解压读取
+    """
     log_file = Path("logs") / filename
-    if not log_file.exists():
+    if not log_file.is_file():
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="日志文件不存在"
         )
     
     try:
-        with open(log_file, 'r', encoding='utf-8') as f:
-            all_lines = f.readlines()
-        
-        # 如果有搜索关键词，过滤行
-        if search:
-            filtered_lines = [line for line in all_lines if search.lower() in line.lower()]
-            return filtered_lines[-lines:] if len(filtered_lines) > lines else filtered_lines
-        
-        # 返回最后N行
-        return all_lines[-lines:] if len(all_lines) > lines else all_lines
+        return log_reader.read_lines(log_file, lines, search)
     
     except Exception as e:
         logger.error(f"读取日志文件失败: {filename}, 错误: {str(e)}")
@@ -218,12 +220,122 @@ def get_database_logs(
             detail="获取数据库日志失败"
         )
 
+def _sse(event: Optional[str], data: str) -> str:
+    """一条 SSE 事件；数据中的换行拆成多个 data 字段"""
+    head = f"event: {event}\n" if event else ""
+    return head + "".join(f"data: {line}\n" for line in data.split("\n")) + "\n"
+
+@router.get("/stream/{filename}")
+async def stream_log(
+    filename: str,
+    search: Optional[str] = Query(None, description="只推送包含关键词的行"),
+    backlog: int = Query(0, ge=0, le=1000, description="先推送最近的行数"),
+    current_admin: Admin = Depends(deps.get_current_admin)
+) -> Any:
+    """
+    实时推送日志文件新写入的行（Server-Sent Events，仅管理员）
+    每行一个 message 事件；轮转时发送 rotate 事件，客户端读得慢丢弃行时发送 dropped 事件（数据为丢弃行数）。
+    浏览器 EventSource 不能携带 Authorization 头，需使用 fetch 读取响应流
+    """
+    logger.info(f"管理员订阅日志推送 - 管理员ID: {current_admin.id}, 文件: {filename}")
+
+    # 只有当前写入的日志文件（xxx.log）有新内容可推送，轮转文件不能订阅
+    if not filename.endswith(".log") or filename not in get_log_files():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="日志文件不存在"
+        )
+    subscription, recent = await log_stream_hub.subscribe(filename, search, backlog)
+    if subscription is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="日志推送连接数已达上限"
+        )
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            for line in recent:
+                yield _sse(None, line)
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(subscription.queue.get(), log_stream_hub.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    # 注释行保持连接，代理不会因空闲断开
+                    yield ": keepalive\n\n"
+                    continue
+                if subscription.dropped:
+                    yield _sse("dropped", str(subscription.dropped))
+                    subscription.dropped = 0
+                if event == "lines":
+                    yield "".join(_sse(None, line) for line in data)
+                else:
+                    yield _sse(event, data)
+        finally:
+            log_stream_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/query")
+def query_logs(
+    log: str = Query("access.log", description="日志文件（含其轮转文件）"),
+    start: Optional[datetime] = Query(None, description="开始时间"),
+    end: Optional[datetime] = Query(None, description="结束时间"),
+    request_id: Optional[str] = Query(None, description="请求ID"),
+    ip: Optional[str] = Query(None, description="客户端IP"),
+    status_code: Optional[int] = Query(None, ge=100, le=599, description="响应状态码"),
+    path: Optional[str] = Query(None, description="请求路径前缀"),
+    level: Optional[str] = Query(None, description="日志级别"),
+    limit: int = Query(100, ge=1, le=1000, description="返回条数"),
+    current_admin: Admin = Depends(deps.get_current_admin)
+) -> Any:
+    """
+    按字段检索日志（仅管理员）
+    使用磁盘索引，覆盖当前文件和 .1-.N 轮转文件，返回满足条件的最新 limit 条记录
+    """
+    logger.info(f"管理员检索日志 - 管理员ID: {current_admin.id}, 文件: {log}")
+
+    index = log_indexer.get(log)
+    if index is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="该日志文件未建立索引"
+        )
+    if start and end and start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="开始时间不能晚于结束时间"
+        )
+
+    try:
+        return index.query(
+            start=start,
+            end=end,
+            request_id=request_id,
+            ip=ip,
+            status=status_code,
+            path=path,
+            level=level,
+            limit=limit,
+        )
+    except Exception as e:
+        logger.error(f"检索日志失败: {log}, 错误: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="检索日志失败"
+        )
+
 @router.get("/stats")
 def get_log_statistics(
     current_admin: Admin = Depends(deps.get_current_admin)
 ) -> Any:
     """
     获取日志统计信息（仅管理员）
+    包含轮转文件；size 为磁盘占用，raw_size 为内容大小（.gz 文件解压后的大小）
     """
     logger.info(f"管理员查看日志统计 - 管理员ID: {current_admin.id}")
     
@@ -238,16 +350,25 @@ def get_log_statistics(
         
         files_info = []
         total_size = 0
+        total_raw_size = 0
         
-        for file in log_dir.glob("*.log"):
+        for file in get_log_dir_files():
             file_stat = file.stat()
             file_size = file_stat.st_size
+            try:
+                raw_size = log_reader.raw_size(file)
+            except OSError:
+                raw_size = file_size
             total_size += file_size
+            total_raw_size += raw_size
             
             files_info.append({
                 "name": file.name,
                 "size": file_size,
                 "size_mb": round(file_size / (1024 * 1024), 2),
+                "raw_size": raw_size,
+                "raw_size_mb": round(raw_size / (1024 * 1024), 2),
+                "compressed": file.name.endswith(".gz"),
                 "modified": datetime.fromtimestamp(file_stat.st_mtime).isoformat(),
                 "created": datetime.fromtimestamp(file_stat.st_ctime).isoformat()
             })
@@ -256,7 +377,14 @@ def get_log_statistics(
             "total_files": len(files_info),
             "total_size": total_size,
             "total_size_mb": round(total_size / (1024 * 1024), 2),
-            "files": sorted(files_info, key=lambda x: x["modified"], reverse=True)
+            "total_raw_size": total_raw_size,
+            "total_raw_size_mb": round(total_raw_size / (1024 * 1024), 2),
+            "compression_ratio": round(total_size / total_raw_size, 3) if total_raw_size else 1.0,
+            "files": sorted(files_info, key=lambda x: x["modified"], reverse=True),
+            # 日志队列指标（含丢弃的记录数）
+            "queue": get_logging_stats(),
+            # 轮转文件后台压缩
+            "compression": log_compressor.get_stats()
         }
     
     except Exception as e:
@@ -273,6 +401,8 @@ def clean_old_logs(
 ) -> Any:
     """
     清理旧日志文件（仅管理员）
+    删除修改时间早于保留天数的轮转文件（含 .gz）和不再写入的日志文件；
+    正在写入的日志文件不删除（删除后处理器会继续写入已删除的文件，日志丢失）
     """
     logger.info(f"管理员清理旧日志 - 管理员ID: {current_admin.id}, 保留天数: {days}")
     
@@ -285,9 +415,13 @@ def clean_old_logs(
             }
         
         cutoff_date = datetime.now() - timedelta(days=days)
+        active_files = get_active_log_files()
         deleted_files = []
+        freed_size = 0
         
-        for file in log_dir.glob("*.log"):
+        for file in get_log_dir_files():
+            if file.resolve() in active_files:
+                continue
             file_stat = file.stat()
             file_modified = datetime.fromtimestamp(file_stat.st_mtime)
             
@@ -295,6 +429,7 @@ def clean_old_logs(
                 try:
                     file.unlink()
                     deleted_files.append(file.name)
+                    freed_size += file_stat.st_size
                     logger.info(f"删除旧日志文件: {file.name}")
                 except Exception as e:
                     logger.error(f"删除日志文件失败: {file.name}, 错误: {str(e)}")
@@ -302,6 +437,7 @@ def clean_old_logs(
         return {
             "message": f"成功清理 {len(deleted_files)} 个旧日志文件",
             "deleted_files": deleted_files,
+            "freed_size": freed_size,
             "cutoff_date": cutoff_date.isoformat()
         }
     
@@ -312,27 +448,30 @@ def clean_old_logs(
             detail="清理旧日志失败"
         )
 
-@router.get("/download/{filename}")
+class LogFileResponse(FileResponse):
+    # 每次从文件读取 1 MB（默认 64 KB），大文件下载时线程切换少
+    chunk_size = 1024 * 1024
+
+@router.api_route("/download/{filename}", methods=["GET", "HEAD"])
 def download_log_file(
     filename: str,
     current_admin: Admin = Depends(deps.get_current_admin)
 ) -> Any:
     """
     下载日志文件（仅管理员）
+    包括轮转文件和压缩的轮转文件（.gz 原样发送，不解压）；支持 Range 请求，可断点续传或分段并行下载
     """
     logger.info(f"管理员下载日志文件 - 管理员ID: {current_admin.id}, 文件: {filename}")
     
     log_file = Path("logs") / filename
-    if not log_file.exists():
+    if not LOG_FILE_PATTERN.match(filename) or not log_file.is_file():
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="日志文件不存在"
         )
     
-    from fastapi.responses import FileResponse
-    
-    return FileResponse(
+    return LogFileResponse(
         path=str(log_file),
         filename=filename,
-        media_type='text/plain'
-    ) 
\ No newline at end of file
+        media_type="application/gzip" if filename.endswith(".gz") else "text/plain"
+    )
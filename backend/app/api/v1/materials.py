@@ -34,9 +34,7 @@ def read_materials(
     """
     获取材料列表 (分页)
     """
-    materials = material_crud.get_multi(db, skip=pagination.get_offset(), limit=pagination.size)
-    total = material_crud.count(db)
-    return PaginatedResponse.create(items=materials, total=total, page=pagination.page, size=pagination.size)
+    return material_crud.paginate(material_crud.query_active(db), pagination)
 
 
 @router.get("/{material_id}", response_model=MaterialResponse, dependencies=[Depends(get_current_active_admin)])
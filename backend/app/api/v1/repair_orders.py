@@ -1,9 +1,13 @@
 from typing import Any, List
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.config.database import get_db
-from app.core.deps import get_current_active_user, get_current_active_admin, get_current_active_worker
+from app.config.database import get_async_db, get_db
+from app.core.deps import (
+    get_current_active_user, get_current_active_admin, get_current_active_worker,
+    get_current_user_async, get_current_admin_async, get_current_worker_async,
+)
 from app.crud.repair_order import repair_order_crud
 from app.crud.user import user_crud
 from app.crud.repair_worker import repair_worker_crud
@@ -36,73 +40,45 @@ def create_repair_order(
 
 
 @router.get("/my-orders", response_model=PaginatedResponse[RepairOrderDetail])
-def read_my_repair_orders(
-    db: Session = Depends(get_db),
+async def read_my_repair_orders(
+    db: AsyncSession = Depends(get_async_db),
     pagination: PaginationParams = Depends(),
-    current_user: User = Depends(get_current_active_user),
+    current_user: User = Depends(get_current_user_async),
 ) -> Any:
     """获取当前用户的维修订单"""
-    orders = repair_order_crud.get_by_user_with_details(
-        db, user_id=current_user.id, skip=pagination.get_offset(), limit=pagination.size
-    )
-    
-    # 计算总数
-    total = len(repair_order_crud.get_by_user(db, user_id=current_user.id, skip=0, limit=10000))
-    
-    return PaginatedResponse.create(
-        items=orders,
-        total=total,
-        page=pagination.page,
-        size=pagination.size
-    )
+    statement = repair_order_crud.select_by_user_with_details(user_id=current_user.id)
+    return await repair_order_crud.paginate_async(db, statement, pagination)
 
 
 @router.get("/worker-orders", response_model=PaginatedResponse[RepairOrderDetail])
-def read_worker_orders(
-    db: Session = Depends(get_db),
+async def read_worker_orders(
+    db: AsyncSession = Depends(get_async_db),
     pagination: PaginationParams = Depends(),
-    current_worker: RepairWorker = Depends(get_current_active_worker),
+    current_worker: RepairWorker = Depends(get_current_worker_async),
 ) -> Any:
     """获取维修工人的订单（通过关联表）"""
-    orders, total = repair_order_crud.get_by_worker_with_details(
-        db, worker_id=current_worker.id, skip=pagination.get_offset(), limit=pagination.size
-    )
-    
-    return PaginatedResponse.create(
-        items=orders,
-        total=total,
-        page=pagination.page,
-        size=pagination.size
-    )
+    statement = repair_order_crud.select_by_worker_with_details(worker_id=current_worker.id)
+    return await repair_order_crud.paginate_async(db, statement, pagination)
 
 
 @router.get("/available", response_model=PaginatedResponse[RepairOrderDetail])
-def read_available_orders(
-    db: Session = Depends(get_db),
+async def read_available_orders(
+    db: AsyncSession = Depends(get_async_db),
     pagination: PaginationParams = Depends(),
-    current_worker: RepairWorker = Depends(get_current_active_worker),
+    current_worker: RepairWorker = Depends(get_current_worker_async),
 ) -> Any:
     """获取可接取的订单列表（状态为待处理）"""
-    orders = repair_order_crud.get_by_status_with_details(
-        db, status=OrderStatus.PENDING, skip=pagination.get_offset(), limit=pagination.size
-    )
-    total = repair_order_crud.count_by_status(db, status=OrderStatus.PENDING)
-
-    return PaginatedResponse.create(
-        items=orders,
-        total=total,
-        page=pagination.page,
-        size=pagination.size,
-    )
+    statement = repair_order_crud.select_with_details(status=OrderStatus.PENDING)
+    return await repair_order_crud.paginate_async(db, statement, pagination)
 
 
 @router.get("/statistics/overview", response_model=dict)
-def get_order_statistics(
-    db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_active_admin),
+async def get_order_statistics(
+    db: AsyncSession = Depends(get_async_db),
+    current_admin: Admin = Depends(get_current_admin_async),
 ) -> Any:
     """获取订单统计信息（管理员专用）"""
-    stats = repair_order_crud.get_statistics(db)
+    stats = await repair_order_crud.get_statistics_async(db)
     return stats
 
 
@@ -253,28 +229,15 @@ def reject_repair_order(
 
 # 管理员专用接口
 @router.get("/", response_model=PaginatedResponse[RepairOrderDetail])
-def read_repair_orders(
-    db: Session = Depends(get_db),
+async def read_repair_orders(
+    db: AsyncSession = Depends(get_async_db),
     pagination: PaginationParams = Depends(),
     status: OrderStatus = None,
-    current_admin: Admin = Depends(get_current_active_admin),
+    current_admin: Admin = Depends(get_current_admin_async),
 ) -> Any:
     """获取维修订单列表（管理员专用）"""
-    if status:
-        orders = repair_order_crud.get_by_status_with_details(
-            db, status=status, skip=pagination.get_offset(), limit=pagination.size
-        )
-        total = len(repair_order_crud.get_by_status(db, status=status, skip=0, limit=10000))
-    else:
-        orders = repair_order_crud.get_multi_with_details(db, skip=pagination.get_offset(), limit=pagination.size)
-        total = repair_order_crud.count(db)
-    
-    return PaginatedResponse.create(
-        items=orders,
-        total=total,
-        page=pagination.page,
-        size=pagination.size
-    )
+    statement = repair_order_crud.select_with_details(status=status)
+    return await repair_order_crud.paginate_async(db, statement, pagination)
 
 
 @router.get("/admin/{order_id}", response_model=RepairOrderDetail)
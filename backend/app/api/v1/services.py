@@ -32,9 +32,7 @@ def read_services(
     """
     获取服务项目列表 (分页, 管理员)
     """
-    services = service_crud.get_multi(db, skip=pagination.get_offset(), limit=pagination.size)
-    total = service_crud.count(db)
-    return PaginatedResponse.create(items=services, total=total, page=pagination.page, size=pagination.size)
+    return service_crud.paginate(service_crud.query_active(db), pagination)
 
 
 @router.get("/{service_id}", response_model=ServiceResponse, dependencies=[Depends(get_current_active_admin)])
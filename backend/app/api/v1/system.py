@@ -4,11 +4,14 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 from pydantic import BaseModel, computed_field
 
-from app.config.database import get_db
+from app.config.database import get_db, get_pool_stats
 from app.core.deps import get_current_active_admin, get_current_super_admin
 from app.crud.admin import admin_crud
+from app.core.password_pool import password_pool
+from app.core.rate_limit import rate_limiter
 from app.models.admin import Admin, AdminStatus, AdminRole
 from app.schemas.admin import AdminResponse, AdminCreate
+from app.schemas.token import TokenPayload
 from app.schemas.base import PaginatedResponse, PaginationParams, MessageResponse
 from app.config.logging import get_api_logger
 import platform
@@ -75,6 +78,7 @@ def get_system_admins(
     keyword: Optional[str] = Query(None, description="搜索关键词"),
     page: int = Query(1, ge=1, description="页码"),
     size: int = Query(20, ge=1, le=100, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="游标（上一页返回的 next_cursor），传入时忽略页码"),
     current_admin: Admin = Depends(get_current_active_admin),
 ) -> Any:
     """获取管理员列表（带搜索功能）"""
@@ -85,11 +89,8 @@ def get_system_admins(
     else:
         logger.info(f"超级管理员查看管理员列表: {current_admin.username}")
     
-    # 计算分页偏移量
-    skip = (page - 1) * size
-    
     # 构建查询
-    query = db.query(Admin).filter(Admin.is_deleted == False)
+    query = admin_crud.query_active(db)
     
     # 如果有搜索关键词，进行模糊搜索
     if keyword and keyword.strip():
@@ -102,21 +103,13 @@ def get_system_admins(
             )
         )
     
-    # 获取总数
-    total = query.count()
-    
-    # 分页查询
-    admins = query.order_by(Admin.id).offset(skip).limit(size).all()
+    # 分页查询（COUNT + 当前页）
+    result = admin_crud.paginate(query.order_by(Admin.id), PaginationParams(page=page, size=size, cursor=cursor))
     
     # 转换为响应模型
-    admin_responses = [convert_admin_to_response(admin) for admin in admins]
+    result.items = [convert_admin_to_response(admin) for admin in result.items]
     
-    return PaginatedResponse.create(
-        items=admin_responses,
-        total=total,
-        page=page,
-        size=size
-    )
+    return result
 
 
 @router.post("/admins", response_model=SystemAdminResponse)
@@ -124,10 +117,10 @@ def create_system_admin(
     *,
     db: Session = Depends(get_db),
     admin_data: dict,
-    current_admin: Admin = Depends(get_current_super_admin),
+    claims: TokenPayload = Depends(get_current_super_admin),
 ) -> Any:
     """创建管理员（超级管理员专用）"""
-    logger.info(f"超级管理员创建新管理员: {current_admin.username} -> {admin_data.get('username')}")
+    logger.info(f"超级管理员创建新管理员: ID={claims.sub} -> {admin_data.get('username')}")
     
     # 处理前端数据格式
     username = admin_data.get("username")
@@ -198,10 +191,10 @@ def update_system_admin(
     db: Session = Depends(get_db),
     admin_id: int,
     admin_in: dict,
-    current_admin: Admin = Depends(get_current_super_admin),
+    claims: TokenPayload = Depends(get_current_super_admin),
 ) -> Any:
     """更新管理员信息（超级管理员专用）"""
-    logger.info(f"超级管理员更新管理员: {current_admin.username} -> {admin_id}")
+    logger.info(f"超级管理员更新管理员: ID={claims.sub} -> {admin_id}")
     
     admin = admin_crud.get(db, id=admin_id)
     if not admin:
@@ -245,10 +238,10 @@ def delete_system_admin(
     *,
     db: Session = Depends(get_db),
     admin_id: int,
-    current_admin: Admin = Depends(get_current_super_admin),
+    claims: TokenPayload = Depends(get_current_super_admin),
 ) -> Any:
     """删除管理员（超级管理员专用）"""
-    logger.info(f"超级管理员删除管理员: {current_admin.username} -> {admin_id}")
+    logger.info(f"超级管理员删除管理员: ID={claims.sub} -> {admin_id}")
     
     admin = admin_crud.get(db, id=admin_id)
     if not admin:
@@ -258,7 +251,7 @@ def delete_system_admin(
         )
     
     # 不能删除自己
-    if admin.id == current_admin.id:
+    if admin.id == claims.sub:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="不能删除自己"
@@ -276,10 +269,10 @@ def toggle_admin_status(
     *,
     db: Session = Depends(get_db),
     admin_id: int,
-    current_admin: Admin = Depends(get_current_super_admin),
+    claims: TokenPayload = Depends(get_current_super_admin),
 ) -> Any:
     """切换管理员状态（激活/停用）（超级管理员专用）"""
-    logger.info(f"超级管理员切换管理员状态: {current_admin.username} -> {admin_id}")
+    logger.info(f"超级管理员切换管理员状态: ID={claims.sub} -> {admin_id}")
     
     admin = admin_crud.get(db, id=admin_id)
     if not admin:
@@ -289,7 +282,7 @@ def toggle_admin_status(
         )
     
     # 不能停用自己
-    if admin.id == current_admin.id:
+    if admin.id == claims.sub:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="不能停用自己"
@@ -349,6 +342,8 @@ def get_system_info(
 ) -> Any:
     """获取系统信息"""
     logger.info(f"管理员获取系统信息: {current_admin.username}")
+    # 连接池状态不依赖 psutil，两种返回都带上
+    database_pool = get_pool_stats()
     
     try:
         # 获取系统基本信息
@@ -373,6 +368,7 @@ def get_system_info(
                 "processor": platform.processor()
             },
             "database_version": "PostgreSQL 13.8",
+            "database_pool": database_pool,
             "performance": {
                 "cpu_usage": round(cpu_percent, 2),
                 "memory_usage": round(memory.percent, 2),
@@ -402,6 +398,7 @@ def get_system_info(
                 "processor": "未知"
             },
             "database_version": "PostgreSQL 13.8",
+            "database_pool": database_pool,
             "performance": {
                 "cpu_usage": 0,
                 "memory_usage": 0,
@@ -416,13 +413,29 @@ def get_system_info(
         }
 
 
+@router.get("/password-pool")
+def get_password_pool_stats(
+    current_admin: Admin = Depends(get_current_active_admin),
+) -> Any:
+    """获取密码哈希/校验线程池的运行指标"""
+    return password_pool.get_stats()
+
+
+@router.get("/rate-limit")
+def get_rate_limit_stats(
+    current_admin: Admin = Depends(get_current_active_admin),
+) -> Any:
+    """获取速率限制策略和计数指标"""
+    return rate_limiter.get_stats()
+
+
 @router.put("/config")
 def update_system_config(
     config_data: dict,
-    current_admin: Admin = Depends(get_current_super_admin),
+    claims: TokenPayload = Depends(get_current_super_admin),
 ) -> Any:
     """更新系统配置（仅超级管理员）"""
-    logger.info(f"超级管理员更新系统配置: {current_admin.username}")
+    logger.info(f"超级管理员更新系统配置: ID={claims.sub}")
     
     # 这里可以实现配置的持久化存储
     # 目前返回成功响应
@@ -110,17 +110,7 @@ def read_users(
     current_admin: Admin = Depends(get_current_active_admin),
 ) -> Any:
     """获取用户列表（管理员专用）"""
-    users = user_crud.get_multi(
-        db, skip=pagination.get_offset(), limit=pagination.size
-    )
-    total = user_crud.count(db)
-    
-    return PaginatedResponse.create(
-        items=users,
-        total=total,
-        page=pagination.page,
-        size=pagination.size
-    )
+    return user_crud.paginate(user_crud.query_active(db), pagination)
 
 
 @router.get("/{user_id}", response_model=UserResponse)
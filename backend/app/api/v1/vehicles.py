@@ -140,15 +140,7 @@ def read_vehicles(
     current_admin: Admin = Depends(get_current_active_admin),
 ) -> Any:
     """获取车辆列表（管理员专用）"""
-    vehicles = vehicle_crud.get_multi(db, skip=pagination.get_offset(), limit=pagination.size)
-    total = vehicle_crud.count(db)
-    
-    return PaginatedResponse.create(
-        items=vehicles,
-        total=total,
-        page=pagination.page,
-        size=pagination.size
-    )
+    return vehicle_crud.paginate(vehicle_crud.query_with_owner(db), pagination)
 
 
 @router.get("/admin/{vehicle_id}", response_model=VehicleDetail)
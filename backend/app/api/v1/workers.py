@@ -47,20 +47,10 @@ def read_repair_workers(
 ) -> Any:
     """获取维修工人列表（管理员专用）"""
     if skill_type:
-        workers = repair_worker_crud.get_by_skill_type(
-            db, skill_type=skill_type, skip=pagination.get_offset(), limit=pagination.size
-        )
-        total = len(repair_worker_crud.get_by_skill_type(db, skill_type=skill_type, skip=0, limit=10000))
+        query = repair_worker_crud.query_by_skill_type(db, skill_type=skill_type)
     else:
-        workers = repair_worker_crud.get_multi(db, skip=pagination.get_offset(), limit=pagination.size)
-        total = repair_worker_crud.count(db)
-    
-    return PaginatedResponse.create(
-        items=workers,
-        total=total,
-        page=pagination.page,
-        size=pagination.size
-    )
+        query = repair_worker_crud.query_active(db)
+    return repair_worker_crud.paginate(query, pagination)
 
 
 @router.get("/available", response_model=List[RepairWorkerResponse])
@@ -165,13 +155,10 @@ def get_worker_statistics(
 ) -> Any:
     """获取维修工人自己的统计信息"""
     total_workers = repair_worker_crud.count(db)
-    available_workers = len(repair_worker_crud.get_available_workers(db))
+    available_workers = repair_worker_crud.count_available(db)
     
     # 按技能类型统计
-    skill_stats = {}
-    for skill_type in SkillType:
-        workers = repair_worker_crud.get_by_skill_type(db, skill_type=skill_type)
-        skill_stats[skill_type.value] = len(workers)
+    skill_stats = repair_worker_crud.get_skill_distribution(db)
     
     return {
         "total_workers": total_workers,
@@ -1,21 +1,164 @@
+import threading
+import time
+from typing import Any, AsyncGenerator, Dict, Optional
+
 from sqlalchemy import create_engine, event
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
 
 from app.config.settings import settings
+from app.config.logging import get_database_logger
+from app.core import query_profiler
+from app.core.metrics import COUNTER, GAUGE, MetricFamily, metrics
+
+logger = get_database_logger()
+
+db_pool_checkout_seconds = metrics.histogram(
+    "db_pool_checkout_seconds", "从连接池取得连接的耗时（秒，含等待空闲连接和新建连接）", ("engine",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0),
+)
+db_pool_checkout_timeouts_total = metrics.counter(
+    "db_pool_checkout_timeouts_total", "等待连接超时（QueuePool limit）的次数", ("engine",),
+)
+
+
+class PoolStats:
+    """连接池运行统计：取连接耗时、超时、新建/失效连接数、借出连接数和溢出连接数的峰值"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.total_checkout_seconds = 0.0
+        self.max_checkout_seconds = 0.0
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+
+    def record_checkout(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.total_checkout_seconds += seconds
+            self.max_checkout_seconds = max(self.max_checkout_seconds, seconds)
+
+    def record_in_use(self, checked_out: int, overflow: int) -> None:
+        with self._lock:
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+            self.peak_overflow = max(self.peak_overflow, overflow)
+
+
+# 同步、异步引擎的连接池各自统计，指标以 engine 标签区分
+pool_stats: Dict[str, PoolStats] = {"sync": PoolStats(), "async": PoolStats()}
+
+
+class MonitoredQueuePool(QueuePool):
+    """记录取连接耗时和超时次数的连接池"""
+
+    engine_label = "sync"
+
+    def _do_get(self):
+        label = self.engine_label
+        stats = pool_stats[label]
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except sa_exc.TimeoutError:
+            db_pool_checkout_timeouts_total.inc((label,))
+            with stats._lock:
+                stats.timeouts += 1
+            logger.warning(
+                f"等待数据库连接超时（{label}）: {self.status()}, 峰值借出 {stats.peak_checked_out}, "
+                f"峰值溢出 {stats.peak_overflow}"
+            )
+            raise
+        elapsed = time.perf_counter() - started
+        db_pool_checkout_seconds.observe((label,), elapsed)
+        stats.record_checkout(elapsed)
+        return connection
+
+
+class MonitoredAsyncQueuePool(MonitoredQueuePool, AsyncAdaptedQueuePool):
+    """异步引擎使用的连接池，取连接耗时和超时计入 engine="async" 的统计"""
+
+    engine_label = "async"
+
+
+# 同步驱动 -> 异步驱动
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url() -> Optional[str]:
+    """异步引擎的连接地址：优先使用 ASYNC_DATABASE_URL，否则把 DATABASE_URL 的驱动换成对应的异步驱动"""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    url = make_url(settings.DATABASE_URL)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        return None
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def pool_options(engines: int = 1) -> Dict[str, Any]:
+    """
+    连接池参数。配置了 DB_MAX_CONNECTIONS（所有进程共用的连接上限，通常为数据库 max_connections 留给本服务的部分）时，
+    按 WEB_CONCURRENCY 个 uvicorn 进程平分，进程内再由 engines 个引擎（同步、异步）平分，
+    每个连接池的 pool_size + max_overflow 不超过自己的份额
+    """
+    pool_size = settings.DB_POOL_SIZE
+    max_overflow = settings.DB_MAX_OVERFLOW
+    if settings.DB_MAX_CONNECTIONS:
+        per_worker = max(1, settings.DB_MAX_CONNECTIONS // max(1, settings.WEB_CONCURRENCY) // engines)
+        pool_size = min(pool_size, per_worker)
+        max_overflow = min(max_overflow, per_worker - pool_size)
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
 
 # 创建数据库引擎
+ASYNC_DATABASE_URL = async_database_url() if settings.ASYNC_DATABASE_ENABLED else None
+engine_pool_options = pool_options(engines=2 if ASYNC_DATABASE_URL else 1)
 engine = create_engine(
     settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
-    echo=True,  # 开发环境显示SQL，生产环境应关闭
+    poolclass=MonitoredQueuePool,
+    echo=settings.DATABASE_ECHO,  # 通过环境变量 DATABASE_ECHO 打开
+    **engine_pool_options,
 )
 
+# 异步引擎：async def 接口使用，等待数据库时不占用线程池中的线程
+async_engine: Optional[AsyncEngine] = None
+if ASYNC_DATABASE_URL:
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        poolclass=MonitoredAsyncQueuePool,
+        echo=settings.DATABASE_ECHO,
+        **engine_pool_options,
+    )
+
+# 按请求统计查询数和数据库耗时（异步引擎的事件在其内部的同步引擎上触发）
+if settings.SQL_PROFILER_ENABLED:
+    query_profiler.install(engine)
+    if async_engine is not None:
+        query_profiler.install(async_engine.sync_engine)
+
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+) if async_engine is not None else None
 
 # 创建基础模型类
 Base = declarative_base()
@@ -28,6 +171,20 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """异步会话依赖（async def 接口使用）"""
+    if AsyncSessionLocal is None:
+        raise RuntimeError("异步数据库引擎未启用（ASYNC_DATABASE_ENABLED 或 ASYNC_DATABASE_URL 未配置）")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def dispose_async_engine() -> None:
+    """关闭异步引擎的连接（应用关闭时调用）"""
+    if async_engine is not None:
+        await async_engine.dispose()
+
 # 数据库事件监听器
 @event.listens_for(engine, "connect")
 def set_sqlite_pragma(dbapi_connection, connection_record):
@@ -36,3 +193,96 @@ def set_sqlite_pragma(dbapi_connection, connection_record):
         cursor = dbapi_connection.cursor()
         cursor.execute("SET SESSION sql_mode='STRICT_TRANS_TABLES,NO_ENGINE_SUBSTITUTION'")
         cursor.close()
+
+
+if async_engine is not None:
+    # 异步引擎的连接使用同样的会话参数（dbapi_connection 为驱动的同步适配对象）
+    event.listen(async_engine.sync_engine, "connect", set_sqlite_pragma)
+
+
+def _install_pool_listeners(target_engine, label: str) -> None:
+    """统计新建/失效连接数和借出连接数的峰值（异步引擎注册在其内部的同步引擎上）"""
+    stats = pool_stats[label]
+
+    def count_connect(dbapi_connection, connection_record):
+        with stats._lock:
+            stats.connects += 1
+
+    def count_invalidate(dbapi_connection, connection_record, exception):
+        with stats._lock:
+            stats.invalidations += 1
+
+    def track_in_use(dbapi_connection, connection_record, connection_proxy):
+        pool = target_engine.pool
+        stats.record_in_use(pool.checkedout(), max(0, pool.overflow()))
+
+    event.listen(target_engine, "connect", count_connect)
+    event.listen(target_engine, "invalidate", count_invalidate)
+    event.listen(target_engine, "checkout", track_in_use)
+
+
+_install_pool_listeners(engine, "sync")
+if async_engine is not None:
+    _install_pool_listeners(async_engine.sync_engine, "async")
+
+
+def _monitored_pools():
+    """(engine 标签, 连接池) 列表"""
+    pools = [("sync", engine.pool)]
+    if async_engine is not None:
+        pools.append(("async", async_engine.pool))
+    return pools
+
+
+def _pool_status(label: str, pool) -> Dict[str, Any]:
+    stats = pool_stats[label]
+    with stats._lock:
+        checkouts = stats.checkouts
+        return {
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "peak_checked_out": stats.peak_checked_out,
+            "peak_overflow": stats.peak_overflow,
+            "checkouts": checkouts,
+            "timeouts": stats.timeouts,
+            "connects": stats.connects,
+            "invalidations": stats.invalidations,
+            "avg_checkout_ms": round(stats.total_checkout_seconds / checkouts * 1000, 3) if checkouts else 0.0,
+            "max_checkout_ms": round(stats.max_checkout_seconds * 1000, 3),
+        }
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """连接池配置、当前状态和累计统计（同步引擎在顶层，异步引擎在 async_pool 中）"""
+    return {
+        "workers": settings.WEB_CONCURRENCY,
+        **engine_pool_options,
+        **_pool_status("sync", engine.pool),
+        "async_pool": _pool_status("async", async_engine.pool) if async_engine is not None else None,
+    }
+
+
+def _collect_pool_metrics():
+    """各引擎连接池的当前状态（导出指标时读取）"""
+    connections = MetricFamily("db_pool_connections", GAUGE, "连接池中的连接数（按引擎和状态）", ("engine", "state"))
+    size = MetricFamily("db_pool_size", GAUGE, "连接池基础大小", ("engine",))
+    max_overflow = MetricFamily("db_pool_max_overflow", GAUGE, "连接池允许的溢出连接数", ("engine",))
+    peaks = MetricFamily("db_pool_peak_connections", GAUGE, "进程启动以来借出/溢出连接数的峰值", ("engine", "state"))
+    events = MetricFamily("db_pool_events_total", COUNTER, "连接池事件次数（新建连接、连接失效）", ("engine", "event"))
+    for label, pool in _monitored_pools():
+        stats = pool_stats[label]
+        connections.samples[(label, "checked_out")] = pool.checkedout()
+        connections.samples[(label, "idle")] = pool.checkedin()
+        # 基础连接尚未全部建立时 overflow() 为负数
+        connections.samples[(label, "overflow")] = max(0, pool.overflow())
+        size.samples[(label,)] = pool.size()
+        max_overflow.samples[(label,)] = engine_pool_options["max_overflow"]
+        peaks.samples[(label, "checked_out")] = stats.peak_checked_out
+        peaks.samples[(label, "overflow")] = stats.peak_overflow
+        events.samples[(label, "connect")] = stats.connects
+        events.samples[(label, "invalidate")] = stats.invalidations
+    return [connections, size, max_overflow, peaks, events]
+
+
+metrics.register_collector(_collect_pool_metrics)
@@ -1,14 +1,82 @@
+import asyncio
+import atexit
+import gzip
 import logging
 import logging.config
+import logging.handlers
 import os
+import queue
+import shutil
+import threading
+import weakref
+from collections import Counter
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Set, Tuple
 import sys
+import json
 import functools
 
 from app.config.settings import settings
 
+try:
+    import orjson
+except ImportError:  # 未安装时退回标准库 json
+    orjson = None
+
+
+def dumps_json(data: Any) -> str:
+    """日志用的 JSON 序列化，优先使用 orjson；无法序列化的值转为字符串"""
+    if orjson is not None:
+        return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class LogEvent:
+    """
+    结构化日志消息：保存消息和字段，直到记录真正写出时才序列化。
+    文本格式的处理器得到 "消息: {字段JSON}"，JsonFormatter 直接把字段合并到输出对象中；
+    被日志级别过滤掉的记录不会产生任何序列化开销。
+    """
+
+    __slots__ = ("message", "fields", "_text")
+
+    def __init__(self, message: str, fields: Optional[Dict[str, Any]] = None):
+        self.message = message
+        self.fields = fields
+        self._text: Optional[str] = None
+
+    def __str__(self) -> str:
+        if self._text is None:
+            self._text = f"{self.message}: {dumps_json(self.fields)}" if self.fields else self.message
+        return self._text
+
+
+class JsonFormatter(logging.Formatter):
+    """每条记录输出为一行 JSON，LogEvent 的字段作为顶层字段"""
+
+    def format(self, record):
+        document = {
+            "timestamp": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "function": record.funcName,
+            "line": record.lineno,
+        }
+        message = record.msg
+        if isinstance(message, LogEvent) and not record.args:
+            document["message"] = message.message
+            for key, value in (message.fields or {}).items():
+                document.setdefault(key, value)
+        else:
+            document["message"] = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            document["exception"] = record.exc_text
+        return dumps_json(document)
+
 
 class ColoredFormatter(logging.Formatter):
     """彩色日志格式化器"""
@@ -24,8 +92,9 @@ class ColoredFormatter(logging.Formatter):
     }
 
     def format(self, record):
-        # 添加颜色
+        # 添加颜色（在副本上修改，同一条记录还会交给其他处理器）
         if record.levelname in self.COLORS:
+            record = logging.makeLogRecord(record.__dict__)
             record.levelname = f"{self.COLORS[record.levelname]}{record.levelname}{self.COLORS['RESET']}"
         
         # 格式化消息
@@ -44,9 +113,322 @@ class RequestFilter(logging.Filter):
         return True
 
 
+class BatchedFlushMixin:
+    """
+    写入后不立即 flush，由日志队列的监听线程在每批记录处理完后调用 force_flush，
+    把一批记录合并成一次刷盘
+    """
+
+    def flush(self):
+        pass
+
+    def force_flush(self):
+        super().flush()
+
+
+class BatchedStreamHandler(BatchedFlushMixin, logging.StreamHandler):
+    pass
+
+
+# 日志文件轮转后调用的函数，参数为当前日志文件路径（在写日志线程中调用，应尽快返回）
+_rollover_listeners = []
+
+
+def add_rollover_listener(listener) -> None:
+    """登记日志轮转监听函数"""
+    _rollover_listeners.append(listener)
+
+
+class LogCompressor:
+    """
+    在后台线程中把轮转出去的日志 xxx.log.1 压缩为 xxx.log.1.gz：
+    先写临时文件，完成后改名并删除原文件，修改时间保持为原文件的修改时间。
+    进程在压缩过程中退出时原文件还在，下次启动时重新压缩
+    """
+
+    def __init__(self, level: int):
+        self.level = level
+        self.compressed = 0
+        self.failed = 0
+        self.saved_bytes = 0
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._pending = set()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, path: str) -> None:
+        with self._condition:
+            if path in self._pending:
+                return
+            self._pending.add(path)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-compressor", daemon=True)
+                self._thread.start()
+        self._queue.put(path)
+
+    def wait(self, prefix: str, timeout: float = 60) -> None:
+        """等待以 prefix 开头的文件压缩完成"""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: not any(path.startswith(prefix) for path in self._pending), timeout
+            )
+
+    def _run(self) -> None:
+        while True:
+            path = self._queue.get()
+            try:
+                self.compress(path)
+            except Exception as e:
+                self.failed += 1
+                sys.stderr.write(f"压缩日志文件失败 {path}: {e}\n")
+            finally:
+                with self._condition:
+                    self._pending.discard(path)
+                    self._condition.notify_all()
+
+    def compress(self, path: str) -> None:
+        if not os.path.exists(path):
+            return
+        target = path + ".gz"
+        temporary = target + ".tmp"
+        stat = os.stat(path)
+        with open(path, "rb") as source, open(temporary, "wb") as raw:
+            with gzip.GzipFile(
+                filename=os.path.basename(path), mode="wb", fileobj=raw,
+                compresslevel=self.level, mtime=stat.st_mtime,
+            ) as output:
+                shutil.copyfileobj(source, output, 1024 * 1024)
+        os.utime(temporary, (stat.st_atime, stat.st_mtime))
+        os.replace(temporary, target)
+        os.remove(path)
+        self.compressed += 1
+        self.saved_bytes += stat.st_size - os.path.getsize(target)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._condition:
+            pending = len(self._pending)
+        return {
+            "pending": pending,
+            "compressed": self.compressed,
+            "failed": self.failed,
+            "saved_bytes": self.saved_bytes,
+        }
+
+
+log_compressor = LogCompressor(settings.LOG_COMPRESS_LEVEL)
+
+# 当前进程中写日志文件的处理器
+_file_handlers: "weakref.WeakSet[BatchedRotatingFileHandler]" = weakref.WeakSet()
+
+
+def get_active_log_files() -> Set[Path]:
+    """正在写入的日志文件（绝对路径）"""
+    return {Path(handler.baseFilename).resolve() for handler in list(_file_handlers) if handler.stream is not None}
+
+
+class BatchedRotatingFileHandler(BatchedFlushMixin, logging.handlers.RotatingFileHandler):
+    """
+    compress=True 时轮转文件名为 xxx.log.N.gz：轮转时当前文件先改名为 xxx.log.1，
+    由后台线程压缩，写日志线程不等待压缩；下一次轮转前等待上一次的压缩完成
+    """
+
+    def __init__(self, *args, compress: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        _file_handlers.add(self)
+        self.compress = compress
+        if compress:
+            self.namer = lambda name: name + ".gz"
+            self.rotator = self._rotate_and_compress
+            # 启用压缩之前留下的未压缩轮转文件
+            for i in range(1, self.backupCount + 1):
+                path = f"{self.baseFilename}.{i}"
+                if os.path.exists(path) and not os.path.exists(path + ".gz"):
+                    log_compressor.submit(path)
+
+    def _rotate_and_compress(self, source: str, dest: str) -> None:
+        uncompressed = dest[:-len(".gz")]
+        os.rename(source, uncompressed)
+        log_compressor.submit(uncompressed)
+
+    def doRollover(self):
+        if self.compress:
+            # 轮转会移动 .gz 文件，先等待正在压缩的文件完成；上次压缩失败留下的文件在这里再压缩一次
+            log_compressor.wait(self.baseFilename + ".")
+            leftover = f"{self.baseFilename}.1"
+            if os.path.exists(leftover):
+                log_compressor.compress(leftover)
+        super().doRollover()
+        for listener in _rollover_listeners:
+            try:
+                listener(self.baseFilename)
+            except Exception:
+                pass
+
+
+class RoutingQueueHandler(logging.handlers.QueueHandler):
+    """
+    把日志器的记录连同它原本的处理器一起放入共享队列，由监听线程写出。
+    日志器级别的过滤仍在调用方完成；消息格式化、处理器过滤和写文件都在监听线程中进行。
+    """
+
+    def __init__(self, pipeline: "LogQueuePipeline", targets: Tuple[logging.Handler, ...]):
+        super().__init__(pipeline.queue)
+        self.pipeline = pipeline
+        self.targets = targets
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 不在调用方格式化消息（参数延迟到写出时才转换为字符串），
+        # 只把异常堆栈先转成文本，避免跨线程持有 traceback 中的栈帧
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self.pipeline.exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        self.pipeline.put(self.targets, record)
+
+
+class LogQueuePipeline:
+    """
+    有界日志队列 + 单个监听线程。
+    队列满时按 LOG_QUEUE_FULL_POLICY 处理：drop 立即丢弃，
+    block 最多等待 LOG_QUEUE_BLOCK_TIMEOUT 秒，仍然满则丢弃；丢弃的记录按级别计数。
+    """
+
+    _STOP = object()
+
+    def __init__(self, maxsize: int, full_policy: str, block_timeout: float, batch_size: int):
+        self.queue: "queue.Queue" = queue.Queue(maxsize=maxsize)
+        self.maxsize = maxsize
+        self.full_policy = full_policy
+        self.block_timeout = block_timeout
+        self.batch_size = batch_size
+        self.exc_formatter = logging.Formatter()
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.dropped: Counter = Counter()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def put(self, targets: Tuple[logging.Handler, ...], record: logging.LogRecord) -> None:
+        try:
+            if self.full_policy == "block":
+                self.queue.put((targets, record), timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait((targets, record))
+            with self._lock:
+                self.enqueued += 1
+        except queue.Full:
+            with self._lock:
+                self.dropped[record.levelname] += 1
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """写完队列中剩余的记录后停止监听线程"""
+        if self._thread is None:
+            return
+        self.queue.put(self._STOP)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = self._write(batch)
+            if stopping:
+                return
+
+    def _write(self, batch) -> bool:
+        touched = {}
+        stopping = False
+        written = 0
+        for item in batch:
+            if item is self._STOP:
+                stopping = True
+                continue
+            targets, record = item
+            for handler in targets:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+                    touched[id(handler)] = handler
+            written += 1
+        for handler in touched.values():
+            try:
+                if isinstance(handler, BatchedFlushMixin):
+                    handler.force_flush()
+                else:
+                    handler.flush()
+            except Exception:
+                pass
+        with self._lock:
+            self.written += written
+            self.batches += 1
+        return stopping
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queue_size": self.queue.qsize(),
+                "queue_capacity": self.maxsize,
+                "full_policy": self.full_policy,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": sum(self.dropped.values()),
+                "dropped_by_level": dict(self.dropped),
+                "batches": self.batches,
+                "avg_batch_size": round(self.written / self.batches, 2) if self.batches else 0.0,
+            }
+
+
+_log_pipeline: Optional[LogQueuePipeline] = None
+
+
+def _route_through_queue(pipeline: LogQueuePipeline, logger_names) -> None:
+    """把各日志器上的处理器替换为指向共享队列的 RoutingQueueHandler"""
+    queue_handlers: Dict[Tuple[int, ...], RoutingQueueHandler] = {}
+    for name in logger_names:
+        logger = logging.getLogger(name) if name else logging.getLogger()
+        targets = tuple(logger.handlers)
+        if not targets:
+            continue
+        key = tuple(id(handler) for handler in targets)
+        if key not in queue_handlers:
+            queue_handlers[key] = RoutingQueueHandler(pipeline, targets)
+        logger.handlers = [queue_handlers[key]]
+
+
+def stop_logging() -> None:
+    """写完队列中的日志并停止写日志线程（应用关闭时调用）"""
+    global _log_pipeline
+    if _log_pipeline is not None:
+        _log_pipeline.stop()
+        _log_pipeline = None
+
+
+def get_logging_stats() -> Dict[str, Any]:
+    """日志队列指标，未初始化时返回空字典"""
+    return _log_pipeline.get_stats() if _log_pipeline is not None else {}
+
+
 def setup_logging():
-    """设置日志配置"""
-    
+    """
+    设置日志配置
+    处理器由 dictConfig 按原有配置创建，随后各日志器统一改为写入有界队列，
+    由单独的线程批量写文件和控制台，请求处理中不再直接进行磁盘IO。
+    """
+    global _log_pipeline
+    stop_logging()
+
     # 创建日志目录
     log_dir = Path("logs")
     log_dir.mkdir(exist_ok=True)
@@ -70,7 +452,7 @@ def setup_logging():
                 "datefmt": "%Y-%m-%d %H:%M:%S",
             },
             "json": {
-                "format": '{"timestamp": "%(asctime)s", "level": "%(levelname)s", "logger": "%(name)s", "module": "%(module)s", "function": "%(funcName)s", "line": %(lineno)d, "message": "%(message)s"}',
+                "()": JsonFormatter,
                 "datefmt": "%Y-%m-%d %H:%M:%S",
             }
         },
@@ -81,56 +463,61 @@ def setup_logging():
         },
         "handlers": {
             "console": {
-                "class": "logging.StreamHandler",
+                "()": BatchedStreamHandler,
                 "level": "DEBUG",
                 "formatter": "colored",
                 "stream": sys.stdout,
             },
             "file": {
-                "class": "logging.handlers.RotatingFileHandler",
+                "()": BatchedRotatingFileHandler,
                 "level": "INFO",
                 "formatter": "detailed",
                 "filename": settings.LOG_FILE,
                 "maxBytes": 10485760,  # 10MB
                 "backupCount": 5,
                 "encoding": "utf8",
+                "compress": settings.LOG_COMPRESS_ROTATED,
             },
             "error_file": {
-                "class": "logging.handlers.RotatingFileHandler",
+                "()": BatchedRotatingFileHandler,
                 "level": "ERROR",
                 "formatter": "detailed",
                 "filename": "logs/error.log",
                 "maxBytes": 10485760,  # 10MB
                 "backupCount": 5,
                 "encoding": "utf8",
+                "compress": settings.LOG_COMPRESS_ROTATED,
             },
             "access_file": {
-                "class": "logging.handlers.RotatingFileHandler",
+                "()": BatchedRotatingFileHandler,
                 "level": "INFO",
-                "formatter": "default",
+                "formatter": "json",
                 "filename": "logs/access.log",
                 "maxBytes": 10485760,  # 10MB
                 "backupCount": 10,
                 "encoding": "utf8",
+                "compress": settings.LOG_COMPRESS_ROTATED,
                 "filters": ["request_filter"],
             },
             "security_file": {
-                "class": "logging.handlers.RotatingFileHandler",
+                "()": BatchedRotatingFileHandler,
                 "level": "WARNING",
                 "formatter": "detailed",
                 "filename": "logs/security.log",
                 "maxBytes": 10485760,  # 10MB
                 "backupCount": 10,
                 "encoding": "utf8",
+                "compress": settings.LOG_COMPRESS_ROTATED,
             },
             "database_file": {
-                "class": "logging.handlers.RotatingFileHandler",
+                "()": BatchedRotatingFileHandler,
                 "level": "INFO",
                 "formatter": "detailed",
                 "filename": "logs/database.log",
                 "maxBytes": 10485760,  # 10MB
                 "backupCount": 5,
                 "encoding": "utf8",
+                "compress": settings.LOG_COMPRESS_ROTATED,
             }
         },
         "loggers": {
@@ -187,7 +574,8 @@ def setup_logging():
                 "propagate": False,
             },
             "sqlalchemy.engine": {
-                "level": "INFO",
+                # INFO 级别会记录每条SQL（与 echo=True 相同），默认关闭
+                "level": "INFO" if settings.DATABASE_ECHO else "WARNING",
                 "handlers": ["database_file"],
                 "propagate": False,
             },
@@ -205,6 +593,16 @@ def setup_logging():
     
     # 应用日志配置
     logging.config.dictConfig(logging_config)
+
+    # 所有处理器移到日志队列之后
+    _log_pipeline = LogQueuePipeline(
+        maxsize=settings.LOG_QUEUE_SIZE,
+        full_policy=settings.LOG_QUEUE_FULL_POLICY,
+        block_timeout=settings.LOG_QUEUE_BLOCK_TIMEOUT,
+        batch_size=settings.LOG_QUEUE_BATCH_SIZE,
+    )
+    _route_through_queue(_log_pipeline, [None, *logging_config["loggers"]])
+    _log_pipeline.start()
     
     # 创建主应用日志器
     logger = logging.getLogger("app")
@@ -213,6 +611,9 @@ def setup_logging():
     return logger
 
 
+atexit.register(stop_logging)
+
+
 def get_logger(name: str = None) -> logging.Logger:
     """获取日志器"""
     if name is None:
@@ -275,7 +676,21 @@ def log_function_call(logger: logging.Logger = None):
 
 
 def log_api_call(func):
-    """API调用日志装饰器"""
+    """API调用日志装饰器（支持同步和异步函数）"""
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            api_logger = get_api_logger()
+            api_logger.info(f"API调用: {func.__name__}")
+            try:
+                result = await func(*args, **kwargs)
+                api_logger.info(f"API调用成功: {func.__name__}")
+                return result
+            except Exception as e:
+                api_logger.error(f"API调用失败: {func.__name__} - 错误: {str(e)}")
+                raise
+        return async_wrapper
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         api_logger = get_api_logger()
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
 import secrets
 import dotenv
 import os
@@ -21,13 +21,70 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8天
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
 
+    # bcrypt 成本因子（修改后已有密码在下次登录时自动按新参数重新哈希）
+    BCRYPT_ROUNDS: int = 12
+
+    # 密码哈希/校验线程池：并发计算线程数、排队上限（超出时登录接口返回503）
+    PASSWORD_POOL_WORKERS: int = min(4, os.cpu_count() or 1)
+    PASSWORD_POOL_MAX_PENDING: int = 64
+
     # 数据库配置
     DATABASE_URL: str = os.environ.get("DATABASE_URL")
     DATABASE_TEST_URL: str = os.environ.get("DATABASE_TEST_URL")
 
+    # 数据库连接池（每个 uvicorn 进程一个连接池）
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30  # 等待空闲连接的秒数，超时抛出 QueuePool limit 错误
+    DB_POOL_RECYCLE: int = 3600  # 连接使用超过该秒数后重建，应小于 MySQL 的 wait_timeout；-1 表示不重建
+    DB_POOL_PRE_PING: bool = True  # 取连接时先 ping，自动替换已断开的连接（每次取连接多一次往返）
+    # 所有进程合计的连接上限（如数据库 max_connections 中留给本服务的部分）；
+    # 设置后按 WEB_CONCURRENCY 个进程平分，每个进程的 pool_size + max_overflow 不超过份额
+    DB_MAX_CONNECTIONS: Optional[int] = None
+    # uvicorn 进程数（uvicorn --workers 同样读取此环境变量）
+    WEB_CONCURRENCY: int = 1
+
+    # 异步数据库引擎（async def 接口使用，MySQL 需要 aiomysql，SQLite 需要 aiosqlite）；
+    # 未配置 ASYNC_DATABASE_URL 时由 DATABASE_URL 换成对应的异步驱动，与同步引擎平分连接数上限
+    ASYNC_DATABASE_ENABLED: bool = True
+    ASYNC_DATABASE_URL: Optional[str] = None
+
+    # 是否把每条SQL写入 sqlalchemy.engine 日志（量很大，只在排查问题时打开）
+    DATABASE_ECHO: bool = False
+
+    # SQL 查询分析：每个请求的查询数和数据库耗时写入访问日志和 X-DB-Query-Count/X-DB-Time 响应头，
+    # 同一语句在一个请求中执行超过阈值次数时记为疑似 N+1
+    SQL_PROFILER_ENABLED: bool = True
+    SQL_N_PLUS_ONE_THRESHOLD: int = 10
+
     # Redis配置（缓存和会话）
     REDIS_URL: str = os.environ.get("REDIS_URL")
 
+    # 分析接口缓存配置（未配置 REDIS_URL 时使用进程内缓存）
+    ANALYTICS_CACHE_TTL: int = 60
+    ANALYTICS_CACHE_MAX_ENTRIES: int = 256
+
+    # 认证主体缓存配置（进程内，多进程部署时其他进程在 TTL 内可能读到旧状态）
+    PRINCIPAL_CACHE_TTL: int = 30
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 1024
+
+    # 速率限制配置（配置了 REDIS_URL 时多个进程共享计数）
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_WINDOW_SECONDS: int = 60
+    RATE_LIMIT_REQUESTS: int = 100  # 未认证请求，按IP计数
+    RATE_LIMIT_AUTHENTICATED_REQUESTS: int = 300  # 已认证请求，按用户/管理员/工人计数
+    RATE_LIMIT_LOGIN_REQUESTS: int = 10  # 登录接口，按IP计数
+    RATE_LIMIT_MAX_KEYS: int = 100_000  # 进程内计数器数量上限，超出时淘汰最久未访问的
+
+    # 可疑请求检测：同一IP同一类事件在窗口内只写一次安全日志，其余只计数
+    SECURITY_EVENT_DEDUP_SECONDS: int = 60
+    SECURITY_EVENT_DEDUP_MAX_KEYS: int = 10_000
+
+    # Prometheus 指标（/metrics）：多进程部署时各进程把快照写入该目录（启动前需清空），由任一进程汇总
+    METRICS_ENABLED: bool = True
+    METRICS_MULTIPROC_DIR: Optional[str] = None
+    METRICS_FLUSH_SECONDS: float = 5.0
+
     # 文件上传配置
     UPLOAD_DIR: str = "uploads"
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
@@ -35,6 +92,36 @@ class Settings(BaseSettings):
     # 日志配置
     LOG_LEVEL: str = "INFO"
     LOG_FILE: str = "logs/app.log"
+    # 日志队列：请求中只把记录放入有界队列，由单独线程批量写出
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_QUEUE_FULL_POLICY: str = "drop"  # drop: 队列满时立即丢弃；block: 最多等待 LOG_QUEUE_BLOCK_TIMEOUT 秒后丢弃
+    LOG_QUEUE_BLOCK_TIMEOUT: float = 0.05
+    LOG_QUEUE_BATCH_SIZE: int = 256
+    # 轮转出去的日志在后台线程中压缩为 .gz（xxx.log.N.gz），当前文件不压缩
+    LOG_COMPRESS_ROTATED: bool = True
+    LOG_COMPRESS_LEVEL: int = 6
+    # 日志索引：按请求ID、IP、状态码、路径和时间检索这些日志（含 .1-.N 轮转文件），供 /logs/query 使用；
+    # 每个日志在 LOG_INDEX_DIR 下有一个 SQLite 索引库，删除后会重新建立
+    LOG_INDEX_ENABLED: bool = True
+    LOG_INDEX_DIR: str = "logs/.index"
+    LOG_INDEX_FILES: List[str] = ["access.log", "security.log", "error.log"]
+    LOG_INDEX_MAX_ROTATIONS: int = 10
+    LOG_INDEX_SYNC_SECONDS: float = 30.0  # 后台增量索引当前日志文件的间隔，轮转时立即索引
+    # 日志实时推送（/logs/stream）：每个进程每个文件一个跟随器，按间隔检查新内容；
+    # 每个连接最多缓冲的批次数（客户端读得慢时丢弃并通知）；每个进程的连接数上限
+    LOG_STREAM_POLL_SECONDS: float = 0.5
+    LOG_STREAM_QUEUE_SIZE: int = 100
+    LOG_STREAM_MAX_SUBSCRIBERS: int = 50
+    LOG_STREAM_HEARTBEAT_SECONDS: float = 15.0
+    # 访问日志调试模式：记录完整请求头、请求体和响应体样本
+    DEBUG_MODE: bool = True
+    # 请求体/响应体只按比例抽样记录前 N 字节，消息体本身原样流式转发（响应体只在调试模式下记录）
+    ACCESS_LOG_BODY_SAMPLE_BYTES: int = 2048
+    ACCESS_LOG_BODY_SAMPLE_RATE: float = 1.0
+    # 按路径前缀覆盖抽样比例（最长前缀优先），如 {"/api/v1/analytics": 0.05, "/api/v1/logs": 0}
+    ACCESS_LOG_BODY_SAMPLE_ROUTES: Dict[str, float] = {}
+    # 请求体记录策略：off 不记录；size 只记录大小；masked-sample 按上面的比例记录屏蔽敏感字段后的前 N 字节
+    ACCESS_LOG_REQUEST_BODY_POLICY: str = "masked-sample"
 
     # 分页配置
     DEFAULT_PAGE_SIZE: int = 20
@@ -0,0 +1,244 @@
+"""
+访问日志中的请求体/响应体记录
+BodySampler 只复制前 N 字节；JsonBodyMasker 在数据流经时增量屏蔽 JSON 敏感字段，
+不解析完整请求体、不复制对象，扫描和输出的字节数都有上限。
+"""
+import json
+import re
+from typing import Any, Iterable
+
+# 请求体记录策略
+BODY_LOG_OFF = "off"  # 不记录
+BODY_LOG_SIZE = "size"  # 只记录大小
+BODY_LOG_MASKED_SAMPLE = "masked-sample"  # 记录屏蔽敏感字段后的前 N 字节
+BODY_LOG_POLICIES = (BODY_LOG_OFF, BODY_LOG_SIZE, BODY_LOG_MASKED_SAMPLE)
+
+MASKED_VALUE = "***已屏蔽***"
+
+
+class BodySampler:
+    """
+    请求体/响应体抽样：分块原样转发，只复制前 limit 字节用于日志，
+    同时统计完整大小，不会把整个消息体拼接到内存中；limit 为 0 时只统计大小
+    """
+
+    __slots__ = ("limit", "size", "_sample")
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.size = 0
+        self._sample = bytearray()
+
+    def feed(self, chunk: bytes) -> None:
+        remaining = self.limit - len(self._sample)
+        if remaining > 0:
+            self._sample += memoryview(chunk)[:remaining]
+        self.size += len(chunk)
+
+    @property
+    def truncated(self) -> bool:
+        return self.size > len(self._sample)
+
+    def text(self) -> str:
+        # 截断处可能落在多字节字符中间
+        return self._sample.decode("utf-8", "replace")
+
+
+# 各状态下需要处理的字符，其余字节整段复制或跳过
+_NORMAL_STOP = re.compile(rb'[":]')
+_STRING_STOP = re.compile(rb'["\\]')
+_NESTED_STOP = re.compile(rb'["{}\[\]]')
+_SCALAR_STOP = re.compile(rb'[,}\]\s]')
+_WHITESPACE = b" \t\r\n"
+_KEY_PREFIX_BYTES = 64
+
+
+class JsonBodyMasker:
+    """
+    JSON 请求体的增量屏蔽器：键名包含敏感词的字段，其值（字符串、数字、对象或数组）
+    整体替换为 "***已屏蔽***"。
+    不超过 limit 字节的请求体先缓存，结束时用 json 模块解析屏蔽（C 实现，小请求体更快）；
+    超过后改为按字节流扫描，分块边界可以落在任意位置
+    （JSON 的结构字符都是 ASCII，不会与 UTF-8 多字节字符混淆）。
+    输出达到 limit 字节或扫描超过 max_scan 字节后停止处理，只继续统计大小。
+    """
+
+    NORMAL, STRING, VALUE, SKIP_STRING, SKIP_NESTED, SKIP_SCALAR = range(6)
+    _MASK = f'"{MASKED_VALUE}"'.encode("utf-8")
+
+    def __init__(self, sensitive_fields: Iterable[str], limit: int, max_scan: int = None):
+        self.sensitive_fields = tuple(field.lower() for field in sensitive_fields)
+        # 敏感词合并为一个不区分大小写的正则，键名只需搜索一次（re.compile 自带缓存）
+        pattern = "|".join(re.escape(field) for field in self.sensitive_fields) or "(?!)"
+        self._sensitive_text = re.compile(pattern, re.IGNORECASE)
+        self._sensitive_bytes = re.compile(pattern.encode("utf-8"), re.IGNORECASE)
+        self.limit = limit
+        self.max_scan = max_scan if max_scan is not None else limit * 4
+        self.size = 0
+        self.scanned = 0
+        self.stopped = False
+        self._pending = bytearray()
+        self._streaming = False
+        self._out = bytearray()
+        self._state = self.NORMAL
+        self._escape = False
+        # 最近一个字符串的开头部分，后面紧跟冒号时它就是键名
+        self._key = bytearray()
+        self._after_string = False
+        self._nested_depth = 0
+        self._nested_in_string = False
+
+    @property
+    def truncated(self) -> bool:
+        return self.stopped or self.size > self.scanned
+
+    def text(self) -> str:
+        if self._pending:
+            try:
+                document = json.loads(self._pending)
+            except ValueError:
+                self._scan(self._pending)
+            else:
+                self.scanned = self.size
+                self._emit(json.dumps(self._mask(document), ensure_ascii=False).encode("utf-8"))
+            self._pending = bytearray()
+        return self._out.decode("utf-8", "replace")
+
+    def _mask(self, value: Any) -> Any:
+        if isinstance(value, dict):
+            return {
+                key: MASKED_VALUE if self._sensitive_text.search(key) else self._mask(item)
+                for key, item in value.items()
+            }
+        if isinstance(value, list):
+            return [self._mask(item) for item in value]
+        return value
+
+    def _emit(self, data) -> None:
+        remaining = self.limit - len(self._out)
+        self._out += data[:remaining]
+        if len(data) >= remaining:
+            self.stopped = True
+
+    def feed(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.stopped:
+            return
+        if not self._streaming:
+            if self.size <= self.limit:
+                self._pending += chunk
+                return
+            self._streaming = True
+            chunk = bytes(self._pending) + chunk
+            self._pending = bytearray()
+        self._scan(chunk)
+
+    def _scan(self, chunk: bytes) -> None:
+        data = chunk[: self.max_scan - self.scanned]
+        self.scanned += len(data)
+        if self.scanned >= self.max_scan:
+            self.stopped = True
+        # 未屏蔽的内容不逐字符输出，只记录起点，遇到屏蔽值或分块结束时整段复制
+        i, n = 0, len(data)
+        copy_from = 0 if self._state < self.VALUE else None
+        while i < n:
+            state = self._state
+            if state == self.NORMAL:
+                match = _NORMAL_STOP.search(data, i)
+                end = match.start() if match else n
+                if end > i:
+                    if data[i:end].strip(_WHITESPACE):
+                        self._after_string = False
+                    i = end
+                if match is None:
+                    break
+                if data[i] == 0x22:  # "
+                    self._key.clear()
+                    self._state = self.STRING
+                elif self._after_string and self._sensitive_bytes.search(self._key):  # 敏感键名后的冒号
+                    self._emit(data[copy_from:i + 1])
+                    copy_from = None
+                    self._state = self.VALUE
+                self._after_string = False
+                i += 1
+            elif state == self.STRING:
+                if self._escape:
+                    self._escape = False
+                    i += 1
+                    continue
+                match = _STRING_STOP.search(data, i)
+                end = match.start() if match else n
+                if len(self._key) < _KEY_PREFIX_BYTES:
+                    self._key += data[i:min(end, i + _KEY_PREFIX_BYTES - len(self._key))]
+                i = end
+                if match is None:
+                    break
+                if data[i] == 0x5C:  # \
+                    self._escape = True
+                else:
+                    self._state = self.NORMAL
+                    self._after_string = True
+                i += 1
+            elif state == self.VALUE:
+                while i < n and data[i] in _WHITESPACE:
+                    i += 1
+                if i >= n:
+                    break
+                self._emit(self._MASK)
+                first = data[i]
+                if first == 0x22:
+                    self._state = self.SKIP_STRING
+                    i += 1
+                elif first in (0x7B, 0x5B):  # { [
+                    self._state = self.SKIP_NESTED
+                    self._nested_depth = 1
+                    self._nested_in_string = False
+                    i += 1
+                else:
+                    self._state = self.SKIP_SCALAR
+            elif state == self.SKIP_SCALAR:
+                match = _SCALAR_STOP.search(data, i)
+                if match is None:
+                    break
+                i = copy_from = match.start()
+                self._state = self.NORMAL
+            elif state == self.SKIP_STRING or self._nested_in_string:
+                if self._escape:
+                    self._escape = False
+                    i += 1
+                    continue
+                match = _STRING_STOP.search(data, i)
+                if match is None:
+                    break
+                i = match.end()
+                if data[match.start()] == 0x5C:
+                    self._escape = True
+                elif state == self.SKIP_STRING:
+                    self._state = self.NORMAL
+                    copy_from = i
+                else:
+                    self._nested_in_string = False
+            else:  # SKIP_NESTED
+                match = _NESTED_STOP.search(data, i)
+                if match is None:
+                    break
+                i = match.end()
+                char = data[match.start()]
+                if char == 0x22:
+                    self._nested_in_string = True
+                elif char in (0x7B, 0x5B):
+                    self._nested_depth += 1
+                else:
+                    self._nested_depth -= 1
+                    if self._nested_depth == 0:
+                        self._state = self.NORMAL
+                        copy_from = i
+            if self.stopped and len(self._out) >= self.limit:
+                return
+            if copy_from is not None and i - copy_from >= self.limit - len(self._out):
+                # 待复制的内容已经够填满输出
+                break
+        if copy_from is not None:
+            self._emit(data[copy_from:n])
+        if len(self._out) >= self.limit:
+            self.stopped = True
@@ -0,0 +1,435 @@
+"""
+查询结果缓存与认证主体缓存
+默认使用进程内 LRU + TTL 缓存，配置了 REDIS_URL 时使用 Redis（多进程共享）。
+缓存键由名称空间（接口）和参数组成；被监视的表在事务提交后有写入时，
+整个名称空间失效。认证主体缓存只在进程内，对应记录写入提交后逐条失效。
+"""
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.config.settings import settings
+from app.config.logging import get_logger
+from app.core.metrics import COUNTER, GAUGE, MetricFamily, metrics
+
+logger = get_logger("app.cache")
+
+
+class MemoryCacheBackend:
+    """进程内 LRU 缓存，条目按 TTL 过期"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def get_async(self, key: str) -> Optional[Any]:
+        # 进程内读写不等待 IO，异步接口直接调用
+        return self.get(key)
+
+    async def set_async(self, key: str, value: Any, ttl: int) -> None:
+        self.set(key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self, namespace: str) -> None:
+        prefix = f"{namespace}:"
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """
+    Redis 缓存。失效时递增名称空间的版本号而不是逐个删除键，
+    旧版本的条目由 TTL 自然淘汰。
+    async def 接口使用 redis.asyncio 客户端（get_async/set_async），等待 Redis 时不阻塞事件循环。
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str):
+        import redis
+        import redis.asyncio as aioredis
+
+        self.client = redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1)
+        self.client.ping()
+        self.async_client = aioredis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1)
+
+    @staticmethod
+    def _version_key(key: str) -> str:
+        return f"cache:version:{key.split(':', 1)[0]}"
+
+    def _versioned(self, key: str) -> str:
+        version = self.client.get(self._version_key(key)) or b"0"
+        return f"cache:{version.decode()}:{key}"
+
+    async def _versioned_async(self, key: str) -> str:
+        version = await self.async_client.get(self._version_key(key)) or b"0"
+        return f"cache:{version.decode()}:{key}"
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(self._versioned(key))
+        return value.decode("utf-8") if value is not None else None
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        self.client.set(self._versioned(key), value, ex=ttl)
+
+    async def get_async(self, key: str) -> Optional[str]:
+        value = await self.async_client.get(await self._versioned_async(key))
+        return value.decode("utf-8") if value is not None else None
+
+    async def set_async(self, key: str, value: str, ttl: int) -> None:
+        await self.async_client.set(await self._versioned_async(key), value, ex=ttl)
+
+    def clear(self, namespace: str) -> None:
+        self.client.incr(f"cache:version:{namespace}")
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class QueryCache:
+    """
+    带命中统计的结果缓存。
+    结果以 JSON 形式保存，命中时返回 JSON 兼容的数据（Decimal/datetime 已转换），
+    由接口的 response_model 重新校验。
+    """
+
+    def __init__(self, namespace: str, ttl: int, max_entries: int, redis_url: Optional[str] = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.backend = self._create_backend(max_entries, redis_url)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+        self._watched_tables: Set[str] = set()
+
+    def _create_backend(self, max_entries: int, redis_url: Optional[str]):
+        if redis_url:
+            try:
+                return RedisCacheBackend(redis_url)
+            except Exception as e:
+                logger.warning(f"Redis缓存不可用，改用进程内缓存: {e}")
+        return MemoryCacheBackend(max_entries)
+
+    def make_key(self, name: str, params: Optional[Dict[str, Any]] = None) -> str:
+        encoded = json.dumps(jsonable_encoder(params or {}), sort_keys=True, ensure_ascii=False)
+        return f"{self.namespace}:{name}:{encoded}"
+
+    def get_or_set(self, name: str, params: Optional[Dict[str, Any]], compute: Callable[[], Any]) -> Any:
+        """返回缓存的结果；未命中时调用 compute 计算并写入缓存"""
+        key = self.make_key(name, params)
+        cached = self._lookup(key)
+        if cached is not None:
+            return json.loads(cached)
+        return self._store(key, compute())
+
+    async def get_or_set_async(
+        self, name: str, params: Optional[Dict[str, Any]], compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """get_or_set 的异步版本，compute 为返回可等待对象的函数；缓存读写也以异步方式进行，不阻塞事件循环"""
+        key = self.make_key(name, params)
+        cached = await self._lookup_async(key)
+        if cached is not None:
+            return json.loads(cached)
+        return await self._store_async(key, await compute())
+
+    def _lookup(self, key: str) -> Optional[str]:
+        try:
+            cached = self.backend.get(key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"读取缓存失败: {e}")
+            cached = None
+        return self._count_lookup(cached)
+
+    async def _lookup_async(self, key: str) -> Optional[str]:
+        try:
+            cached = await self.backend.get_async(key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"读取缓存失败: {e}")
+            cached = None
+        return self._count_lookup(cached)
+
+    def _count_lookup(self, cached: Optional[str]) -> Optional[str]:
+        if cached is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return cached
+
+    def _store(self, key: str, result: Any) -> Any:
+        value = jsonable_encoder(result)
+        try:
+            self.backend.set(key, json.dumps(value, ensure_ascii=False), self.ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"写入缓存失败: {e}")
+        return value
+
+    async def _store_async(self, key: str, result: Any) -> Any:
+        value = jsonable_encoder(result)
+        try:
+            await self.backend.set_async(key, json.dumps(value, ensure_ascii=False), self.ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"写入缓存失败: {e}")
+        return value
+
+    def invalidate(self) -> None:
+        self.invalidations += 1
+        try:
+            self.backend.clear(self.namespace)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"清除缓存失败: {e}")
+
+    def watch_tables(self, tables: Iterable[str]) -> None:
+        """这些表在事务提交后有写入时，使缓存失效"""
+        self._watched_tables.update(tables)
+
+    def is_watched(self, tables: Set[str]) -> bool:
+        return bool(self._watched_tables & tables)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "ttl_seconds": self.ttl,
+            "entries": self.backend.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+            "watched_tables": sorted(self._watched_tables),
+        }
+
+
+class PrincipalCache:
+    """
+    已认证主体（用户/管理员/工人）的短期缓存，键为 (主体类型, id)。
+    缓存的是列值快照而不是 ORM 对象，命中时用 merge(load=False)
+    在当前会话中还原出持久化对象，不执行任何 SQL，也不会在请求间共享实例。
+    """
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.backend = MemoryCacheBackend(max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._subject_types: Dict[str, str] = {}
+
+    def register(self, subject_type: str, model: Any) -> None:
+        """登记主体类型对应的模型，该表的写入提交后使对应条目失效"""
+        self._subject_types[model.__tablename__] = subject_type
+
+    def _key(self, subject_type: str, id: Any) -> str:
+        return f"principal:{subject_type}:{id}"
+
+    def resolve(self, db: Session, subject_type: str, crud: Any, id: int) -> Optional[Any]:
+        """按 id 获取未删除的主体，命中缓存时不查询数据库"""
+        key = self._key(subject_type, id)
+        entry = self.backend.get(key)
+        if entry is not None:
+            self.hits += 1
+            return self._restore(db, crud.model, entry["values"])
+
+        self.misses += 1
+        obj = crud.get(db, id=id)
+        if obj is not None:
+            self.backend.set(key, self._snapshot(obj), self.ttl)
+        return obj
+
+    def token_version(self, db: Session, subject_type: str, crud: Any, id: int) -> Optional[int]:
+        """主体当前的令牌版本，主体不存在时返回 None；命中缓存时不查询数据库"""
+        entry = self.backend.get(self._key(subject_type, id))
+        if entry is not None:
+            self.hits += 1
+            return entry["values"].get("token_version")
+        obj = self.resolve(db, subject_type, crud, id)
+        return obj.token_version if obj is not None else None
+
+    async def resolve_async(self, db: AsyncSession, subject_type: str, crud: Any, id: int) -> Optional[Any]:
+        """resolve 的异步版本"""
+        key = self._key(subject_type, id)
+        entry = self.backend.get(key)
+        if entry is not None:
+            self.hits += 1
+            return await db.merge(self._detached(crud.model, entry["values"]), load=False)
+
+        self.misses += 1
+        obj = await crud.get_async(db, id=id)
+        if obj is not None:
+            self.backend.set(key, self._snapshot(obj), self.ttl)
+        return obj
+
+    async def token_version_async(self, db: AsyncSession, subject_type: str, crud: Any, id: int) -> Optional[int]:
+        """token_version 的异步版本"""
+        entry = self.backend.get(self._key(subject_type, id))
+        if entry is not None:
+            self.hits += 1
+            return entry["values"].get("token_version")
+        obj = await self.resolve_async(db, subject_type, crud, id)
+        return obj.token_version if obj is not None else None
+
+    def _snapshot(self, obj: Any) -> Dict[str, Any]:
+        mapper = inspect(obj).mapper
+        values = {attr.key: getattr(obj, attr.key) for attr in mapper.column_attrs}
+        return {"values": copy.deepcopy(values)}
+
+    def _restore(self, db: Session, model: Any, values: Dict[str, Any]) -> Any:
+        return db.merge(self._detached(model, values), load=False)
+
+    def _detached(self, model: Any, values: Dict[str, Any]) -> Any:
+        """由列值快照构造游离状态的实例"""
+        instance = model.__mapper__.class_manager.new_instance()
+        for key, value in copy.deepcopy(values).items():
+            set_committed_value(instance, key, value)
+        make_transient_to_detached(instance)
+        return instance
+
+    def evict(self, table: str, id: Optional[Any]) -> None:
+        """使某条记录（id 为 None 时为整张表）对应的主体失效"""
+        subject_type = self._subject_types.get(table)
+        if subject_type is None:
+            return
+        self.evictions += 1
+        if id is None:
+            self.backend.clear(f"principal:{subject_type}")
+        else:
+            self.backend.delete(self._key(subject_type, id))
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "ttl_seconds": self.ttl,
+            "entries": self.backend.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+analytics_cache = QueryCache(
+    "analytics",
+    ttl=settings.ANALYTICS_CACHE_TTL,
+    max_entries=settings.ANALYTICS_CACHE_MAX_ENTRIES,
+    redis_url=settings.REDIS_URL,
+)
+
+principal_cache = PrincipalCache(
+    ttl=settings.PRINCIPAL_CACHE_TTL,
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+)
+
+_caches = (analytics_cache,)
+
+
+def _collect_cache_metrics():
+    """
+    各缓存的命中/未命中次数（导出指标时读取）。命中率由计数器计算，
+    多进程时各进程的比率不能直接相加，如 rate(cache_requests_total{result="hit"}[5m]) / rate(cache_requests_total[5m])
+    """
+    requests = MetricFamily("cache_requests_total", COUNTER, "缓存查找次数（按缓存和结果）", ("cache", "result"))
+    entries = MetricFamily("cache_entries", GAUGE, "进程内缓存的条目数", ("cache",))
+    for name, cache in (("analytics", analytics_cache), ("principals", principal_cache)):
+        requests.samples[(name, "hit")] = cache.hits
+        requests.samples[(name, "miss")] = cache.misses
+        size = cache.backend.size()
+        if size is not None:
+            entries.samples[(name,)] = size
+    return [requests, entries]
+
+
+metrics.register_collector(_collect_cache_metrics)
+
+
+def invalidate_on_write(*models: Any, cache: QueryCache = analytics_cache) -> None:
+    """登记模型对应的表：这些表的写入提交后，cache 失效"""
+    cache.watch_tables(model.__tablename__ for model in models)
+
+
+# ---------- 会话事件：收集本事务写入的表和记录，提交后统一失效 ----------
+
+def _written_rows(session: Session) -> Set[Tuple[str, Optional[Any]]]:
+    """(表名, id)，批量写入时 id 为 None"""
+    return session.info.setdefault("cache_written_rows", set())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_rows(session, flush_context):
+    rows = _written_rows(session)
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            rows.add((table, getattr(obj, "id", None)))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_writes(orm_execute_state):
+    # query.update() / query.delete() 不经过 flush
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            _written_rows(orm_execute_state.session).add((table.name, None))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    rows = session.info.pop("cache_written_rows", None)
+    if not rows:
+        return
+    tables = {table for table, _ in rows}
+    for cache in _caches:
+        if cache.is_watched(tables):
+            cache.invalidate()
+    for table, id in rows:
+        principal_cache.evict(table, id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_after_rollback(session, previous_transaction):
+    # 保存点回滚不影响外层事务已写入的记录
+    if not session.in_transaction():
+        session.info.pop("cache_written_rows", None)
@@ -1,34 +1,63 @@
 from typing import Generator, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.config.database import get_db
-from app.core.security import verify_token
+from app.config.database import get_async_db, get_db
+from app.core.security import decode_token, has_permission, SubjectType, SUPER_ADMIN_ROLE
 from app.models import User, Admin, RepairWorker
-from app.models.admin import AdminStatus, AdminRole
+from app.models.admin import AdminStatus
 from app.crud.user import user_crud
 from app.crud.admin import admin_crud
 from app.crud.repair_worker import repair_worker_crud
+from app.core.cache import principal_cache
+from app.schemas.token import TokenPayload
 
 # HTTP Bearer 认证
 security = HTTPBearer()
 
 
+def _credentials_exception(detail: str = "无效的认证凭据") -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _decode_claims(credentials: HTTPAuthorizationCredentials, subject_type: SubjectType) -> TokenPayload:
+    """解析令牌声明并校验主体类型"""
+    claims = decode_token(credentials.credentials)
+    if claims is None or claims.typ != subject_type.value:
+        raise _credentials_exception()
+    return claims
+
+
+def _check_token_version(principal, claims: TokenPayload) -> None:
+    """令牌版本落后于主体当前版本（改密、禁用、角色或权限变更后）时拒绝"""
+    if (principal.token_version or 0) != claims.ver:
+        raise _credentials_exception("认证凭据已失效，请重新登录")
+
+
 def get_current_user(
     db: Session = Depends(get_db),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> User:
     """获取当前用户"""
-    token = credentials.credentials
-    user_id = verify_token(token)
-    if user_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="无效的认证凭据",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    user = user_crud.get(db, id=int(user_id))
+    claims = _decode_claims(credentials, SubjectType.USER)
+    return _verify_user(principal_cache.resolve(db, "user", user_crud, claims.sub), claims)
+
+
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_async_db),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> User:
+    """获取当前用户（异步会话，async def 接口使用）"""
+    claims = _decode_claims(credentials, SubjectType.USER)
+    return _verify_user(await principal_cache.resolve_async(db, "user", user_crud, claims.sub), claims)
+
+
+def _verify_user(user: Optional[User], claims: TokenPayload) -> User:
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -41,6 +70,7 @@ def get_current_user(
             detail="用户账户已被禁用"
         )
     
+    _check_token_version(user, claims)
     return user
 
 
@@ -49,16 +79,20 @@ def get_current_admin(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> Admin:
     """获取当前管理员"""
-    token = credentials.credentials
-    admin_id = verify_token(token)
-    if admin_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="无效的认证凭据",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    admin = admin_crud.get(db, id=int(admin_id))
+    claims = _decode_claims(credentials, SubjectType.ADMIN)
+    return _verify_admin(principal_cache.resolve(db, "admin", admin_crud, claims.sub), claims)
+
+
+async def get_current_admin_async(
+    db: AsyncSession = Depends(get_async_db),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> Admin:
+    """获取当前管理员（异步会话，async def 接口使用）"""
+    claims = _decode_claims(credentials, SubjectType.ADMIN)
+    return _verify_admin(await principal_cache.resolve_async(db, "admin", admin_crud, claims.sub), claims)
+
+
+def _verify_admin(admin: Optional[Admin], claims: TokenPayload) -> Admin:
     if admin is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -71,6 +105,7 @@ def get_current_admin(
             detail="管理员账户已被禁用"
         )
     
+    _check_token_version(admin, claims)
     return admin
 
 
@@ -79,16 +114,22 @@ def get_current_worker(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> RepairWorker:
     """获取当前维修工人"""
-    token = credentials.credentials
-    worker_id = verify_token(token)
-    if worker_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="无效的认证凭据",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    worker = repair_worker_crud.get(db, id=int(worker_id))
+    claims = _decode_claims(credentials, SubjectType.WORKER)
+    return _verify_worker(principal_cache.resolve(db, "worker", repair_worker_crud, claims.sub), claims)
+
+
+async def get_current_worker_async(
+    db: AsyncSession = Depends(get_async_db),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> RepairWorker:
+    """获取当前维修工人（异步会话，async def 接口使用）"""
+    claims = _decode_claims(credentials, SubjectType.WORKER)
+    return _verify_worker(
+        await principal_cache.resolve_async(db, "worker", repair_worker_crud, claims.sub), claims
+    )
+
+
+def _verify_worker(worker: Optional[RepairWorker], claims: TokenPayload) -> RepairWorker:
     if worker is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -101,6 +142,7 @@ def get_current_worker(
             detail="维修工人账户已被禁用"
         )
     
+    _check_token_version(worker, claims)
     return worker
 
 
@@ -125,90 +167,112 @@ def get_current_active_worker(
     return current_worker
 
 
+def get_admin_claims(
+    db: Session = Depends(get_db),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> TokenPayload:
+    """
+    仅凭令牌声明认证管理员，不加载管理员对象。
+    令牌版本从主体缓存校验，缓存命中时不访问数据库；
+    禁用、改密、角色或权限变更都会递增版本号，使旧令牌失效。
+    """
+    claims = _decode_claims(credentials, SubjectType.ADMIN)
+    if principal_cache.token_version(db, "admin", admin_crud, claims.sub) != claims.ver:
+        raise _credentials_exception("认证凭据已失效，请重新登录")
+    return claims
+
+
+async def get_admin_claims_async(
+    db: AsyncSession = Depends(get_async_db),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> TokenPayload:
+    """get_admin_claims 的异步版本"""
+    claims = _decode_claims(credentials, SubjectType.ADMIN)
+    if await principal_cache.token_version_async(db, "admin", admin_crud, claims.sub) != claims.ver:
+        raise _credentials_exception("认证凭据已失效，请重新登录")
+    return claims
+
+
 def get_current_super_admin(
-    current_admin: Admin = Depends(get_current_admin),
-) -> Admin:
-    """获取当前超级管理员"""
-    if current_admin.role != AdminRole.SUPER_ADMIN:
+    claims: TokenPayload = Depends(get_admin_claims),
+) -> TokenPayload:
+    """超级管理员认证，仅凭令牌中的角色判断，不加载管理员对象"""
+    if claims.role != SUPER_ADMIN_ROLE:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="需要超级管理员权限"
         )
-    return current_admin
+    return claims
 
 
 def check_admin_permission(permission: str):
-    """检查管理员权限的依赖工厂函数"""
+    """检查管理员权限的依赖工厂函数，仅凭令牌中的角色和权限位图判断，不加载管理员对象"""
     def permission_checker(
-        current_admin: Admin = Depends(get_current_active_admin),
-    ) -> Admin:
-        # 超级管理员拥有所有权限
-        if current_admin.role == AdminRole.SUPER_ADMIN:
-            return current_admin
-        
-        # 检查特定权限
-        if not admin_crud.has_permission(current_admin, permission):
+        claims: TokenPayload = Depends(get_admin_claims),
+    ) -> TokenPayload:
+        # 超级管理员拥有所有权限（见 has_permission）
+        if not has_permission(claims, permission):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"缺少必要权限: {permission}"
             )
         
-        return current_admin
+        return claims
     
     return permission_checker
 
 
 def get_admin_with_user_management_permission(
-    current_admin: Admin = Depends(check_admin_permission("user_management")),
-) -> Admin:
+    claims: TokenPayload = Depends(check_admin_permission("user_management")),
+) -> TokenPayload:
     """获取具有用户管理权限的管理员"""
-    return current_admin
+    return claims
 
 
 def get_admin_with_order_management_permission(
-    current_admin: Admin = Depends(check_admin_permission("order_management")),
-) -> Admin:
+    claims: TokenPayload = Depends(check_admin_permission("order_management")),
+) -> TokenPayload:
     """获取具有订单管理权限的管理员"""
-    return current_admin
+    return claims
 
 
 def get_admin_with_worker_management_permission(
-    current_admin: Admin = Depends(check_admin_permission("worker_management")),
-) -> Admin:
+    claims: TokenPayload = Depends(check_admin_permission("worker_management")),
+) -> TokenPayload:
     """获取具有工人管理权限的管理员"""
-    return current_admin
+    return claims
 
 
 def get_admin_with_material_management_permission(
-    current_admin: Admin = Depends(check_admin_permission("material_management")),
-) -> Admin:
+    claims: TokenPayload = Depends(check_admin_permission("material_management")),
+) -> TokenPayload:
     """获取具有材料管理权限的管理员"""
-    return current_admin
+    return claims
 
 
 def get_admin_with_service_management_permission(
-    current_admin: Admin = Depends(check_admin_permission("service_management")),
-) -> Admin:
+    claims: TokenPayload = Depends(check_admin_permission("service_management")),
+) -> TokenPayload:
     """获取具有服务管理权限的管理员"""
-    return current_admin
+    return claims
 
 
 def get_admin_with_analytics_permission(
-    current_admin: Admin = Depends(check_admin_permission("analytics")),
-) -> Admin:
+    claims: TokenPayload = Depends(check_admin_permission("analytics")),
+) -> TokenPayload:
     """获取具有分析权限的管理员"""
-    return current_admin
+    return claims
 
 
 def get_admin_with_feedback_management_permission(
-    current_admin: Admin = Depends(check_admin_permission("feedback_management")),
-) -> Admin:
+    claims: TokenPayload = Depends(check_admin_permission("feedback_management")),
+) -> TokenPayload:
     """获取具有反馈管理权限的管理员"""
-    return current_admin
+    return claims
 
 
 def get_admin_with_wage_management_permission(
-    current_admin: Admin = Depends(check_admin_permission("wage_management")),
-) -> Admin:
+    claims: TokenPayload = Depends(check_admin_permission("wage_management")),
+) -> TokenPayload:
     """获取具有工资管理权限的管理员"""
-    return current_admin 
\ No newline at end of file
+    return claims 
\ No newline at end of file
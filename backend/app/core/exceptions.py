@@ -48,6 +48,14 @@ class BusinessLogicException(Exception):
         super().__init__(self.message)
 
 
+class ServiceUnavailableException(Exception):
+    """服务繁忙异常（资源池已满等），返回 503"""
+    def __init__(self, message: str = "服务繁忙，请稍后重试", retry_after: int = 1):
+        self.message = message
+        self.retry_after = retry_after
+        super().__init__(self.message)
+
+
 def setup_exception_handlers(app: FastAPI):
     """设置全局异常处理器"""
     
@@ -261,6 +269,25 @@ def setup_exception_handlers(app: FastAPI):
             }
         )
     
+    @app.exception_handler(ServiceUnavailableException)
+    async def service_unavailable_exception_handler(request: Request, exc: ServiceUnavailableException):
+        """服务繁忙异常处理器"""
+        client_ip = request.client.host
+        logger.warning(
+            f"服务繁忙 - 路径: {request.url.path}, IP: {client_ip}, 消息: {exc.message}"
+        )
+        
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": str(exc.retry_after)},
+            content={
+                "error": True,
+                "message": exc.message,
+                "status_code": 503,
+                "path": str(request.url.path)
+            }
+        )
+    
     @app.exception_handler(Exception)
     async def general_exception_handler(request: Request, exc: Exception):
         """通用异常处理器"""
@@ -0,0 +1,501 @@
+"""
+日志索引
+为 access.log、security.log、error.log 及其 .1-.N 轮转文件建立磁盘上的倒排索引，
+按请求ID、IP、状态码、路径和时间检索，不再线性扫描日志文件。
+- 每个日志一个 SQLite 索引库（LOG_INDEX_DIR/<日志名>.db），每个物理文件是一个段，
+  段以文件第一行的摘要标识：轮转只改文件名，段和已建立的索引保持不变；
+- 段记录已索引到的字节位置（解压后的位置），当前文件只增量索引新写入的部分，
+  轮转出去的文件补齐末尾后标记为已封存；轮转文件压缩为 .gz 后段标识不变，读取记录时边解压边定位；
+- 每个条目保存所在段、偏移和长度以及提取出的字段，(字段, 时间) 上的 B 树索引即倒排表，
+  时间范围查询直接在时间索引上按范围扫描；
+- 后台线程定期同步，日志轮转时立即同步；查询前也会同步一次当前文件新增的部分。
+访问日志为每行一个 JSON；其他日志为文本格式，不以时间戳开头的行（异常堆栈）属于上一条记录。
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.config.settings import settings
+from app.config.logging import add_rollover_listener, get_logger
+from app.core import log_reader
+
+try:
+    import orjson
+except ImportError:  # 未安装时退回标准库 json
+    orjson = None
+
+logger = get_logger("app.log_index")
+
+LOG_DIR = Path("logs")
+# 建索引时每次读取的字节数
+SCAN_BLOCK_SIZE = 1024 * 1024
+# 查询结果中单条记录返回的最大字节数
+MAX_ENTRY_BYTES = 64 * 1024
+# 字段值保存的最大长度
+MAX_FIELD_LENGTH = 512
+# 时间以 YYYYMMDDhhmmss 整数保存，比文本少占约三分之二的空间，每个字段索引中都有一份
+TIME_KEY_FORMAT = "%Y%m%d%H%M%S"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    fingerprint TEXT NOT NULL UNIQUE,
+    indexed_bytes INTEGER NOT NULL DEFAULT 0,
+    sealed INTEGER NOT NULL DEFAULT 0,
+    entries INTEGER NOT NULL DEFAULT 0,
+    pending INTEGER NOT NULL DEFAULT 0,
+    first_ts TEXT,
+    last_ts TEXT
+);
+CREATE TABLE IF NOT EXISTS entries (
+    segment_id INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    ts INTEGER,
+    level TEXT,
+    request_id TEXT,
+    ip TEXT,
+    status INTEGER,
+    path TEXT,
+    PRIMARY KEY (segment_id, offset)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_ts ON entries (ts);
+CREATE INDEX IF NOT EXISTS entries_request_id ON entries (request_id) WHERE request_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS entries_ip ON entries (ip, ts) WHERE ip IS NOT NULL;
+CREATE INDEX IF NOT EXISTS entries_status ON entries (status, ts) WHERE status IS NOT NULL;
+CREATE INDEX IF NOT EXISTS entries_path ON entries (path, ts) WHERE path IS NOT NULL;
+"""
+
+# 一条记录的第一行：文本日志以时间戳开头，访问日志为 JSON
+_ENTRY_START = re.compile(rb"\d{4}-\d\d-\d\d \d\d:\d\d:\d\d|\{")
+_TEXT_HEADER = re.compile(r"(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d) - \S+ - (\w+) - ")
+_TEXT_IP = re.compile(r"\bIP: ([^,\s]+)")
+_TEXT_PATH = re.compile(r"(?:Path|路径): ([^,\s]+)")
+_TEXT_STATUS = re.compile(r"状态码: (\d{3})")
+_REQUEST_ID = re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b")
+
+Fields = Tuple[Optional[str], Optional[str], Optional[str], Optional[str], Optional[int], Optional[str]]
+
+
+def _loads(data: bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _text(value: Any) -> Optional[str]:
+    return value[:MAX_FIELD_LENGTH] if isinstance(value, str) and value else None
+
+
+def parse_entry(line: bytes) -> Fields:
+    """从一条记录的第一行提取 (时间, 级别, 请求ID, IP, 状态码, 路径)"""
+    if line.startswith(b"{"):
+        try:
+            document = _loads(line)
+        except ValueError:
+            document = None
+        if isinstance(document, dict):
+            status = document.get("status_code")
+            return (
+                _text(document.get("timestamp")),
+                _text(document.get("level")),
+                _text(document.get("request_id")),
+                _text(document.get("client_ip")),
+                status if isinstance(status, int) else None,
+                _text(document.get("path")),
+            )
+    text = line.decode("utf-8", errors="replace")
+    header = _TEXT_HEADER.match(text)
+    ip = _TEXT_IP.search(text)
+    path = _TEXT_PATH.search(text)
+    status = _TEXT_STATUS.search(text)
+    request_id = _REQUEST_ID.search(text)
+    return (
+        header.group(1) if header else None,
+        header.group(2) if header else None,
+        request_id.group(0) if request_id else None,
+        _text(ip.group(1)) if ip else None,
+        int(status.group(1)) if status else None,
+        _text(path.group(1)) if path else None,
+    )
+
+
+def time_key(timestamp: Optional[str]) -> Optional[int]:
+    """"YYYY-MM-DD HH:MM:SS" 转为 YYYYMMDDhhmmss 整数"""
+    if not timestamp or len(timestamp) < 19:
+        return None
+    try:
+        return int(timestamp[0:4] + timestamp[5:7] + timestamp[8:10] + timestamp[11:13] + timestamp[14:16] + timestamp[17:19])
+    except ValueError:
+        return None
+
+
+def time_text(key: Optional[int]) -> Optional[str]:
+    if key is None:
+        return None
+    s = f"{key:014d}"
+    return f"{s[0:4]}-{s[4:6]}-{s[6:8]} {s[8:10]}:{s[10:12]}:{s[12:14]}"
+
+
+def fingerprint(path: Path) -> Optional[str]:
+    """文件第一行的摘要，用于在轮转改名后识别同一个文件；第一行尚未写完时返回 None"""
+    try:
+        with log_reader.open_log(path) as f:
+            head = f.read(4096)
+    except (OSError, EOFError):
+        return None
+    end = head.find(b"\n")
+    if end < 0:
+        return None
+    return hashlib.sha1(head[:end + 1]).hexdigest()
+
+
+class EntryScanner:
+    """
+    从 start 开始逐条读取记录，产生 (偏移, 长度, 第一行, 是否完整)。
+    未封存的文件中最后一条记录后面可能还会追加堆栈等后续行，作为不完整的记录产生，
+    end 停在它的起点，下次同步时重新读取并覆盖；没有换行的最后一行尚未写完，不读取
+    """
+
+    def __init__(self, f, start: int, sealed: bool):
+        self.f = f
+        self.start = start
+        self.sealed = sealed
+        self.end = start
+
+    def __iter__(self) -> Iterator[Tuple[int, int, bytes, bool]]:
+        f = self.f
+        f.seek(self.start)
+        offset = self.start  # buffer[0] 在文件中的位置
+        buffer = b""
+        entry_start: Optional[int] = None
+        entry_head = b""
+        while True:
+            block = f.read(SCAN_BLOCK_SIZE)
+            buffer += block
+            if not block and self.sealed and buffer and not buffer.endswith(b"\n"):
+                # 已封存文件的最后一行没有换行
+                buffer += b"\n"
+            position = 0
+            while True:
+                newline = buffer.find(b"\n", position)
+                if newline < 0:
+                    break
+                line_start = offset + position
+                if entry_start is None or _ENTRY_START.match(buffer, position):
+                    if entry_start is not None:
+                        yield entry_start, line_start - entry_start, entry_head, True
+                    entry_start = line_start
+                    entry_head = buffer[position:newline + 1]
+                position = newline + 1
+            buffer = buffer[position:]
+            offset += position
+            if not block:
+                break
+        self.end = offset
+        if entry_start is not None:
+            yield entry_start, offset - entry_start, entry_head, self.sealed
+            if not self.sealed:
+                self.end = entry_start
+
+
+class LogIndex:
+    """一个日志文件（含轮转文件）的索引"""
+
+    def __init__(self, name: str, log_dir: Path, index_dir: Path, max_rotations: int):
+        self.name = name
+        self.log_dir = log_dir
+        self.db_path = index_dir / f"{name}.db"
+        self.max_rotations = max_rotations
+        self._lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if not self._schema_ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._schema_ready = True
+        return conn
+
+    def files(self) -> List[Path]:
+        """当前存在的日志文件，从最旧的轮转文件到当前文件；轮转文件可能已压缩为 .gz"""
+        files = []
+        for i in range(self.max_rotations, 0, -1):
+            path = self.log_dir / f"{self.name}.{i}"
+            if not path.is_file():
+                path = self.log_dir / f"{self.name}.{i}.gz"
+            if path.is_file():
+                files.append(path)
+        if (self.log_dir / self.name).is_file():
+            files.append(self.log_dir / self.name)
+        return files
+
+    def sync(self) -> Dict[str, Path]:
+        """增量索引所有文件，删除已不存在的文件的索引；返回 {段标识: 当前文件路径}"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                return self._sync(conn)
+            finally:
+                conn.close()
+
+    def _sync(self, conn: sqlite3.Connection) -> Dict[str, Path]:
+        active = self.log_dir / self.name
+        current: Dict[str, Path] = {}
+        for path in self.files():
+            mark = fingerprint(path)
+            if mark is None or mark in current:
+                continue
+            current[mark] = path
+            sealed = path != active
+            row = conn.execute(
+                "SELECT indexed_bytes, sealed FROM segments WHERE fingerprint = ?", (mark,)
+            ).fetchone()
+            # 已封存的段不再变化；压缩文件的大小不是内容的大小，未封存时补齐后封存
+            if row is not None and (row[1] or (path.suffix != ".gz" and row[0] >= path.stat().st_size)):
+                continue
+            self._index_file(conn, path, mark, sealed)
+
+        stale = [
+            (segment_id,) for segment_id, mark in conn.execute("SELECT id, fingerprint FROM segments")
+            if mark not in current
+        ]
+        if stale:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("DELETE FROM entries WHERE segment_id = ?", stale)
+            conn.executemany("DELETE FROM segments WHERE id = ?", stale)
+            conn.execute("COMMIT")
+        return current
+
+    def _index_file(self, conn: sqlite3.Connection, path: Path, mark: str, sealed: bool) -> None:
+        started = time.perf_counter()
+        # 写锁期间重新读取进度，多个进程同时同步时只有一个进程索引同一段内容
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT OR IGNORE INTO segments (fingerprint) VALUES (?)", (mark,))
+            segment_id, start, first_ts = conn.execute(
+                "SELECT id, indexed_bytes, first_ts FROM segments WHERE fingerprint = ?", (mark,)
+            ).fetchone()
+            with log_reader.open_log(path) as f:
+                scanner = EntryScanner(f, start, sealed)
+                count = 0
+                pending = 0
+                last_ts = None
+                batch = []
+                for offset, length, head, complete in scanner:
+                    fields = parse_entry(head)
+                    batch.append((segment_id, offset, length, time_key(fields[0]), *fields[1:]))
+                    count += 1
+                    pending = int(not complete)
+                    if fields[0]:
+                        first_ts = first_ts or fields[0]
+                        last_ts = fields[0]
+                    if len(batch) >= 5000:
+                        conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                        batch = []
+                if batch:
+                    conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+            # 上次的不完整记录已被本次重新读取的结果覆盖（pending 为上次的值）
+            conn.execute(
+                "UPDATE segments SET indexed_bytes = ?, sealed = ?, entries = entries - pending + ?, pending = ?, "
+                "first_ts = ?, last_ts = COALESCE(?, last_ts) WHERE id = ?",
+                (scanner.end, int(sealed), count, pending, first_ts, last_ts, segment_id),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if count >= 10000:
+            logger.info(
+                f"已索引日志 {path.name}: {count} 条, 耗时 {time.perf_counter() - started:.2f} 秒"
+            )
+
+    def query(
+        self,
+        *,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        request_id: Optional[str] = None,
+        ip: Optional[str] = None,
+        status: Optional[int] = None,
+        path: Optional[str] = None,
+        level: Optional[str] = None,
+        limit: int = 100,
+    ) -> Dict[str, Any]:
+        """
+        按条件检索，返回最新的 limit 条（按时间顺序排列）。
+        path 为路径前缀；start/end 为闭区间
+        """
+        started = time.perf_counter()
+        current = self.sync()
+        conditions = []
+        params: List[Any] = []
+        if start is not None:
+            conditions.append("ts >= ?")
+            params.append(int(start.strftime(TIME_KEY_FORMAT)))
+        if end is not None:
+            conditions.append("ts <= ?")
+            params.append(int(end.strftime(TIME_KEY_FORMAT)))
+        if request_id:
+            conditions.append("request_id = ?")
+            params.append(request_id)
+        if ip:
+            conditions.append("ip = ?")
+            params.append(ip)
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        if path:
+            # 前缀匹配写成范围条件，可以使用 (path, ts) 索引
+            conditions.append("path >= ? AND path < ?")
+            params.extend([path, path + "\U0010ffff"])
+        if level:
+            conditions.append("level = ?")
+            params.append(level.upper())
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self._lock:
+            conn = self._connect()
+            try:
+                segments = {
+                    segment_id: (mark, entries, first_ts, last_ts)
+                    for segment_id, mark, entries, first_ts, last_ts in conn.execute(
+                        "SELECT id, fingerprint, entries, first_ts, last_ts FROM segments"
+                    )
+                }
+                rows = conn.execute(
+                    "SELECT segment_id, offset, length, ts, level, request_id, ip, status, path FROM entries "
+                    f"{where} ORDER BY ts DESC, segment_id DESC, offset DESC LIMIT ?",
+                    (*params, limit + 1),
+                ).fetchall()
+            finally:
+                conn.close()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        texts = self._read_entries(rows, segments, current)
+        entries = []
+        for row, text in zip(reversed(rows), reversed(texts)):
+            segment_id, offset, length, ts, entry_level, entry_request_id, entry_ip, entry_status, entry_path = row
+            file_path = current.get(segments[segment_id][0])
+            entries.append({
+                "file": file_path.name if file_path else None,
+                "offset": offset,
+                "timestamp": time_text(ts),
+                "level": entry_level,
+                "request_id": entry_request_id,
+                "ip": entry_ip,
+                "status": entry_status,
+                "path": entry_path,
+                "text": text,
+            })
+        files = []
+        for mark, entries_count, first_ts, last_ts in segments.values():
+            file_path = current.get(mark)
+            if file_path is not None:
+                files.append({"file": file_path.name, "entries": entries_count, "first": first_ts, "last": last_ts})
+        return {
+            "log": self.name,
+            "count": len(entries),
+            "has_more": has_more,
+            "entries": entries,
+            "files": sorted(files, key=lambda item: item["first"] or ""),
+            "took_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    def _read_entries(self, rows, segments, current: Dict[str, Path]) -> List[Optional[str]]:
+        """按段打开文件读取记录原文（每个文件只打开一次）"""
+        texts: List[Optional[str]] = [None] * len(rows)
+        by_segment: Dict[int, List[int]] = {}
+        for i, row in enumerate(rows):
+            by_segment.setdefault(row[0], []).append(i)
+        for segment_id, indexes in by_segment.items():
+            file_path = current.get(segments[segment_id][0])
+            if file_path is None:
+                continue
+            try:
+                with log_reader.open_log(file_path) as f:
+                    for i in sorted(indexes, key=lambda item: rows[item][1]):
+                        f.seek(rows[i][1])
+                        data = f.read(min(rows[i][2], MAX_ENTRY_BYTES))
+                        texts[i] = data.decode("utf-8", errors="replace").rstrip("\r\n")
+            except OSError as e:
+                logger.warning(f"读取日志记录失败 {file_path}: {e}")
+        return texts
+
+
+class LogIndexer:
+    """管理各日志的索引，后台线程定期增量同步，日志轮转时立即同步"""
+
+    def __init__(
+        self,
+        names: List[str],
+        log_dir: Path,
+        index_dir: Path,
+        max_rotations: int,
+        sync_seconds: float,
+        enabled: bool = True,
+    ):
+        self.enabled = enabled
+        self.indexes = {name: LogIndex(name, log_dir, index_dir, max_rotations) for name in names}
+        self.sync_seconds = sync_seconds
+        self._wake = threading.Event()
+        self._stopping = False
+        self._listening = False
+        self._thread: Optional[threading.Thread] = None
+
+    def get(self, name: str) -> Optional[LogIndex]:
+        """日志的索引；未启用或该日志不在 LOG_INDEX_FILES 中时返回 None"""
+        return self.indexes.get(name) if self.enabled else None
+
+    def sync_all(self) -> None:
+        for index in self.indexes.values():
+            try:
+                index.sync()
+            except Exception as e:
+                logger.warning(f"日志索引同步失败 {index.name}: {e}")
+
+    def on_rollover(self, filename: str) -> None:
+        if Path(filename).name in self.indexes:
+            self._wake.set()
+
+    def start(self) -> None:
+        if not self.enabled or self._thread is not None:
+            return
+        if not self._listening:
+            add_rollover_listener(self.on_rollover)
+            self._listening = True
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="log-indexer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self.sync_all()
+            self._wake.wait(self.sync_seconds)
+            self._wake.clear()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self._thread = None
+
+
+log_indexer = LogIndexer(
+    settings.LOG_INDEX_FILES,
+    LOG_DIR,
+    Path(settings.LOG_INDEX_DIR),
+    settings.LOG_INDEX_MAX_ROTATIONS,
+    settings.LOG_INDEX_SYNC_SECONDS,
+    settings.LOG_INDEX_ENABLED,
+)
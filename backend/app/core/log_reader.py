@@ -0,0 +1,203 @@
+"""
+日志文件读取
+从文件末尾按块向前读取，只读取返回结果所需的部分：
+- tail_lines：最后 N 行；
+- search_lines：最后 N 条匹配行，关键词编译为字节匹配器，整块不含关键词时不拆分行，找够 N 条即停止。
+每次只在内存中保留一个块和已收集的结果，与文件大小无关；超长的行只保留末尾 MAX_LINE_BYTES 字节。
+压缩的轮转文件（.gz）不能从末尾向前读，改为从头解压一遍，只保留最后 N 条结果。
+"""
+import gzip
+import struct
+from collections import deque
+from pathlib import Path
+from typing import Iterator, List, Optional, Union
+
+# 每次向前读取的字节数
+BLOCK_SIZE = 64 * 1024
+# 单行保留的最大字节数（没有换行的超长内容只保留末尾部分）
+MAX_LINE_BYTES = 1024 * 1024
+
+PathLike = Union[str, Path]
+
+
+class LineMatcher:
+    """
+    编译好的关键词匹配器：按字面匹配，忽略 ASCII 字母的大小写（中文不受影响）。
+    直接在文件的原始字节上匹配，只有命中的行才解码；
+    bytes.lower() 加子串查找比 re.IGNORECASE 的正则快数倍，关键词不含字母时不做转换
+    """
+
+    __slots__ = ("needle", "_fold")
+
+    def __init__(self, search: str):
+        needle = search.encode("utf-8")
+        self._fold = needle.lower() != needle.upper()
+        self.needle = needle.lower()
+
+    def search(self, data: bytes) -> bool:
+        return self.needle in (data.lower() if self._fold else data)
+
+
+def compile_matcher(search: str) -> LineMatcher:
+    return LineMatcher(search)
+
+
+def _is_compressed(path: PathLike) -> bool:
+    return str(path).endswith(".gz")
+
+
+def open_log(path: PathLike):
+    """以二进制方式打开日志文件，压缩的轮转文件（.gz）读取时解压"""
+    if _is_compressed(path):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def raw_size(path: PathLike) -> int:
+    """日志内容的大小：.gz 文件为解压后的大小（gzip 尾部记录的长度，按 4 GiB 取模）"""
+    if not _is_compressed(path):
+        return Path(path).stat().st_size
+    with open(path, "rb") as f:
+        f.seek(-4, 2)
+        return struct.unpack("<I", f.read(4))[0]
+
+
+def iter_reverse_chunks(
+    f,
+    block_size: int = BLOCK_SIZE,
+    max_line_bytes: int = MAX_LINE_BYTES,
+    end: Optional[int] = None,
+) -> Iterator[bytes]:
+    """
+    从文件末尾（或 end 位置）向前，逐块返回由完整行组成的字节串（每行带换行符，最后一行可能没有）。
+    块的起点对齐到换行符之后，多字节字符不会被截断
+    """
+    f.seek(0, 2)
+    position = f.tell() if end is None else min(end, f.tell())
+    # 上一次读到的块中第一行（含换行）的前半部分位于更前面，与本次读取的内容拼接成完整的行
+    carry = b""
+    while position > 0:
+        size = min(block_size, position)
+        position -= size
+        f.seek(position)
+        data = f.read(size) + carry
+        if position == 0:
+            yield data
+            return
+        cut = data.find(b"\n")
+        if cut < 0 or cut == len(data) - 1:
+            carry = data[-max_line_bytes:]
+            continue
+        carry = data[:cut + 1][-max_line_bytes:]
+        yield data[cut + 1:]
+
+
+def iter_forward_chunks(
+    f,
+    block_size: int = BLOCK_SIZE,
+    max_line_bytes: int = MAX_LINE_BYTES,
+    end: Optional[int] = None,
+) -> Iterator[bytes]:
+    """从文件开头（到 end 位置）逐块返回由完整行组成的字节串，用于不能随机读取的 .gz 文件"""
+    remaining = end
+    carry = b""
+    while remaining is None or remaining > 0:
+        size = block_size if remaining is None else min(block_size, remaining)
+        data = f.read(size)
+        if not data:
+            break
+        if remaining is not None:
+            remaining -= len(data)
+        data = carry + data
+        cut = data.rfind(b"\n")
+        if cut < 0:
+            carry = data[-max_line_bytes:]
+            continue
+        carry = data[cut + 1:][-max_line_bytes:]
+        yield data[:cut + 1]
+    if carry:
+        yield carry
+
+
+def _lines_reversed(chunk: bytes) -> Iterator[bytes]:
+    """块中的行（带换行符），从后向前"""
+    parts = chunk.split(b"\n")
+    last = parts.pop()
+    if last:
+        yield last
+    for part in reversed(parts):
+        yield part + b"\n"
+
+
+def _lines(chunk: bytes) -> Iterator[bytes]:
+    """块中的行（带换行符），按文件中的顺序"""
+    parts = chunk.split(b"\n")
+    last = parts.pop()
+    for part in parts:
+        yield part + b"\n"
+    if last:
+        yield last
+
+
+def _decode(line: bytes) -> str:
+    # 与文本模式 readlines() 的结果一致：保留换行，\r\n 按 \n 处理
+    if line.endswith(b"\n"):
+        return line[:-1].rstrip(b"\r").decode("utf-8", errors="replace") + "\n"
+    return line.decode("utf-8", errors="replace")
+
+
+def tail_lines(path: PathLike, count: int, block_size: int = BLOCK_SIZE, end: Optional[int] = None) -> List[str]:
+    """文件最后 count 行（按文件中的顺序）；给出 end 时只读取该位置之前的内容"""
+    if _is_compressed(path):
+        tail: deque = deque(maxlen=count)
+        with open_log(path) as f:
+            for chunk in iter_forward_chunks(f, block_size, end=end):
+                tail.extend(_lines(chunk))
+        return [_decode(item) for item in tail]
+    collected: List[bytes] = []
+    with open(path, "rb") as f:
+        for chunk in iter_reverse_chunks(f, block_size, end=end):
+            for line in _lines_reversed(chunk):
+                collected.append(line)
+                if len(collected) >= count:
+                    return [_decode(item) for item in reversed(collected)]
+    return [_decode(item) for item in reversed(collected)]
+
+
+def search_lines(
+    path: PathLike,
+    search: Union[str, LineMatcher],
+    limit: int,
+    block_size: int = BLOCK_SIZE,
+    end: Optional[int] = None,
+) -> List[str]:
+    """
+    文件中最后 limit 条包含关键词的行（按文件中的顺序），从末尾开始查找，找够即停止。
+    search 可以是关键词或 compile_matcher 编译好的匹配器；给出 end 时只读取该位置之前的内容
+    """
+    matcher = compile_matcher(search) if isinstance(search, str) else search
+    if _is_compressed(path):
+        matched: deque = deque(maxlen=limit)
+        with open_log(path) as f:
+            for chunk in iter_forward_chunks(f, block_size, end=end):
+                if matcher.search(chunk):
+                    matched.extend(line for line in _lines(chunk) if matcher.search(line))
+        return [_decode(item) for item in matched]
+    collected: List[bytes] = []
+    with open(path, "rb") as f:
+        for chunk in iter_reverse_chunks(f, block_size, end=end):
+            if not matcher.search(chunk):
+                continue
+            for line in _lines_reversed(chunk):
+                if matcher.search(line):
+                    collected.append(line)
+                    if len(collected) >= limit:
+                        return [_decode(item) for item in reversed(collected)]
+    return [_decode(item) for item in reversed(collected)]
+
+
+def read_lines(path: PathLike, lines: int, search: Optional[str] = None) -> List[str]:
+    """最后 lines 行；给出 search 时为最后 lines 条匹配行"""
+    if search:
+        return search_lines(path, search, lines)
+    return tail_lines(path, lines)
@@ -0,0 +1,263 @@
+"""
+日志实时推送
+/logs/stream/{filename} 使用的文件跟随器：每个进程中每个日志文件只有一个跟随器，
+所有订阅者（管理员打开的页面）共享同一次读取，新写入的行按各订阅者的过滤条件分发。
+- 每 LOG_STREAM_POLL_SECONDS 秒检查一次文件大小和 inode（标准库没有跨平台的文件变更通知），只读取新增的字节；
+- 轮转时原文件被改名，已打开的句柄仍指向它：先读完剩余内容，再打开新文件从头读取；文件被截断时从头读取；
+- 每个订阅者有一个有界队列，客户端读得慢时丢弃新的行并计数，不影响其他订阅者；
+- 最后一个订阅者断开后停止跟随并关闭文件。
+"""
+import asyncio
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.config.settings import settings
+from app.config.logging import get_logger
+from app.core import log_reader
+
+logger = get_logger("app.log_stream")
+
+# 每次轮询最多读取的字节数，文件增长更快时下一次轮询立即继续读取
+READ_LIMIT = 4 * 1024 * 1024
+
+
+class Subscription:
+    """一个连接的订阅：过滤条件和待发送的事件队列"""
+
+    def __init__(self, follower: "FileFollower", matcher: Optional[log_reader.LineMatcher], queue_size: int):
+        self.follower = follower
+        self.matcher = matcher
+        # 元素为 (事件名, 数据)：("lines", [行, ...]) 或 ("rotate", 文件名)
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        # 因队列已满而丢弃的行数，发送下一批时通知客户端
+        self.dropped = 0
+
+    def offer(self, lines: List[bytes], chunk: bytes) -> None:
+        if self.matcher is not None:
+            if not self.matcher.search(chunk):
+                return
+            lines = [line for line in lines if self.matcher.search(line)]
+        if not lines:
+            return
+        try:
+            self.queue.put_nowait(("lines", [line.decode("utf-8", errors="replace") for line in lines]))
+        except asyncio.QueueFull:
+            self.dropped += len(lines)
+
+    def notify(self, event: str, data: str) -> None:
+        try:
+            self.queue.put_nowait((event, data))
+        except asyncio.QueueFull:
+            pass
+
+
+class FileFollower:
+    """跟随一个日志文件，把新写入的完整行分发给所有订阅者"""
+
+    def __init__(self, path: Path, poll_seconds: float):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self.subscriptions: Set[Subscription] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._file = None
+        self._inode: Optional[int] = None
+        # 已从文件读取到的位置；_partial 为末尾尚未写完的一行
+        self._position = 0
+        self._partial = b""
+        # 从超长的一行中间开始跟随时，丢弃第一个换行之前的内容
+        self._skip_to_newline = False
+        # 已分发给订阅者的内容在当前文件中的结束位置（只在事件循环中更新）
+        self.dispatched = 0
+
+    async def start(self) -> None:
+        if self._task is None:
+            await run_in_threadpool(self._open, True)
+            self.dispatched = self._position
+            self._task = asyncio.create_task(self._run(), name=f"log-follower:{self.path.name}")
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._close()
+
+    def _open(self, at_end: bool) -> None:
+        self._close()
+        try:
+            self._file = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        stat = os.fstat(self._file.fileno())
+        self._inode = stat.st_ino
+        self._position = stat.st_size if at_end else 0
+        self._file.seek(self._position)
+        self._partial = b""
+        self._skip_to_newline = False
+        if at_end and self._position > 0:
+            # 最后一行还没写完时从这一行的开头跟随
+            start = max(0, self._position - log_reader.BLOCK_SIZE)
+            self._file.seek(start)
+            tail = self._file.read(self._position - start)
+            newline = tail.rfind(b"\n")
+            if newline >= 0 or start == 0:
+                self._position = start + newline + 1
+            else:
+                self._skip_to_newline = True
+            self._file.seek(self._position)
+
+    def _close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _read(self) -> bytes:
+        """从当前句柄读取新增内容，返回若干以换行结尾的完整行"""
+        if self._file is None:
+            return b""
+        data = self._file.read(READ_LIMIT)
+        if not data:
+            return b""
+        self._position += len(data)
+        if self._skip_to_newline:
+            newline = data.find(b"\n")
+            if newline < 0:
+                return b""
+            data = data[newline + 1:]
+            self._skip_to_newline = False
+        data = self._partial + data
+        end = data.rfind(b"\n") + 1
+        self._partial = data[end:]
+        if len(self._partial) > log_reader.MAX_LINE_BYTES:
+            # 没有换行的超长内容按一行发出
+            self._partial = b""
+            return data + b"\n"
+        return data[:end]
+
+    def _poll(self) -> Tuple[bytes, bool, bool, int]:
+        """在线程池中执行：返回 (新增的完整行, 是否发生轮转, 是否还有未读完的内容, 这些行的结束位置)"""
+        chunk = self._read()
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return chunk, False, False, self._position - len(self._partial)
+        rotated = False
+        if self._file is None or stat.st_ino != self._inode:
+            # 轮转：旧文件的剩余内容已在上面读完（句柄仍指向改名后的文件）
+            if self._partial:
+                chunk += self._partial + b"\n"
+            self._open(False)
+            chunk += self._read()
+            rotated = True
+        elif stat.st_size < self._position:
+            # 文件被截断
+            self._file.seek(0)
+            self._position = 0
+            self._partial = b""
+            chunk += self._read()
+            rotated = True
+        return chunk, rotated, stat.st_size > self._position, self._position - len(self._partial)
+
+    async def _run(self) -> None:
+        delay = self.poll_seconds
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                chunk, rotated, more, offset = await run_in_threadpool(self._poll)
+            except Exception as e:
+                logger.warning(f"跟随日志文件失败 {self.path}: {e}")
+                delay = self.poll_seconds
+                continue
+            if rotated:
+                for subscription in self.subscriptions:
+                    subscription.notify("rotate", self.path.name)
+            if chunk:
+                lines = [line.rstrip(b"\r") for line in chunk[:-1].split(b"\n")]
+                for subscription in self.subscriptions:
+                    subscription.offer(lines, chunk)
+            self.dispatched = offset
+            delay = 0 if more else self.poll_seconds
+
+
+class LogStreamHub:
+    """按文件管理跟随器；同一文件的所有订阅者共享一个跟随器"""
+
+    def __init__(
+        self,
+        log_dir: Path,
+        poll_seconds: float,
+        queue_size: int,
+        max_subscribers: int,
+        heartbeat_seconds: float,
+    ):
+        self.log_dir = log_dir
+        self.poll_seconds = poll_seconds
+        # 连接空闲时发送注释行的间隔，避免代理因空闲断开
+        self.heartbeat_seconds = heartbeat_seconds
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.followers: Dict[str, FileFollower] = {}
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(follower.subscriptions) for follower in self.followers.values())
+
+    async def subscribe(
+        self,
+        filename: str,
+        search: Optional[str] = None,
+        backlog: int = 0,
+    ) -> Tuple[Optional[Subscription], List[str]]:
+        """
+        订阅日志文件的新增内容，返回 (订阅, 最近 backlog 条满足条件的行)；
+        订阅者已达上限时返回 (None, [])。最近的行截止于开始跟随的位置，与之后推送的行不重复
+        """
+        if self.subscriber_count >= self.max_subscribers:
+            return None, []
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            follower = self.followers.get(filename)
+            if follower is None:
+                follower = FileFollower(self.log_dir / filename, self.poll_seconds)
+                await follower.start()
+                self.followers[filename] = follower
+            matcher = log_reader.compile_matcher(search) if search else None
+            subscription = Subscription(follower, matcher, self.queue_size)
+            follower.subscriptions.add(subscription)
+            end = follower.dispatched
+
+        lines: List[str] = []
+        if backlog > 0:
+            try:
+                if matcher is not None:
+                    lines = await run_in_threadpool(log_reader.search_lines, follower.path, matcher, backlog, end=end)
+                else:
+                    lines = await run_in_threadpool(log_reader.tail_lines, follower.path, backlog, end=end)
+            except FileNotFoundError:
+                lines = []
+        return subscription, [line.rstrip("\n") for line in lines]
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        follower = subscription.follower
+        follower.subscriptions.discard(subscription)
+        if not follower.subscriptions and self.followers.get(follower.path.name) is follower:
+            follower.stop()
+            del self.followers[follower.path.name]
+
+    def close(self) -> None:
+        for follower in self.followers.values():
+            follower.stop()
+        self.followers.clear()
+
+
+log_stream_hub = LogStreamHub(
+    Path("logs"),
+    settings.LOG_STREAM_POLL_SECONDS,
+    settings.LOG_STREAM_QUEUE_SIZE,
+    settings.LOG_STREAM_MAX_SUBSCRIBERS,
+    settings.LOG_STREAM_HEARTBEAT_SECONDS,
+)
@@ -0,0 +1,309 @@
+"""
+进程内指标注册表，以 Prometheus 文本格式（0.0.4）导出
+- 计数器、直方图在请求中直接更新（加锁的整数/浮点运算）；
+- 连接池、缓存等状态由各模块登记的采集函数在导出时读取，不在请求中做额外工作；
+- 多进程部署（uvicorn --workers N）时配置 METRICS_MULTIPROC_DIR：各进程定期把自己的快照
+  写成 metrics-<pid>.json，/metrics 由任一进程读取全部快照汇总。计数器和直方图求和
+  （已退出进程的数据保留，计数不会倒退），仪表值只汇总仍在运行的进程。
+  与 prometheus_client 的多进程模式一样，该目录需要在服务启动前清空。
+"""
+import atexit
+import bisect
+import glob
+import json
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.config.settings import settings
+from app.config.logging import get_logger, get_logging_stats
+
+logger = get_logger("app.metrics")
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+# 请求耗时的默认分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+class MetricFamily:
+    """一个指标名下的全部样本；直方图样本的值为 [各分桶计数..., 总和, 总数]（分桶计数不累加）"""
+
+    __slots__ = ("name", "type", "help", "labelnames", "buckets", "samples")
+
+    def __init__(
+        self,
+        name: str,
+        type: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = (),
+        samples: Optional[Dict[LabelValues, object]] = None,
+    ):
+        self.name = name
+        self.type = type
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.samples: Dict[LabelValues, object] = samples if samples is not None else {}
+
+    def to_dict(self) -> dict:
+        return {
+            "type": self.type,
+            "help": self.help,
+            "labelnames": list(self.labelnames),
+            "buckets": list(self.buckets),
+            "samples": [[list(labels), value] for labels, value in self.samples.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, name: str, data: dict) -> "MetricFamily":
+        return cls(
+            name, data["type"], data["help"], data["labelnames"], data["buckets"],
+            {tuple(labels): value for labels, value in data["samples"]},
+        )
+
+    def merge(self, other: "MetricFamily") -> None:
+        """把另一个进程的同名指标加到本指标上"""
+        for labels, value in other.samples.items():
+            current = self.samples.get(labels)
+            if current is None:
+                self.samples[labels] = list(value) if self.type == HISTOGRAM else value
+            elif self.type == HISTOGRAM:
+                self.samples[labels] = [a + b for a, b in zip(current, value)]
+            else:
+                self.samples[labels] = current + value
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.family = MetricFamily(name, COUNTER, help, labelnames)
+        self._lock = threading.Lock()
+
+    def inc(self, labels: LabelValues = (), amount: float = 1) -> None:
+        samples = self.family.samples
+        with self._lock:
+            samples[labels] = samples.get(labels, 0) + amount
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.family = MetricFamily(name, HISTOGRAM, help, labelnames, sorted(buckets))
+        self._bounds = self.family.buckets
+        self._lock = threading.Lock()
+
+    def observe(self, labels: LabelValues, value: float) -> None:
+        # 最后一个位置是 +Inf 分桶
+        index = bisect.bisect_left(self._bounds, value)
+        samples = self.family.samples
+        with self._lock:
+            sample = samples.get(labels)
+            if sample is None:
+                sample = samples[labels] = [0] * (len(self._bounds) + 1) + [0.0, 0]
+            sample[index] += 1
+            sample[-2] += value
+            sample[-1] += 1
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render_families(families: Iterable[MetricFamily]) -> str:
+    lines: List[str] = []
+    for family in sorted(families, key=lambda item: item.name):
+        lines.append(f"# HELP {family.name} {family.help}")
+        lines.append(f"# TYPE {family.name} {family.type}")
+        for labels, value in sorted(family.samples.items()):
+            if family.type != HISTOGRAM:
+                lines.append(f"{family.name}{_format_labels(family.labelnames, labels)} {_format_value(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip((*family.buckets, "+Inf"), value):
+                cumulative += count
+                le = f'le="{bound if bound == "+Inf" else _format_value(float(bound))}"'
+                lines.append(f"{family.name}_bucket{_format_labels(family.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{family.name}_sum{_format_labels(family.labelnames, labels)} {_format_value(value[-2])}")
+            lines.append(f"{family.name}_count{_format_labels(family.labelnames, labels)} {value[-1]}")
+    lines.append("")
+    return "\n".join(lines)
+
+
+class MetricsRegistry:
+    """指标注册表：登记指标和采集函数，导出本进程或全部进程的汇总"""
+
+    def __init__(self, multiproc_dir: Optional[str] = None, flush_seconds: float = 5.0):
+        self.multiproc_dir = multiproc_dir
+        self.flush_seconds = flush_seconds
+        self._metrics: Dict[str, object] = {}
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+        self._lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(name, lambda: Counter(name, help, labelnames))
+
+    def histogram(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(name, lambda: Histogram(name, help, labelnames, buckets))
+
+    def _register(self, name: str, factory):
+        # 同名指标只创建一次（模块重复导入时返回已有的）
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[MetricFamily]]) -> None:
+        """登记导出时调用的采集函数，返回 MetricFamily 列表"""
+        self._collectors.append(collector)
+
+    def collect(self) -> List[MetricFamily]:
+        """本进程的全部指标（直方图和计数器样本为导出时的副本）"""
+        families = []
+        for metric in list(self._metrics.values()):
+            family = metric.family
+            with metric._lock:
+                samples = {
+                    labels: list(value) if family.type == HISTOGRAM else value
+                    for labels, value in family.samples.items()
+                }
+            families.append(MetricFamily(family.name, family.type, family.help, family.labelnames, family.buckets, samples))
+        for collector in self._collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                logger.warning(f"指标采集失败: {e}")
+        return families
+
+    def render(self) -> str:
+        """Prometheus 文本格式；配置了多进程目录时汇总所有进程"""
+        if not self.multiproc_dir:
+            return render_families(self.collect())
+        self.write_snapshot()
+        return render_families(self.aggregate())
+
+    # ---------- 多进程 ----------
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(self.multiproc_dir, f"metrics-{pid}.json")
+
+    def write_snapshot(self) -> None:
+        """把本进程的指标写入快照文件（先写临时文件再替换，读取方不会读到半个文件）"""
+        path = self._snapshot_path(os.getpid())
+        temp_path = f"{path}.tmp"
+        data = {family.name: family.to_dict() for family in self.collect()}
+        try:
+            os.makedirs(self.multiproc_dir, exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"写入指标快照失败: {e}")
+
+    def aggregate(self) -> List[MetricFamily]:
+        merged: Dict[str, MetricFamily] = {}
+        for path in glob.glob(os.path.join(self.multiproc_dir, "metrics-*.json")):
+            try:
+                pid = int(os.path.basename(path)[len("metrics-"):-len(".json")])
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"读取指标快照失败 {path}: {e}")
+                continue
+            alive = _pid_alive(pid)
+            for name, item in data.items():
+                family = MetricFamily.from_dict(name, item)
+                if family.type == GAUGE and not alive:
+                    continue
+                if name in merged:
+                    merged[name].merge(family)
+                else:
+                    merged[name] = family
+        return list(merged.values())
+
+    def start(self) -> None:
+        """启动后台线程定期写快照（只在配置了多进程目录时需要）"""
+        if not self.multiproc_dir or self._writer is not None:
+            return
+        self._writer = threading.Thread(target=self._write_loop, name="metrics-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.stop)
+
+    def _write_loop(self) -> None:
+        while not self._stop.wait(self.flush_seconds):
+            self.write_snapshot()
+
+    def stop(self) -> None:
+        if self._writer is None:
+            return
+        self._stop.set()
+        self._writer.join(timeout=1)
+        self._writer = None
+        # 退出前写最后一次，已完成请求的计数不丢失
+        self.write_snapshot()
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+metrics = MetricsRegistry(
+    multiproc_dir=settings.METRICS_MULTIPROC_DIR,
+    flush_seconds=settings.METRICS_FLUSH_SECONDS,
+)
+
+http_requests_total = metrics.counter(
+    "http_requests_total", "按路由、方法和状态码统计的请求数", ("method", "route", "status"),
+)
+http_request_duration_seconds = metrics.histogram(
+    "http_request_duration_seconds", "按路由和方法统计的请求处理耗时（秒）", ("method", "route"),
+)
+
+
+def _collect_log_queue_metrics():
+    """日志队列的深度、容量和写入/丢弃次数（导出指标时读取，未初始化日志队列时不输出）"""
+    stats = get_logging_stats()
+    if not stats:
+        return []
+    depth = MetricFamily("log_queue_depth", GAUGE, "日志队列中等待写入的记录数")
+    depth.samples[()] = stats["queue_size"]
+    capacity = MetricFamily("log_queue_capacity", GAUGE, "日志队列容量")
+    capacity.samples[()] = stats["queue_capacity"]
+    written = MetricFamily("log_records_written_total", COUNTER, "写日志线程已写出的记录数")
+    written.samples[()] = stats["written"]
+    dropped = MetricFamily("log_records_dropped_total", COUNTER, "日志队列已满时丢弃的记录数（按级别）", ("level",))
+    for level, count in stats["dropped_by_level"].items():
+        dropped.samples[(level,)] = count
+    return [depth, capacity, written, dropped]
+
+
+metrics.register_collector(_collect_log_queue_metrics)
@@ -1,375 +1,599 @@
+"""
+请求处理管道（纯 ASGI 中间件）
+安全头、速率限制、处理时间、请求指标和访问日志作为管道中的阶段（PipelineStage）实现，
+由一个 RequestPipelineMiddleware 在一次 scope/receive/send 传递中依次执行，
+避免多层 BaseHTTPMiddleware 各自创建任务、包装响应流的开销。
+
+阶段的执行顺序与嵌套中间件一致：请求阶段按列表顺序执行，
+响应阶段按相反顺序执行；某个阶段直接返回响应（如 429）时，
+只有已经执行过请求阶段的阶段会收到响应回调。
+"""
+import logging
+import random
 import time
 import uuid
-from typing import Callable
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from starlette.types import ASGIApp
-from starlette.responses import Response as StarletteResponse
-import json
-
-from app.config.logging import get_access_logger, get_security_logger, log_security_event
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from starlette.datastructures import Headers, QueryParams, URL
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config.logging import (
+    LogEvent, get_access_logger, get_database_logger, get_security_logger, log_security_event,
+)
 from app.config.settings import settings
+from app.core.body_logging import (
+    BODY_LOG_MASKED_SAMPLE, BODY_LOG_OFF, BODY_LOG_POLICIES, BodySampler, JsonBodyMasker,
+)
+from app.core import query_profiler
+from app.core.metrics import http_request_duration_seconds, http_requests_total
+from app.core.rate_limit import RateLimiter, rate_limiter
+from app.core.security import decode_token
+from app.core.threat_detection import SUSPICIOUS_AGENT, ThreatDetector, threat_detector
+
+RawHeaders = List[Tuple[bytes, bytes]]
+
+
+class RequestContext:
+    """一次 HTTP 请求在管道中的状态，各阶段共享"""
+
+    __slots__ = (
+        "scope", "method", "path", "query_string", "start_time", "request_id",
+        "status_code", "response_headers", "response_size", "state",
+        "_receive", "_headers", "_client_ip", "_body",
+    )
+
+    def __init__(self, scope: Scope, receive: Receive):
+        self.scope = scope
+        self.method: str = scope["method"]
+        self.path: str = scope["path"]
+        self.query_string: str = scope.get("query_string", b"").decode("latin-1")
+        self.start_time = time.perf_counter()
+        self.request_id: Optional[str] = None
+        self.status_code: Optional[int] = None
+        self.response_headers: Optional[RawHeaders] = None
+        self.response_size = 0
+        # 阶段之间传递数据用
+        self.state: Dict[str, Any] = {}
+        self._receive = receive
+        self._headers: Optional[Headers] = None
+        self._client_ip: Optional[str] = None
+        self._body: Optional[bytes] = None
+
+    @property
+    def headers(self) -> Headers:
+        if self._headers is None:
+            self._headers = Headers(scope=self.scope)
+        return self._headers
+
+    @property
+    def url(self) -> URL:
+        return URL(scope=self.scope)
+
+    @property
+    def client_ip(self) -> str:
+        """客户端真实IP（优先使用代理头）"""
+        if self._client_ip is None:
+            headers = self.headers
+            forwarded_for = headers.get("x-forwarded-for")
+            if forwarded_for:
+                self._client_ip = forwarded_for.split(",")[0].strip()
+            else:
+                client = self.scope.get("client")
+                self._client_ip = headers.get("x-real-ip") or (client[0] if client else "unknown")
+        return self._client_ip
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start_time
+
+    async def body(self) -> bytes:
+        """读取完整请求体；读取后会重放给下游应用"""
+        if self._body is None:
+            chunks = []
+            more_body = True
+            while more_body:
+                message = await self._receive()
+                if message["type"] != "http.request":
+                    break
+                chunks.append(message.get("body", b""))
+                more_body = message.get("more_body", False)
+            self._body = b"".join(chunks)
+        return self._body
+
+    def downstream_receive(self) -> Receive:
+        """传给下游应用的 receive：请求体已被读取时先重放，之后交还原始 receive"""
+        if self._body is None:
+            return self._receive
+        replayed = False
+
+        async def receive() -> Message:
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": self._body, "more_body": False}
+            return await self._receive()
+
+        return receive
+
+
+class PipelineStage:
+    """管道阶段基类，按需覆盖钩子"""
+
+    async def on_request(self, ctx: RequestContext) -> Optional[Response]:
+        """请求到达时调用；返回响应则不再调用下游，直接返回该响应"""
+        return None
+
+    def on_request_body(self, ctx: RequestContext, chunk: bytes) -> None:
+        """下游应用读取到请求体分块时调用（只有覆盖了此方法的阶段会被调用）"""
+
+    def on_response_start(self, ctx: RequestContext, headers: RawHeaders) -> None:
+        """响应头发出前调用，可以直接修改 headers"""
+
+    def on_response_body(self, ctx: RequestContext, chunk: bytes) -> None:
+        """每个响应体分块发出前调用（只有覆盖了此方法的阶段会被调用）"""
+
+    def on_complete(self, ctx: RequestContext, exc: Optional[BaseException]) -> None:
+        """响应发送完毕或处理异常时调用"""
+
+
+def set_header(headers: RawHeaders, name: bytes, value: bytes) -> None:
+    """设置响应头，覆盖同名的已有值（name 须为小写）"""
+    headers[:] = [item for item in headers if item[0] != name]
+    headers.append((name, value))
+
+
+class RequestPipelineMiddleware:
+    """把多个阶段组合成一个纯 ASGI 中间件"""
+
+    def __init__(self, app: ASGIApp, stages: Sequence[PipelineStage]):
+        self.app = app
+        self.stages = list(stages)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        ctx = RequestContext(scope, receive)
+        entered: List[PipelineStage] = []
+        early_response: Optional[Response] = None
+        for stage in self.stages:
+            entered.append(stage)
+            early_response = await stage.on_request(ctx)
+            if early_response is not None:
+                break
+        # 响应阶段按嵌套顺序（由内到外）执行
+        entered.reverse()
+        body_stages = [
+            stage for stage in entered
+            if type(stage).on_response_body is not PipelineStage.on_response_body
+        ]
+        request_body_stages = [
+            stage for stage in entered
+            if type(stage).on_request_body is not PipelineStage.on_request_body
+        ]
+        downstream_receive = ctx.downstream_receive()
+
+        async def receive_wrapper() -> Message:
+            message = await downstream_receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                if chunk:
+                    for stage in request_body_stages:
+                        stage.on_request_body(ctx, chunk)
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            message_type = message["type"]
+            if message_type == "http.response.start":
+                ctx.status_code = message["status"]
+                headers = list(message.get("headers", ()))
+                for stage in entered:
+                    stage.on_response_start(ctx, headers)
+                ctx.response_headers = headers
+                message["headers"] = headers
+                await send(message)
+            elif message_type == "http.response.body":
+                chunk = message.get("body", b"")
+                ctx.response_size += len(chunk)
+                for stage in body_stages:
+                    stage.on_response_body(ctx, chunk)
+                await send(message)
+                if not message.get("more_body", False):
+                    for stage in entered:
+                        stage.on_complete(ctx, None)
+            else:
+                await send(message)
+
+        try:
+            if early_response is not None:
+                await early_response(scope, receive, send_wrapper)
+            else:
+                await self.app(
+                    scope, receive_wrapper if request_body_stages else downstream_receive, send_wrapper
+                )
+        except Exception as exc:
+            for stage in entered:
+                stage.on_complete(ctx, exc)
+            raise
+
+
+class SecurityHeadersStage(PipelineStage):
+    """安全头（含允许 Swagger UI 加载 CDN 资源的 CSP）"""
+
+    DEFAULT_HEADERS = {
+        "X-Content-Type-Options": "nosniff",
+        "X-Frame-Options": "DENY",
+        "X-XSS-Protection": "1; mode=block",
+        "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+        "Referrer-Policy": "strict-origin-when-cross-origin",
+        # 允许 swagger ui 的 css 加载
+        "Content-Security-Policy": (
+            "default-src 'self'; style-src 'self' https://cdn.jsdelivr.net; "
+            "script-src 'self' https://cdn.jsdelivr.net 'unsafe-inline'; "
+            "img-src 'self' https://fastapi.tiangolo.com data:"
+        ),
+    }
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None):
+        headers = self.DEFAULT_HEADERS if headers is None else headers
+        # 预先编码，每个请求只做一次过滤和追加
+        self._names = {name.lower().encode("latin-1") for name in headers}
+        self._raw = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+
+    def on_response_start(self, ctx: RequestContext, headers: RawHeaders) -> None:
+        if any(name in self._names for name, _ in headers):
+            headers[:] = [item for item in headers if item[0] not in self._names]
+        headers.extend(self._raw)
+
+
+class RateLimitStage(PipelineStage):
+    """速率限制，策略和计数后端见 app.core.rate_limit"""
+
+    def __init__(self, limiter: RateLimiter = None):
+        self.limiter = limiter or rate_limiter
+
+    def _principal(self, ctx: RequestContext) -> Optional[str]:
+        """携带有效令牌时返回 "主体类型:id"，只校验签名和有效期，不访问数据库"""
+        authorization = ctx.headers.get("authorization")
+        if not authorization or not authorization.lower().startswith("bearer "):
+            return None
+        claims = decode_token(authorization[7:].strip())
+        if claims is None:
+            return None
+        return f"{claims.typ}:{claims.sub}"
+
+    async def on_request(self, ctx: RequestContext) -> Optional[Response]:
+        limiter = self.limiter
+        principal = self._principal(ctx) if limiter.has_principal_policies else None
+        policy, identity = limiter.match(ctx.method, ctx.path, principal)
+        if policy is None:
+            return None
+        identity = identity or ctx.client_ip
+        result = await limiter.check(policy, identity)
+        if result.allowed:
+            return None
+
+        # 记录速率限制事件
+        log_security_event(
+            "速率限制触发",
+            f"IP: {ctx.client_ip}, 策略: {policy.name}, 标识: {identity}, 限制: {policy.limit}/{policy.window_seconds}秒",
+            None
+        )
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "请求过于频繁，请稍后再试"},
+            headers={
+                "Retry-After": str(result.retry_after),
+                "X-RateLimit-Limit": str(result.limit),
+                "X-RateLimit-Remaining": "0",
+            },
+        )
+
+
+class ProcessTimeStage(PipelineStage):
+    """把处理时间（秒）写入 X-Process-Time 响应头"""
+
+    def on_response_start(self, ctx: RequestContext, headers: RawHeaders) -> None:
+        set_header(headers, b"x-process-time", f"{ctx.elapsed:.4f}".encode("latin-1"))
 
 
-class ProcessTimeMiddleware(BaseHTTPMiddleware):
+class MetricsStage(PipelineStage):
     """
-    处理时间中间件
-    用于测量请求处理的时间，并将处理时间添加到响应头中
+    按路由模板、方法和状态码统计请求数和耗时。
+    路由在下游路由匹配后从 scope["route"] 取得（如 /api/v1/vehicles/{vehicle_id}），
+    标签数量与路由数量相同，不会因路径参数无限增长；未匹配到路由的请求记为 "unmatched"
     """
 
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
+    UNMATCHED_ROUTE = "unmatched"
 
-    async def dispatch(
-        self, request: Request, call_next: RequestResponseEndpoint
-    ) -> Response:
-        # 记录请求开始时间
-        start_time = time.time()
+    def route_label(self, ctx: RequestContext) -> str:
+        route = ctx.scope.get("route")
+        return getattr(route, "path", None) or self.UNMATCHED_ROUTE
 
-        # 处理请求
-        response = await call_next(request)
+    def on_complete(self, ctx: RequestContext, exc: Optional[BaseException]) -> None:
+        route = self.route_label(ctx)
+        status = str(ctx.status_code) if exc is None and ctx.status_code else "500"
+        http_requests_total.inc((ctx.method, route, status))
+        http_request_duration_seconds.observe((ctx.method, route), ctx.elapsed)
 
-        # 计算处理时间
-        process_time = time.time() - start_time
 
-        # 将处理时间添加到响应头中（毫秒为单位）
-        response.headers["X-Process-Time"] = f"{process_time:.4f}"
+class QueryProfilerStage(PipelineStage):
+    """
+    统计请求执行的SQL查询数和数据库耗时（秒），写入 X-DB-Query-Count / X-DB-Time 响应头，
+    访问日志从 ctx.state["query_stats"] 读取；同一语句执行超过阈值次数时记录疑似 N+1 的警告
+    """
+
+    def __init__(self, n_plus_one_threshold: int = None):
+        self.n_plus_one_threshold = (
+            n_plus_one_threshold if n_plus_one_threshold is not None else settings.SQL_N_PLUS_ONE_THRESHOLD
+        )
+        self.database_logger = get_database_logger()
+
+    async def on_request(self, ctx: RequestContext) -> Optional[Response]:
+        ctx.state["query_stats"] = query_profiler.start_request(self.n_plus_one_threshold)
+        return None
 
-        # 可以在这里添加日志记录
-        # 路径、方法、处理时间
-        path = request.url.path
-        method = request.method
-        print(f"{method} {path} - 处理时间: {process_time:.4f}秒")
+    def on_response_start(self, ctx: RequestContext, headers: RawHeaders) -> None:
+        stats = ctx.state["query_stats"]
+        set_header(headers, b"x-db-query-count", str(stats.count).encode("latin-1"))
+        set_header(headers, b"x-db-time", f"{stats.total_time:.4f}".encode("latin-1"))
 
-        return response
+    def on_complete(self, ctx: RequestContext, exc: Optional[BaseException]) -> None:
+        query_profiler.finish_request()
+        stats = ctx.state["query_stats"]
+        if stats.n_plus_one:
+            self.database_logger.warning(LogEvent("疑似N+1查询", {
+                "request_id": ctx.request_id,
+                "method": ctx.method,
+                "path": ctx.path,
+                "db_queries": stats.count,
+                "threshold": stats.threshold,
+                "statements": stats.n_plus_one_report(),
+            }))
 
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """日志记录中间件"""
-    
-    def __init__(self, app, skip_paths: list = None, debug_mode: bool = None):
-        super().__init__(app)
+class AccessLogStage(PipelineStage):
+    """
+    访问日志与可疑活动检测
+    每个请求在完成时写一条访问日志（包含请求和响应信息），消息使用 LogEvent，
+    由日志线程在写出时序列化一次；日志级别不需要的记录在请求中不会构造。
+    """
+
+    SENSITIVE_FIELDS = ["password", "token", "secret", "key", "api_key", "access_token", "refresh_token"]
+    KEY_HEADERS = ("authorization", "content-type", "accept", "user-agent", "referer")
+    SLOW_REQUEST_SECONDS = 2.0
+
+    def __init__(
+        self,
+        skip_paths: list = None,
+        debug_mode: bool = None,
+        body_sample_bytes: int = None,
+        body_sample_rate: float = None,
+        body_sample_routes: Dict[str, float] = None,
+        request_body_policy: str = None,
+        detector: ThreatDetector = None,
+    ):
         self.access_logger = get_access_logger()
+        self.detector = detector or threat_detector
         self.security_logger = get_security_logger()
-        self.skip_paths = skip_paths or ["/health", "/metrics", "/favicon.ico", "/docs", "/redoc", "/openapi.json"]
+        self.skip_paths = tuple(skip_paths or ["/health", "/metrics", "/favicon.ico", "/docs", "/redoc", "/openapi.json"])
         # 使用传入的debug_mode参数，如果没有传入则使用配置文件中的设置
         self.debug_mode = debug_mode if debug_mode is not None else settings.DEBUG_MODE
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # 生成请求ID
-        request_id = str(uuid.uuid4())
-        
-        # 记录请求开始时间
-        start_time = time.time()
-        
-        # 获取客户端信息
-        client_ip = self.get_client_ip(request)
-        user_agent = request.headers.get("user-agent", "")
-        
+        self.body_sample_bytes = (
+            body_sample_bytes if body_sample_bytes is not None else settings.ACCESS_LOG_BODY_SAMPLE_BYTES
+        )
+        self.body_sample_rate = (
+            body_sample_rate if body_sample_rate is not None else settings.ACCESS_LOG_BODY_SAMPLE_RATE
+        )
+        self.request_body_policy = request_body_policy or settings.ACCESS_LOG_REQUEST_BODY_POLICY
+        if self.request_body_policy not in BODY_LOG_POLICIES:
+            raise ValueError(f"未知的请求体记录策略: {self.request_body_policy}，可选: {', '.join(BODY_LOG_POLICIES)}")
+        routes = body_sample_routes if body_sample_routes is not None else settings.ACCESS_LOG_BODY_SAMPLE_ROUTES
+        # 最长前缀优先匹配
+        self.body_sample_routes = sorted(routes.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def body_sample_rate_for(self, path: str) -> float:
+        for prefix, rate in self.body_sample_routes:
+            if path.startswith(prefix):
+                return rate
+        return self.body_sample_rate
+
+    def _should_sample_body(self, ctx: RequestContext) -> bool:
+        rate = self.body_sample_rate_for(ctx.path)
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def _skipped(self, ctx: RequestContext) -> bool:
+        return ctx.request_id is None
+
+    async def on_request(self, ctx: RequestContext) -> Optional[Response]:
         # 跳过不需要记录的路径
-        if any(skip_path in str(request.url.path) for skip_path in self.skip_paths):
-            response = await call_next(request)
-            return response
-        
-        # 记录请求信息
-        request_info = {
-            "request_id": request_id,
-            "method": request.method,
-            "url": str(request.url),
-            "path": request.url.path,
-            "query_params": dict(request.query_params),
-            "client_ip": client_ip,
-            "user_agent": user_agent,
-        }
-        
-        # 在调试模式下记录所有请求头
-        if self.debug_mode:
-            request_info["headers"] = dict(request.headers)
-            self.access_logger.debug(f"[DEBUG] 完整请求头: {json.dumps(dict(request.headers), ensure_ascii=False)}")
-        else:
-            # 非调试模式下只记录关键头信息
-            key_headers = {}
-            for key in ["authorization", "content-type", "accept", "user-agent", "referer"]:
-                if key in request.headers:
-                    key_headers[key] = request.headers[key]
-            request_info["headers"] = key_headers
-        
-        # 记录请求体
-        if request.method in ["POST", "PUT", "PATCH"]:
-            try:
-                body = await request.body()
-                if body:
-                    try:
-                        body_json = json.loads(body.decode())
-                        
-                        # 在调试模式下记录完整的请求体
-                        if self.debug_mode:
-                            # 创建一个副本用于日志记录，移除敏感字段
-                            debug_body = body_json.copy()
-                            sensitive_fields = ["password", "token", "secret", "key", "api_key", "access_token", "refresh_token"]
-                            self._mask_sensitive_fields(debug_body, sensitive_fields)
-                            request_info["body"] = debug_body
-                            self.access_logger.debug(f"[DEBUG] 完整请求体: {json.dumps(debug_body, ensure_ascii=False)}")
-                        else:
-                            # 非调试模式下简化处理
-                            masked_body = body_json.copy()
-                            sensitive_fields = ["password", "token", "secret", "key", "api_key", "access_token", "refresh_token"]
-                            self._mask_sensitive_fields(masked_body, sensitive_fields)
-                            request_info["body"] = "数据已记录"
-                            
-                    except (json.JSONDecodeError, UnicodeDecodeError):
-                        if self.debug_mode:
-                            request_info["body"] = "非JSON数据"
-                            self.access_logger.debug(f"[DEBUG] 非JSON请求体: {body[:500]}...")  # 只记录前500字符
-                        else:
-                            request_info["body"] = "非JSON数据"
-            except Exception as e:
-                if self.debug_mode:
-                    self.access_logger.debug(f"[DEBUG] 读取请求体失败: {str(e)}")
-        
-        # 记录请求开始日志
-        if self.debug_mode:
-            self.access_logger.debug(f"[DEBUG] 请求开始: {json.dumps(request_info, ensure_ascii=False)}")
-        
-        self.access_logger.info(f"请求开始: {json.dumps(request_info, ensure_ascii=False)}")
-        
+        if any(skip_path in ctx.path for skip_path in self.skip_paths):
+            return None
+
+        # 生成请求ID
+        ctx.request_id = str(uuid.uuid4())
+        headers = ctx.headers
+        client_ip = ctx.client_ip
+        user_agent = headers.get("user-agent", "")
+        # 调试记录只有在调试模式且日志级别允许时才生成
+        debug = self.debug_mode and self.access_logger.isEnabledFor(logging.DEBUG)
+        ctx.state["access_debug"] = debug
+
+        if self.access_logger.isEnabledFor(logging.INFO):
+            request_info = {
+                "request_id": ctx.request_id,
+                "method": ctx.method,
+                "url": str(ctx.url),
+                "path": ctx.path,
+                "query_params": dict(QueryParams(ctx.query_string)),
+                "client_ip": client_ip,
+                "user_agent": user_agent,
+            }
+            # 在调试模式下记录所有请求头，否则只记录关键头信息；令牌不写入日志
+            if self.debug_mode:
+                request_headers = dict(headers)
+            else:
+                request_headers = {key: headers[key] for key in self.KEY_HEADERS if key in headers}
+            if "authorization" in request_headers:
+                request_headers["authorization"] = "***已屏蔽***"
+            request_info["headers"] = request_headers
+
+            # 记录请求体：不预先读取，在下游应用读取时旁路统计/屏蔽
+            if ctx.method in ["POST", "PUT", "PATCH"] and self.request_body_policy != BODY_LOG_OFF:
+                ctx.state["request_body"] = self._request_body_recorder(ctx)
+            ctx.state["access_info"] = request_info
+
+            if debug:
+                self.access_logger.debug(LogEvent("[DEBUG] 请求开始", request_info))
+
         # 检测可疑活动
-        self.detect_suspicious_activity(request, client_ip, user_agent)
-        
-        # 处理请求
-        response_body = None
-        try:
-            response = await call_next(request)
-            
-            # 在调试模式下记录响应体
-            if self.debug_mode and response.status_code < 400:
-                try:
-                    # 获取响应体内容
-                    response_body = b""
-                    async for chunk in response.body_iterator:
-                        response_body += chunk
-                    
-                    # 重新创建响应对象
-                    from starlette.responses import Response as StarletteResponse
-                    response = StarletteResponse(
-                        content=response_body,
-                        status_code=response.status_code,
-                        headers=response.headers,
-                        media_type=response.media_type
-                    )
-                    
-                    # 记录响应体（如果是JSON格式）
-                    if response_body and response.headers.get("content-type", "").startswith("application/json"):
-                        try:
-                            response_json = json.loads(response_body.decode())
-                            self.access_logger.debug(f"[DEBUG] 响应体: {json.dumps(response_json, ensure_ascii=False)}")
-                        except (json.JSONDecodeError, UnicodeDecodeError):
-                            self.access_logger.debug(f"[DEBUG] 非JSON响应: {response_body[:500]}...")
-                            
-                except Exception as e:
-                    self.access_logger.debug(f"[DEBUG] 读取响应体失败: {str(e)}")
-                    
-        except Exception as e:
+        self.detect_suspicious_activity(ctx, client_ip, user_agent)
+        return None
+
+    def _request_body_recorder(self, ctx: RequestContext):
+        """按策略选择请求体记录方式：JSON 请求体按比例屏蔽抽样，其余只统计大小"""
+        if (
+            self.request_body_policy == BODY_LOG_MASKED_SAMPLE
+            and self.body_sample_bytes > 0
+            and ctx.headers.get("content-type", "").startswith("application/json")
+            and self._should_sample_body(ctx)
+        ):
+            return JsonBodyMasker(self.SENSITIVE_FIELDS, self.body_sample_bytes)
+        return BodySampler(0)
+
+    def on_request_body(self, ctx: RequestContext, chunk: bytes) -> None:
+        recorder = ctx.state.get("request_body")
+        if recorder is not None:
+            recorder.feed(chunk)
+
+    def _request_body_fields(self, ctx: RequestContext) -> Dict[str, Any]:
+        recorder = ctx.state.get("request_body")
+        if recorder is None:
+            return {}
+        size = recorder.size
+        if not size:
+            # 下游没有读取请求体（如认证失败），使用请求头中的长度
+            content_length = ctx.headers.get("content-length")
+            size = int(content_length) if content_length and content_length.isdigit() else 0
+        fields = {"body_size": size}
+        if isinstance(recorder, JsonBodyMasker) and recorder.size:
+            fields["body"] = recorder.text()
+            fields["body_truncated"] = recorder.truncated
+        return fields
+
+    def _query_fields(self, ctx: RequestContext) -> Dict[str, Any]:
+        stats = ctx.state.get("query_stats")
+        if stats is None:
+            return {}
+        fields = {"db_queries": stats.count, "db_time": round(stats.total_time, 4)}
+        if stats.n_plus_one:
+            fields["n_plus_one"] = [item["statement"] for item in stats.n_plus_one_report()]
+        return fields
+
+    def on_response_start(self, ctx: RequestContext, headers: RawHeaders) -> None:
+        if self._skipped(ctx):
+            return
+        set_header(headers, b"x-request-id", ctx.request_id.encode("latin-1"))
+        # 在调试模式下按路由抽样记录成功的JSON响应体（分块原样转发，只保留前 N 字节）
+        if ctx.state.get("access_debug") and ctx.status_code < 400 and self.body_sample_bytes > 0:
+            content_type = Headers(raw=headers).get("content-type", "")
+            if content_type.startswith("application/json") and self._should_sample_body(ctx):
+                ctx.state["response_sample"] = BodySampler(self.body_sample_bytes)
+
+    def on_response_body(self, ctx: RequestContext, chunk: bytes) -> None:
+        sampler = ctx.state.get("response_sample")
+        if sampler is not None and chunk:
+            sampler.feed(chunk)
+
+    def on_complete(self, ctx: RequestContext, exc: Optional[BaseException]) -> None:
+        if self._skipped(ctx):
+            return
+        process_time = ctx.elapsed
+        request_info = ctx.state.get("access_info")
+
+        if exc is not None:
             # 记录异常
-            process_time = time.time() - start_time
-            error_info = {
-                "request_id": request_id,
-                "error": str(e),
+            self.access_logger.error(LogEvent("请求异常", {
+                **(request_info or {"request_id": ctx.request_id}),
+                **self._request_body_fields(ctx),
+                **self._query_fields(ctx),
+                "error": str(exc),
                 "process_time": round(process_time, 4),
-                "status": "error"
-            }
-            self.access_logger.error(f"请求异常: {json.dumps(error_info, ensure_ascii=False)}")
-            
-            if self.debug_mode:
-                self.access_logger.debug(f"[DEBUG] 异常详情: {repr(e)}")
-            raise
-        
-        # 计算处理时间
-        process_time = time.time() - start_time
-        
-        # 记录响应信息
-        response_info = {
-            "request_id": request_id,
-            "status_code": response.status_code,
-            "process_time": round(process_time, 4),
-            "response_size": response.headers.get("content-length", "unknown")
-        }
-        
-        # 在调试模式下记录响应头
-        if self.debug_mode:
-            response_info["response_headers"] = dict(response.headers)
-            self.access_logger.debug(f"[DEBUG] 响应头: {json.dumps(dict(response.headers), ensure_ascii=False)}")
-        
-        # 根据状态码选择日志级别
-        if response.status_code >= 500:
-            self.access_logger.error(f"请求完成(服务器错误): {json.dumps(response_info, ensure_ascii=False)}")
-        elif response.status_code >= 400:
-            self.access_logger.warning(f"请求完成(客户端错误): {json.dumps(response_info, ensure_ascii=False)}")
-        else:
-            self.access_logger.info(f"请求完成: {json.dumps(response_info, ensure_ascii=False)}")
-        
-        # 记录慢请求
-        if process_time > 2.0:  # 超过2秒的请求
-            self.access_logger.warning(f"慢请求警告: {request.method} {request.url.path} - 耗时: {process_time:.4f}秒")
-        
-        # 在调试模式下记录额外的性能信息
-        if self.debug_mode:
-            self.access_logger.debug(f"[DEBUG] 性能统计: 请求处理时间: {process_time:.4f}秒, 状态码: {response.status_code}")
-        
-        # 添加响应头
-        response.headers["X-Request-ID"] = request_id
-        response.headers["X-Process-Time"] = str(round(process_time, 4))
-        
-        return response
-    
-    def _mask_sensitive_fields(self, data, sensitive_fields):
-        """递归地屏蔽敏感字段"""
-        if isinstance(data, dict):
-            for key, value in data.items():
-                if any(field in key.lower() for field in sensitive_fields):
-                    data[key] = "***已屏蔽***"
-                elif isinstance(value, (dict, list)):
-                    self._mask_sensitive_fields(value, sensitive_fields)
-        elif isinstance(data, list):
-            for item in data:
-                if isinstance(item, (dict, list)):
-                    self._mask_sensitive_fields(item, sensitive_fields)
-    
-    def get_client_ip(self, request: Request) -> str:
-        """获取客户端真实IP"""
-        # 检查代理头
-        forwarded_for = request.headers.get("X-Forwarded-For")
-        if forwarded_for:
-            return forwarded_for.split(",")[0].strip()
-        
-        real_ip = request.headers.get("X-Real-IP")
-        if real_ip:
-            return real_ip
-        
-        return request.client.host if request.client else "unknown"
-    
-    def detect_suspicious_activity(self, request: Request, client_ip: str, user_agent: str):
-        """检测可疑活动"""
-        
-        # 检测SQL注入尝试
-        sql_injection_patterns = ["'", "union", "select", "drop", "insert", "delete", "update", "--", "/*"]
-        query_string = str(request.url.query).lower()
-        path = request.url.path.lower()
-        
-        for pattern in sql_injection_patterns:
-            if pattern in query_string or pattern in path:
-                log_security_event(
-                    "SQL注入尝试",
-                    f"IP: {client_ip}, Path: {request.url.path}, Query: {request.url.query}",
-                    None
-                )
-                break
-        
-        # 检测XSS尝试
-        xss_patterns = ["<script", "javascript:", "onerror=", "onload=", "alert("]
-        for pattern in xss_patterns:
-            if pattern in query_string or pattern in path:
-                log_security_event(
-                    "XSS尝试",
-                    f"IP: {client_ip}, Path: {request.url.path}",
-                    None
-                )
-                break
-        
-        # 检测路径遍历尝试
-        if "../" in path or "..%2f" in path or "..%5c" in path:
-            log_security_event(
-                "路径遍历尝试",
-                f"IP: {client_ip}, Path: {request.url.path}",
-                None
-            )
-        
-        # 检测可疑User-Agent
-        suspicious_agents = ["sqlmap", "nikto", "nmap", "masscan", "nessus"]
-        if any(agent in user_agent.lower() for agent in suspicious_agents):
-            log_security_event(
-                "可疑User-Agent",
-                f"IP: {client_ip}, User-Agent: {user_agent}",
-                None
-            )
-
-
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """安全头中间件"""
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        response = await call_next(request)
-        
-        # 添加安全头
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Content-Security-Policy"] = "default-src 'self'"
-        
-        return response
-
-
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """简单的速率限制中间件"""
-    
-    def __init__(self, app, max_requests: int = 100, window_seconds: int = 60):
-        super().__init__(app)
-        self.max_requests = max_requests
-        self.window_seconds = window_seconds
-        self.requests = {}  # 在生产环境中应该使用Redis
-        self.security_logger = get_security_logger()
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        client_ip = self.get_client_ip(request)
-        current_time = time.time()
-        
-        # 清理过期记录
-        self.cleanup_expired_records(current_time)
-        
-        # 检查速率限制
-        if client_ip in self.requests:
-            request_times = self.requests[client_ip]
-            # 计算窗口内的请求数
-            recent_requests = [t for t in request_times if current_time - t < self.window_seconds]
-            
-            if len(recent_requests) >= self.max_requests:
-                # 记录速率限制事件
-                log_security_event(
-                    "速率限制触发",
-                    f"IP: {client_ip}, 请求数: {len(recent_requests)}, 限制: {self.max_requests}/{self.window_seconds}秒",
-                    None
-                )
-                
-                # 返回429状态码
-                from fastapi.responses import JSONResponse
-                return JSONResponse(
-                    status_code=429,
-                    content={"detail": "请求过于频繁，请稍后再试"}
-                )
-            
-            # 更新请求记录
-            recent_requests.append(current_time)
-            self.requests[client_ip] = recent_requests
+                "status": "error",
+            }))
+            if ctx.state.get("access_debug"):
+                self.access_logger.debug(f"[DEBUG] 异常详情: {repr(exc)}")
+            return
+
+        sampler = ctx.state.pop("response_sample", None)
+        if sampler is not None and sampler.size:
+            self.access_logger.debug(LogEvent("[DEBUG] 响应体", {
+                "request_id": ctx.request_id,
+                "body": sampler.text(),
+                "body_size": sampler.size,
+                "truncated": sampler.truncated,
+            }))
+
+        status_code = ctx.status_code
+        # 根据状态码选择日志级别，慢请求至少为警告
+        if status_code >= 500:
+            level, message = logging.ERROR, "请求完成(服务器错误)"
+        elif status_code >= 400:
+            level, message = logging.WARNING, "请求完成(客户端错误)"
         else:
-            self.requests[client_ip] = [current_time]
-        
-        return await call_next(request)
-    
-    def get_client_ip(self, request: Request) -> str:
-        """获取客户端IP"""
-        forwarded_for = request.headers.get("X-Forwarded-For")
-        if forwarded_for:
-            return forwarded_for.split(",")[0].strip()
-        return request.client.host if request.client else "unknown"
-    
-    def cleanup_expired_records(self, current_time: float):
-        """清理过期的请求记录"""
-        for ip in list(self.requests.keys()):
-            self.requests[ip] = [
-                t for t in self.requests[ip] 
-                if current_time - t < self.window_seconds
-            ]
-            if not self.requests[ip]:
-                del self.requests[ip]
+            level, message = logging.INFO, "请求完成"
+        slow = process_time > self.SLOW_REQUEST_SECONDS
+        if slow:
+            level = max(level, logging.WARNING)
+        if not self.access_logger.isEnabledFor(level):
+            return
+
+        # 请求信息和响应信息合并为一条记录
+        fields = dict(request_info) if request_info else {"request_id": ctx.request_id}
+        fields.update(self._request_body_fields(ctx))
+        fields.update(self._query_fields(ctx))
+        fields["status_code"] = status_code
+        fields["process_time"] = round(process_time, 4)
+        fields["response_size"] = ctx.response_size
+        if slow:
+            fields["slow"] = True
+        # 在调试模式下记录响应头
+        if ctx.state.get("access_debug"):
+            fields["response_headers"] = dict(Headers(raw=ctx.response_headers or []))
+        self.access_logger.log(level, LogEvent(message, fields))
+
+    def detect_suspicious_activity(self, ctx: RequestContext, client_ip: str, user_agent: str):
+        """检测可疑活动：一次扫描得到全部匹配，按IP和类别去重后写安全日志"""
+        matches = self.detector.scan(ctx.path, ctx.query_string, user_agent)
+        if not matches:
+            return
+        request_info = ctx.state.get("access_info")
+        if request_info is not None:
+            request_info["threats"] = sorted({match.category for match in matches})
+
+        for category, (category_matches, suppressed) in self.detector.events_to_log(client_ip, matches).items():
+            details = f"IP: {client_ip}, Path: {ctx.path}"
+            if category == SUSPICIOUS_AGENT:
+                details += f", User-Agent: {user_agent}"
+            elif ctx.query_string:
+                details += f", Query: {ctx.query_string}"
+            details += f", 匹配: {', '.join(match.describe() for match in category_matches)}"
+            if suppressed:
+                details += f", 上一窗口内另有 {suppressed} 次同类事件未单独记录"
+            log_security_event(category, details, None)
+
+def default_stages(debug_mode: bool = None) -> List[PipelineStage]:
+    """应用默认使用的阶段（由外到内），安全头在限流之外，429 响应同样带安全头"""
+    stages: List[PipelineStage] = [ProcessTimeStage()]
+    if settings.METRICS_ENABLED:
+        # 在限流之外，429 响应同样计入指标
+        stages.append(MetricsStage())
+    stages.append(SecurityHeadersStage())
+    if settings.SQL_PROFILER_ENABLED:
+        stages.append(QueryProfilerStage())
+    stages.append(AccessLogStage(debug_mode=debug_mode))
+    if settings.RATE_LIMIT_ENABLED:
+        stages.append(RateLimitStage())
+    return stages
@@ -0,0 +1,130 @@
+"""
+密码哈希/校验专用线程池
+bcrypt 每次计算约占用数百毫秒 CPU，放在请求线程池中执行会在集中登录时
+占满线程池、拖慢所有同步接口。这里用独立的有界线程池执行（bcrypt 计算期间
+释放 GIL，多线程可以并行利用多核），排队任务达到上限时立即拒绝，
+由接口返回 503 而不是无限排队。
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.config.settings import settings
+from app.config.logging import get_logger
+from app.core.exceptions import ServiceUnavailableException
+from app.service.password_service import password_service
+
+logger = get_logger("app.security")
+
+
+class PasswordPool:
+    """有界的密码计算线程池，带排队上限和运行指标"""
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        # 运行指标
+        self.pending = 0  # 已提交未完成（排队 + 执行中）
+        self.active = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="password"
+                    )
+        return self._executor
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """提交任务；排队已满时抛出 ServiceUnavailableException"""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                logger.warning(f"密码计算线程池已满，拒绝请求 (排队: {self.pending})")
+                raise ServiceUnavailableException("登录请求过多，请稍后重试", retry_after=1)
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+        enqueued_at = time.perf_counter()
+
+        def task():
+            started_at = time.perf_counter()
+            with self._lock:
+                self.active += 1
+                self.total_wait_seconds += started_at - enqueued_at
+            ok = False
+            try:
+                result = fn(*args)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.pending -= 1
+                    self.total_run_seconds += time.perf_counter() - started_at
+                    if ok:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+
+        try:
+            return self._get_executor().submit(task)
+        except RuntimeError:
+            # 线程池已关闭
+            with self._lock:
+                self.pending -= 1
+            raise ServiceUnavailableException("服务正在关闭，请稍后重试", retry_after=1)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """在线程池中校验密码"""
+        return await asyncio.wrap_future(
+            self.submit(password_service.verify, plain_password, hashed_password)
+        )
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """在线程池中校验密码，哈希参数过期时同时生成新哈希"""
+        return await asyncio.wrap_future(
+            self.submit(password_service.verify_and_update, plain_password, hashed_password)
+        )
+
+    async def hash(self, password: str) -> str:
+        """在线程池中生成密码哈希"""
+        return await asyncio.wrap_future(self.submit(password_service.hash, password))
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "active": self.active,
+                "queued": self.pending - self.active,
+                "peak_pending": self.peak_pending,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.total_wait_seconds / finished * 1000, 2) if finished else 0.0,
+                "avg_run_ms": round(self.total_run_seconds / finished * 1000, 2) if finished else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_pool = PasswordPool(
+    max_workers=settings.PASSWORD_POOL_WORKERS,
+    max_pending=settings.PASSWORD_POOL_MAX_PENDING,
+)
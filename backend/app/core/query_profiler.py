@@ -0,0 +1,106 @@
+"""
+SQL 查询分析
+通过 SQLAlchemy 的 before/after_cursor_execute 事件统计每个请求执行的查询数和数据库耗时，
+并检测 N+1：同一条语句（参数化后的 SQL 文本）在一个请求中执行超过阈值次数。
+当前请求的统计对象保存在 contextvar 中：请求管道在调用下游前设置，
+同步接口在线程池中执行时 anyio 会复制上下文，统计对象是同一个；请求之外的查询（启动、脚本）不统计。
+"""
+import re
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# 日志中语句文本保留的最大长度
+STATEMENT_LOG_LIMIT = 300
+
+# IN (?, ?, ?) 之类的展开参数列表，长度不同仍视为同一条语句
+_EXPANDED_PARAMS = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*\)")
+
+
+class QueryStats:
+    """一个请求的查询统计"""
+
+    __slots__ = ("count", "total_time", "threshold", "statements", "n_plus_one")
+
+    def __init__(self, threshold: int):
+        self.count = 0
+        self.total_time = 0.0
+        self.threshold = threshold
+        # 语句 -> 执行次数
+        self.statements: Dict[str, int] = {}
+        # 超过阈值的语句，按首次超过的顺序
+        self.n_plus_one: List[str] = []
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.total_time += elapsed
+        executions = self.statements.get(statement, 0) + 1
+        self.statements[statement] = executions
+        if executions == self.threshold + 1:
+            self.n_plus_one.append(statement)
+
+    @property
+    def total_ms(self) -> float:
+        return round(self.total_time * 1000, 2)
+
+    def n_plus_one_report(self) -> List[Dict[str, Any]]:
+        return [
+            {"statement": normalize_statement(statement)[:STATEMENT_LOG_LIMIT], "count": self.statements[statement]}
+            for statement in self.n_plus_one
+        ]
+
+
+def normalize_statement(statement: str) -> str:
+    """折叠空白和展开的参数列表，用于日志展示"""
+    return _EXPANDED_PARAMS.sub("(?)", " ".join(statement.split()))
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def start_request(threshold: int) -> QueryStats:
+    """开始统计当前请求（在调用下游应用之前调用）"""
+    stats = QueryStats(threshold)
+    _current_stats.set(stats)
+    return stats
+
+
+def finish_request() -> None:
+    _current_stats.set(None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+def install(engine: Engine) -> None:
+    """在引擎上注册计时事件（重复调用不会重复注册）"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # 开始时间记在本次执行的上下文上，执行出错时不会残留在连接上
+    if context is not None and _current_stats.get() is not None:
+        context._profiler_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    started = getattr(context, "_profiler_started", None)
+    if stats is not None and started is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+def _handle_error(exception_context):
+    # 执行出错的语句不会触发 after_cursor_execute，同样计入统计
+    stats = _current_stats.get()
+    started = getattr(exception_context.execution_context, "_profiler_started", None)
+    if stats is not None and started is not None and exception_context.statement:
+        stats.record(exception_context.statement, time.perf_counter() - started)
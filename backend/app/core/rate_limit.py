@@ -0,0 +1,227 @@
+"""
+速率限制
+使用滑动窗口计数器：每个键只保存当前和上一个固定窗口的请求数，
+用上一个窗口计数按剩余比例加权、加上当前窗口计数来估算滑动窗口内的请求数。
+每次检查 O(1)，内存固定（进程内最多 RATE_LIMIT_MAX_KEYS 个键，按 LRU 淘汰）。
+配置了 REDIS_URL 时计数保存在 Redis 中，多个 uvicorn 进程共享限额；
+Redis 出错时该请求退回进程内计数，不会因为 Redis 故障拒绝所有请求。
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from app.config.settings import settings
+from app.config.logging import get_logger
+
+logger = get_logger("app.security")
+
+
+class RateLimitPolicy:
+    """
+    限流策略：匹配路径前缀（和请求方法）的请求在 window_seconds 内最多 limit 次。
+    per_principal 为 True 时只适用于携带有效令牌的请求，按认证主体计数；否则按客户端IP计数。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        window_seconds: int,
+        path_prefix: str = "",
+        methods: Optional[Iterable[str]] = None,
+        per_principal: bool = False,
+    ):
+        self.name = name
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.path_prefix = path_prefix
+        self.methods: Optional[FrozenSet[str]] = frozenset(methods) if methods else None
+        self.per_principal = per_principal
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.methods is not None and method not in self.methods:
+            return False
+        return path.startswith(self.path_prefix)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "limit": self.limit,
+            "window_seconds": self.window_seconds,
+            "path_prefix": self.path_prefix or "*",
+            "methods": sorted(self.methods) if self.methods else "*",
+            "key": "principal" if self.per_principal else "ip",
+        }
+
+
+class RateLimitResult:
+    __slots__ = ("allowed", "limit", "remaining", "retry_after")
+
+    def __init__(self, allowed: bool, limit: int, remaining: int, retry_after: int):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.retry_after = retry_after
+
+
+class MemoryRateLimitBackend:
+    """进程内滑动窗口计数器，键数量有上限"""
+
+    name = "memory"
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        # 键 -> [当前窗口序号, 上一窗口计数, 当前窗口计数]
+        self._counters: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    async def hit(self, key: str, limit: int, window_seconds: int, now: float) -> Tuple[bool, int]:
+        """未超限时计数加一；返回 (是否允许, 滑动窗口内的估算请求数)"""
+        window = int(now // window_seconds)
+        weight = 1 - (now % window_seconds) / window_seconds
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None:
+                counter = [window, 0, 0]
+                self._counters[key] = counter
+                if len(self._counters) > self.max_keys:
+                    self._counters.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._counters.move_to_end(key)
+                if counter[0] != window:
+                    # 进入新窗口：相邻窗口时当前计数变为上一窗口计数，否则全部清零
+                    counter[1] = counter[2] if counter[0] == window - 1 else 0
+                    counter[2] = 0
+                    counter[0] = window
+            count = int(counter[1] * weight) + counter[2]
+            if count >= limit:
+                return False, count
+            counter[2] += 1
+            return True, count + 1
+
+    def size(self) -> int:
+        return len(self._counters)
+
+
+class RedisRateLimitBackend:
+    """Redis 滑动窗口计数器，用 Lua 脚本保证检查和计数的原子性"""
+
+    name = "redis"
+
+    SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local count = math.floor(previous * tonumber(ARGV[1])) + current
+if count >= tonumber(ARGV[2]) then
+    return {0, count}
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return {1, count + 1}
+"""
+
+    def __init__(self, url: str):
+        import redis.asyncio as aioredis
+
+        self.client = aioredis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1)
+        self._script = self.client.register_script(self.SCRIPT)
+
+    async def hit(self, key: str, limit: int, window_seconds: int, now: float) -> Tuple[bool, int]:
+        window = int(now // window_seconds)
+        weight = 1 - (now % window_seconds) / window_seconds
+        allowed, count = await self._script(
+            keys=[f"ratelimit:{key}:{window}", f"ratelimit:{key}:{window - 1}"],
+            # 计数需要保留到下一个窗口结束
+            args=[weight, limit, window_seconds * 2],
+        )
+        return bool(allowed), int(count)
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class RateLimiter:
+    """按策略列表检查请求，第一个匹配的策略生效"""
+
+    def __init__(self, policies: List[RateLimitPolicy], max_keys: int, redis_url: Optional[str] = None):
+        self.policies = policies
+        self.has_principal_policies = any(policy.per_principal for policy in policies)
+        self.local_backend = MemoryRateLimitBackend(max_keys)
+        self.backend = self._create_backend(redis_url)
+        self.allowed = 0
+        self.rejected = 0
+        self.errors = 0
+
+    def _create_backend(self, redis_url: Optional[str]):
+        if redis_url:
+            try:
+                return RedisRateLimitBackend(redis_url)
+            except Exception as e:
+                logger.warning(f"Redis限流不可用，改用进程内计数: {e}")
+        return self.local_backend
+
+    def match(self, method: str, path: str, principal: Optional[str]) -> Tuple[Optional[RateLimitPolicy], Optional[str]]:
+        """返回 (适用的策略, 计数键中的身份部分)；principal 为认证主体标识，未认证时为 None"""
+        for policy in self.policies:
+            if not policy.matches(method, path):
+                continue
+            if policy.per_principal:
+                if principal is None:
+                    continue
+                return policy, principal
+            return policy, None
+        return None, None
+
+    async def check(self, policy: RateLimitPolicy, identity: str) -> RateLimitResult:
+        key = f"{policy.name}:{identity}"
+        now = time.time()
+        try:
+            allowed, count = await self.backend.hit(key, policy.limit, policy.window_seconds, now)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Redis限流计数失败，本次改用进程内计数: {e}")
+            allowed, count = await self.local_backend.hit(key, policy.limit, policy.window_seconds, now)
+
+        if allowed:
+            self.allowed += 1
+            retry_after = 0
+        else:
+            self.rejected += 1
+            retry_after = max(1, math.ceil(policy.window_seconds - now % policy.window_seconds))
+        return RateLimitResult(allowed, policy.limit, max(0, policy.limit - count), retry_after)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "tracked_keys": self.backend.size(),
+            "max_keys": self.local_backend.max_keys,
+            "evictions": self.local_backend.evictions,
+            "policies": [policy.describe() for policy in self.policies],
+        }
+
+
+def default_policies() -> List[RateLimitPolicy]:
+    """默认策略（按顺序匹配）：登录接口按IP严格限制，其余请求已认证时按主体、未认证时按IP限制"""
+    window = settings.RATE_LIMIT_WINDOW_SECONDS
+    return [
+        RateLimitPolicy(
+            "login", settings.RATE_LIMIT_LOGIN_REQUESTS, window,
+            path_prefix=f"{settings.API_V1_STR}/auth/login", methods=["POST"],
+        ),
+        RateLimitPolicy("principal", settings.RATE_LIMIT_AUTHENTICATED_REQUESTS, window, per_principal=True),
+        RateLimitPolicy("ip", settings.RATE_LIMIT_REQUESTS, window),
+    ]
+
+
+rate_limiter = RateLimiter(
+    default_policies(),
+    max_keys=settings.RATE_LIMIT_MAX_KEYS,
+    redis_url=settings.REDIS_URL,
+)
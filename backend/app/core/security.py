@@ -1,15 +1,60 @@
 from datetime import datetime, timedelta
-from typing import Any, Union, Optional
+from typing import Any, Union, Optional, Dict
+import enum
 from jose import jwt, JWTError
-from passlib.context import CryptContext
+from pydantic import ValidationError
 from app.config.settings import settings
+from app.schemas.token import TokenPayload
+from app.service.password_service import password_service
 
-# 密码加密上下文
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+class SubjectType(str, enum.Enum):
+    USER = "user"
+    ADMIN = "admin"
+    WORKER = "worker"
+
+
+# 管理员权限在令牌位图中的位序，只能在末尾追加，不能调整已有顺序
+ADMIN_PERMISSIONS = (
+    "system_admin",
+    "user_management",
+    "order_management",
+    "worker_management",
+    "material_management",
+    "service_management",
+    "analytics",
+    "feedback_management",
+    "wage_management",
+)
+SUPER_ADMIN_ROLE = "super_admin"
+
+
+def encode_permissions(permissions: Optional[Dict[str, bool]]) -> int:
+    """把权限配置（{权限名: 是否授予}）编码为位图"""
+    mask = 0
+    for bit, name in enumerate(ADMIN_PERMISSIONS):
+        if permissions and permissions.get(name):
+            mask |= 1 << bit
+    return mask
+
+
+def has_permission(claims: TokenPayload, permission: str) -> bool:
+    """仅根据令牌声明判断管理员权限，超级管理员拥有所有权限"""
+    if claims.role == SUPER_ADMIN_ROLE:
+        return True
+    if permission not in ADMIN_PERMISSIONS:
+        return False
+    return bool(claims.perm & (1 << ADMIN_PERMISSIONS.index(permission)))
 
 
 def create_access_token(
-    subject: Union[str, Any], expires_delta: timedelta = None
+    subject: Union[str, Any],
+    expires_delta: timedelta = None,
+    *,
+    subject_type: SubjectType = SubjectType.USER,
+    role: Optional[str] = None,
+    permissions: int = 0,
+    token_version: int = 0
 ) -> str:
     """创建访问令牌"""
     if expires_delta:
@@ -18,30 +63,55 @@ def create_access_token(
         expire = datetime.utcnow() + timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {
+        "exp": expire,
+        "sub": str(subject),
+        "typ": subject_type.value,
+        "ver": token_version,
+    }
+    if role is not None:
+        to_encode["role"] = role
+    if permissions:
+        to_encode["perm"] = permissions
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
+def create_principal_token(
+    principal: Any, subject_type: SubjectType, expires_delta: timedelta = None
+) -> str:
+    """为已认证的用户/管理员/工人签发令牌，管理员令牌携带角色和权限位图"""
+    role = None
+    permissions = 0
+    if subject_type == SubjectType.ADMIN:
+        role = principal.role.value if hasattr(principal.role, "value") else principal.role
+        permissions = encode_permissions(principal.permissions)
+    return create_access_token(
+        principal.id,
+        expires_delta=expires_delta,
+        subject_type=subject_type,
+        role=role,
+        permissions=permissions,
+        token_version=principal.token_version or 0
+    )
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """验证密码"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_service.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """获取密码哈希"""
-    return pwd_context.hash(password)
+    return password_service.hash(password)
 
 
-def verify_token(token: str) -> Optional[str]:
-    """验证令牌并返回用户标识"""
+def decode_token(token: str) -> Optional[TokenPayload]:
+    """校验签名和有效期并解析令牌声明，不访问数据库；缺少主体类型的旧格式令牌视为无效"""
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            return None
-        return user_id
-    except JWTError:
-        return None 
\ No newline at end of file
+        return TokenPayload.model_validate(payload)
+    except (JWTError, ValidationError):
+        return None
@@ -1,16 +1,21 @@
 from typing import Optional, List
 from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import and_
 from app.crud.base import CRUDBase
+from app.core.cache import principal_cache
 from app.models.admin import Admin, AdminStatus, AdminRole
 from app.schemas.admin import AdminCreate, AdminUpdate
 from app.core.security import get_password_hash, verify_password
+from app.core.password_pool import password_pool
 from app.config.logging import get_crud_logger
 
 logger = get_crud_logger()
 
 
 class CRUDAdmin(CRUDBase[Admin, AdminCreate, AdminUpdate]):
+    password_hash_field = "password_hash"
+
     def get_by_username(self, db: Session, *, username: str) -> Optional[Admin]:
         """根据用户名获取管理员"""
         return db.query(Admin).filter(
@@ -128,6 +133,31 @@ class CRUDAdmin(CRUDBase[Admin, AdminCreate, AdminUpdate]):
         logger.info(f"管理员认证成功: {username}")
         return admin
 
+    async def authenticate_async(self, db: Session, *, username: str, password: str) -> Optional[Admin]:
+        """管理员认证（密码校验在专用线程池中执行，不阻塞事件循环）"""
+        logger.debug(f"管理员认证尝试: {username}")
+        
+        admin = await run_in_threadpool(self.get_by_username, db, username=username)
+        if not admin:
+            logger.warning(f"管理员认证失败 - 用户名不存在: {username}")
+            return None
+        
+        verified, new_hash = await password_pool.verify_and_update(password, admin.password_hash)
+        if not verified:
+            logger.warning(f"管理员认证失败 - 密码错误: {username}")
+            return None
+        
+        if admin.status != AdminStatus.ACTIVE:
+            logger.warning(f"管理员认证失败 - 账号未激活: {username}, 状态: {admin.status}")
+            return None
+        
+        if new_hash:
+            logger.info(f"按当前哈希参数升级管理员密码哈希: {username}")
+            await run_in_threadpool(self.upgrade_password_hash, db, db_obj=admin, new_hash=new_hash)
+        
+        logger.info(f"管理员认证成功: {username}")
+        return admin
+
     def is_active(self, admin: Admin) -> bool:
         """检查管理员是否活跃"""
         return admin.status == AdminStatus.ACTIVE
@@ -185,15 +215,11 @@ class CRUDAdmin(CRUDBase[Admin, AdminCreate, AdminUpdate]):
 
     def count_by_role(self, db: Session, *, role: AdminRole) -> int:
         """统计指定角色的管理员数量"""
-        return db.query(Admin).filter(
-            and_(Admin.role == role, Admin.is_deleted == False)
-        ).count()
+        return self.count_query(self.query_active(db).filter(Admin.role == role))
 
     def count_by_status(self, db: Session, *, status: AdminStatus) -> int:
         """统计指定状态的管理员数量"""
-        return db.query(Admin).filter(
-            and_(Admin.status == status, Admin.is_deleted == False)
-        ).count()
+        return self.count_query(self.query_active(db).filter(Admin.status == status))
 
     def has_permission(self, admin: Admin, permission: str) -> bool:
         """检查管理员是否有指定权限"""
@@ -235,4 +261,7 @@ class CRUDAdmin(CRUDBase[Admin, AdminCreate, AdminUpdate]):
         return admin
 
 
-admin_crud = CRUDAdmin(Admin) 
\ No newline at end of file
+admin_crud = CRUDAdmin(Admin)
+
+# 写入提交后使认证主体缓存失效
+principal_cache.register("admin", Admin)
@@ -1,38 +1,47 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, extract
 from app.models import vehicle, repair_order, feedback, repair_order_worker, repair_worker
+from app.models.analytics_rollup import (
+    AnalyticsCostRollup, AnalyticsVehicleModelRollup, AnalyticsSkillTaskRollup, RollupGranularity
+)
+from app.crud.analytics_rollup import COST_FIELDS
 from decimal import Decimal
 
 class CRUDAnalytics:
+    # 车型、费用趋势、任务分布读取汇总表（由 analytics_rollup_crud 增量维护），
+    # 耗时与历史订单量无关
+
     def get_vehicle_repair_stats(self, db: Session):
-        return db.query(
-            vehicle.Vehicle.model,
-            func.count(repair_order.RepairOrder.id).label("repair_count"),
-            func.avg(repair_order.RepairOrder.total_cost).label("average_cost")
-        ).join(vehicle.Vehicle, repair_order.RepairOrder.vehicle_id == vehicle.Vehicle.id)\
-         .filter(repair_order.RepairOrder.status == 'completed')\
-         .group_by(vehicle.Vehicle.model).all()
+        rows = db.query(AnalyticsVehicleModelRollup).filter(
+            AnalyticsVehicleModelRollup.repair_count > 0
+        ).order_by(AnalyticsVehicleModelRollup.model).all()
+        return [
+            {
+                "model": row.model,
+                "repair_count": row.repair_count,
+                "average_cost": Decimal(row.total_cost) / row.repair_count
+            }
+            for row in rows
+        ]
 
     def get_cost_trends(self, db: Session, period: str = 'month'):
-        # period can be 'month' or 'quarter'
-        # Replaced PostgreSQL-specific date_trunc with MySQL-compatible functions
-        if period == 'quarter':
-            date_trunc_field = func.concat(
-                func.year(repair_order.RepairOrder.actual_completion_time),
-                '-Q',
-                func.quarter(repair_order.RepairOrder.actual_completion_time)
-            )
-        else:  # default to 'month'
-            date_trunc_field = func.date_format(repair_order.RepairOrder.actual_completion_time, '%Y-%m')
+        # period can be 'month' or 'quarter'; quarters are summed from the monthly rollup
+        rows = db.query(AnalyticsCostRollup).filter(
+            AnalyticsCostRollup.granularity == RollupGranularity.MONTH,
+            AnalyticsCostRollup.order_count > 0
+        ).order_by(AnalyticsCostRollup.period).all()
 
-        return db.query(
-            date_trunc_field.label("period"),
-            func.sum(repair_order.RepairOrder.total_labor_cost).label("labor_cost"),
-            func.sum(repair_order.RepairOrder.total_material_cost).label("material_cost"),
-            func.sum(repair_order.RepairOrder.total_service_cost).label("service_cost"),
-            func.sum(repair_order.RepairOrder.total_cost).label("total_cost")
-        ).filter(repair_order.RepairOrder.status == 'completed')\
-         .group_by("period").order_by("period").all()
+        trends = {}
+        for row in rows:
+            if period == 'quarter':
+                year, month = row.period.split("-")
+                key = f"{year}-Q{(int(month) - 1) // 3 + 1}"
+            else:  # default to 'month'
+                key = row.period
+            point = trends.setdefault(key, {"period": key, **{field: Decimal("0") for field in COST_FIELDS}})
+            for field in COST_FIELDS:
+                point[field] += Decimal(getattr(row, field))
+        return list(trends.values())
 
     def get_negative_feedback_cases(self, db: Session, rating_threshold: int = 2):
         return db.query(
@@ -49,14 +58,19 @@ class CRUDAnalytics:
          .filter(feedback.Feedback.rating <= rating_threshold).all()
 
     def get_worker_task_distribution(self, db: Session):
-        total_tasks = db.query(func.count(repair_order_worker.RepairOrderWorker.id)).scalar() or 1
-        
-        return db.query(
-            repair_worker.RepairWorker.skill_type,
-            func.count(repair_order_worker.RepairOrderWorker.id).label("task_count"),
-            (func.count(repair_order_worker.RepairOrderWorker.id) * 100.0 / total_tasks).label("percentage")
-        ).join(repair_worker.RepairWorker, repair_order_worker.RepairOrderWorker.worker_id == repair_worker.RepairWorker.id)\
-         .group_by(repair_worker.RepairWorker.skill_type).all()
+        rows = db.query(AnalyticsSkillTaskRollup).filter(
+            AnalyticsSkillTaskRollup.task_count > 0
+        ).order_by(AnalyticsSkillTaskRollup.skill_type).all()
+        total_tasks = sum(row.task_count for row in rows) or 1
+
+        return [
+            {
+                "skill_type": row.skill_type,
+                "task_count": row.task_count,
+                "percentage": row.task_count * 100.0 / total_tasks
+            }
+            for row in rows
+        ]
 
     def get_unfinished_order_stats(self, db: Session):
         return db.query(
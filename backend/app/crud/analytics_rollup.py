@@ -0,0 +1,167 @@
+from typing import Optional, Dict, Any, Type
+from collections import defaultdict
+from decimal import Decimal
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import func
+
+from app.models.analytics_rollup import (
+    AnalyticsCostRollup, AnalyticsVehicleModelRollup, AnalyticsSkillTaskRollup, RollupGranularity
+)
+from app.models.repair_order import RepairOrder, OrderStatus
+from app.models.repair_order_worker import RepairOrderWorker
+from app.models.repair_worker import RepairWorker
+from app.models.vehicle import Vehicle
+from app.config.logging import get_crud_logger
+
+COST_FIELDS = ("labor_cost", "material_cost", "service_cost", "total_cost")
+
+
+class CRUDAnalyticsRollup:
+    """
+    分析汇总表的维护：订单完成/状态变化、工单分配变化时增量更新，
+    以及从业务表全量重建（用于历史数据回填）。
+    增量方法只向会话写入，由调用方随业务修改一起提交。
+    """
+
+    def __init__(self):
+        self.logger = get_crud_logger()
+
+    # ---------- 增量更新 ----------
+
+    def order_snapshot(self, order: RepairOrder) -> Optional[Dict[str, Any]]:
+        """订单对汇总表的贡献；未完成的订单不计入，缺少完成时间的订单只计入车型汇总（与 rebuild 一致）"""
+        if order.status != OrderStatus.COMPLETED:
+            return None
+        completed_at = order.actual_completion_time
+        return {
+            "day": completed_at.strftime("%Y-%m-%d") if completed_at else None,
+            "model": order.vehicle.model if order.vehicle else None,
+            "labor_cost": order.total_labor_cost or Decimal("0"),
+            "material_cost": order.total_material_cost or Decimal("0"),
+            "service_cost": order.total_service_cost or Decimal("0"),
+            "total_cost": order.total_cost or Decimal("0"),
+        }
+
+    def apply_order_change(
+        self, db: Session, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]
+    ) -> None:
+        """撤销订单修改前的贡献并计入修改后的贡献"""
+        if before == after:
+            return
+        if before:
+            self._apply_order(db, before, -1)
+        if after:
+            self._apply_order(db, after, 1)
+
+    def apply_assignment(self, db: Session, *, skill_type: str, delta: int) -> None:
+        """工单分配新增(+1)或撤销(-1)"""
+        self._increment(
+            db, AnalyticsSkillTaskRollup, {"skill_type": skill_type}, {"task_count": delta}
+        )
+
+    def _apply_order(self, db: Session, snapshot: Dict[str, Any], sign: int) -> None:
+        costs = {field: snapshot[field] * sign for field in COST_FIELDS}
+        periods = () if snapshot["day"] is None else (
+            (RollupGranularity.DAY, snapshot["day"]),
+            (RollupGranularity.MONTH, snapshot["day"][:7]),
+        )
+        for granularity, period in periods:
+            self._increment(
+                db, AnalyticsCostRollup,
+                {"granularity": granularity, "period": period},
+                {"order_count": sign, **costs}
+            )
+        if snapshot["model"]:
+            self._increment(
+                db, AnalyticsVehicleModelRollup,
+                {"model": snapshot["model"]},
+                {"repair_count": sign, "total_cost": costs["total_cost"]}
+            )
+
+    def _increment(self, db: Session, model: Type, keys: Dict[str, Any], deltas: Dict[str, Any]) -> None:
+        """原子累加：UPDATE col = col + delta，行不存在时插入（并发插入冲突时重试更新）"""
+        values = {getattr(model, name): getattr(model, name) + delta for name, delta in deltas.items()}
+        if db.query(model).filter_by(**keys).update(values, synchronize_session=False):
+            return
+        try:
+            with db.begin_nested():
+                db.add(model(**keys, **deltas))
+        except IntegrityError:
+            db.query(model).filter_by(**keys).update(values, synchronize_session=False)
+
+    # ---------- 全量重建 ----------
+
+    def rebuild(self, db: Session) -> Dict[str, int]:
+        """清空汇总表并从业务表重新聚合"""
+        self.logger.info("开始重建分析汇总表")
+        for model in (AnalyticsCostRollup, AnalyticsVehicleModelRollup, AnalyticsSkillTaskRollup):
+            db.query(model).delete(synchronize_session=False)
+
+        completed = RepairOrder.status == OrderStatus.COMPLETED
+
+        # 按日汇总费用，按月汇总由日汇总累加
+        day_column = func.date(RepairOrder.actual_completion_time)
+        daily_rows = db.query(
+            day_column.label("day"),
+            func.count(RepairOrder.id).label("order_count"),
+            func.sum(RepairOrder.total_labor_cost).label("labor_cost"),
+            func.sum(RepairOrder.total_material_cost).label("material_cost"),
+            func.sum(RepairOrder.total_service_cost).label("service_cost"),
+            func.sum(RepairOrder.total_cost).label("total_cost"),
+        ).filter(
+            completed, RepairOrder.actual_completion_time.isnot(None)
+        ).group_by(day_column).all()
+
+        monthly = defaultdict(lambda: {"order_count": 0, **{field: Decimal("0") for field in COST_FIELDS}})
+        for row in daily_rows:
+            day = str(row.day)[:10]
+            costs = {field: Decimal(str(getattr(row, field) or 0)) for field in COST_FIELDS}
+            db.add(AnalyticsCostRollup(
+                granularity=RollupGranularity.DAY, period=day, order_count=row.order_count, **costs
+            ))
+            month = monthly[day[:7]]
+            month["order_count"] += row.order_count
+            for field in COST_FIELDS:
+                month[field] += costs[field]
+        for period, values in monthly.items():
+            db.add(AnalyticsCostRollup(granularity=RollupGranularity.MONTH, period=period, **values))
+
+        # 按车型汇总
+        model_rows = db.query(
+            Vehicle.model,
+            func.count(RepairOrder.id).label("repair_count"),
+            func.sum(RepairOrder.total_cost).label("total_cost"),
+        ).join(Vehicle, RepairOrder.vehicle_id == Vehicle.id).filter(completed).group_by(Vehicle.model).all()
+        for row in model_rows:
+            db.add(AnalyticsVehicleModelRollup(
+                model=row.model, repair_count=row.repair_count, total_cost=row.total_cost or 0
+            ))
+
+        # 按技能类型汇总工单分配
+        skill_rows = db.query(
+            RepairWorker.skill_type,
+            func.count(RepairOrderWorker.id).label("task_count"),
+        ).join(RepairWorker, RepairOrderWorker.worker_id == RepairWorker.id).group_by(RepairWorker.skill_type).all()
+        for row in skill_rows:
+            db.add(AnalyticsSkillTaskRollup(skill_type=row.skill_type, task_count=row.task_count))
+
+        db.commit()
+        result = {
+            "daily_periods": len(daily_rows),
+            "monthly_periods": len(monthly),
+            "vehicle_models": len(model_rows),
+            "skill_types": len(skill_rows),
+        }
+        self.logger.info(f"分析汇总表重建完成: {result}")
+        return result
+
+    def is_empty(self, db: Session) -> bool:
+        """汇总表是否尚未生成"""
+        return not any(
+            db.query(model.id).first()
+            for model in (AnalyticsCostRollup, AnalyticsVehicleModelRollup, AnalyticsSkillTaskRollup)
+        )
+
+
+analytics_rollup_crud = CRUDAnalyticsRollup()
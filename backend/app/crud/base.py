@@ -1,16 +1,52 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from typing import Any, Dict, Generic, List, Optional, Sequence, Tuple, Type, TypeVar, Union
+from datetime import datetime
+import base64
+import binascii
+import json
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, Query
+from sqlalchemy import Select, and_, or_, func, select
 
 from app.models.base import BaseModel as DBBaseModel
+from app.schemas.base import PaginationParams, PaginatedResponse
+from app.core.exceptions import BusinessLogicException
 
 ModelType = TypeVar("ModelType", bound=DBBaseModel)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+def encode_cursor(values: Sequence[Any]) -> str:
+    """把键集取值编码为不透明的游标字符串"""
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence[Any]) -> List[Any]:
+    """解析游标字符串，按列类型还原键集取值"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(raw, list) or len(raw) != len(columns):
+            raise ValueError("cursor length mismatch")
+        values = []
+        for column, value in zip(columns, raw):
+            if column.type.python_type is datetime:
+                value = datetime.fromisoformat(value)
+            values.append(value)
+        return values
+    except (ValueError, TypeError, UnicodeError, binascii.Error):
+        raise BusinessLogicException("无效的分页游标", error_code="INVALID_CURSOR")
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    # 游标分页使用的键集列（须非空且组合唯一），为空时使用主键
+    keyset_columns: Tuple[Any, ...] = ()
+    keyset_descending: bool = False
+    # 保存密码哈希的列名（可登录的模型设置）
+    password_hash_field: Optional[str] = None
+
     def __init__(self, model: Type[ModelType]):
         self.model = model
 
@@ -22,9 +58,96 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def get_multi(
         self, db: Session, *, skip: int = 0, limit: int = 100
     ) -> List[ModelType]:
-        return db.query(self.model).filter(
-            self.model.is_deleted == False
-        ).offset(skip).limit(limit).all()
+        return self.query_active(db).offset(skip).limit(limit).all()
+
+    def query_active(self, db: Session) -> Query:
+        """未删除记录的基础查询，供分页等场景继续追加条件"""
+        return db.query(self.model).filter(self.model.is_deleted == False)
+
+    def count_query(self, query: Query) -> int:
+        """
+        对查询执行 SELECT COUNT，不加载任何行。
+        会去掉排序并禁用预加载，只保留过滤和连接条件。
+        """
+        return query.enable_eagerloads(False).with_entities(
+            func.count(self.model.id)
+        ).order_by(None).scalar() or 0
+
+    def get_keyset(self) -> Tuple[Any, ...]:
+        return self.keyset_columns or (self.model.id,)
+
+    def fetch_page(
+        self,
+        query: Query,
+        *,
+        limit: int,
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        按键集排序取一页数据，返回 (数据, 下一页游标)。
+        传入 cursor 时用 WHERE 条件定位到上一页末尾（不使用 OFFSET），
+        深分页的代价与第一页相同；否则退回 OFFSET 分页。
+        """
+        query = self._order_by_keyset(query, offset=offset, cursor=cursor)
+        # 多取一条用于判断是否还有下一页
+        rows = query.limit(limit + 1).all()
+        return self._split_page(rows, limit)
+
+    def _order_by_keyset(self, query: Union[Query, Select], *, offset: int, cursor: Optional[str]):
+        """按键集排序并定位到游标之后（或跳过 offset 行），Query 和 Select 通用"""
+        keyset = self.get_keyset()
+        if self.keyset_descending:
+            ordering = [column.desc() for column in keyset]
+        else:
+            ordering = [column.asc() for column in keyset]
+        query = query.order_by(None).order_by(*ordering)
+
+        if cursor:
+            query = query.filter(self._keyset_after(keyset, decode_cursor(cursor, keyset)))
+        elif offset:
+            query = query.offset(offset)
+        return query
+
+    def _split_page(self, rows: Sequence[ModelType], limit: int) -> Tuple[List[ModelType], Optional[str]]:
+        """多取的一条存在时，按当前页最后一条生成下一页游标"""
+        items = list(rows[:limit])
+        next_cursor = None
+        if len(rows) > limit and items:
+            last = items[-1]
+            next_cursor = encode_cursor([getattr(last, column.key) for column in self.get_keyset()])
+        return items, next_cursor
+
+    def _keyset_after(self, keyset: Sequence[Any], values: Sequence[Any]):
+        """生成“排在游标之后”的条件：(a, b) > (x, y) 展开为 a > x OR (a = x AND b > y)"""
+        conditions = []
+        for i, column in enumerate(keyset):
+            if self.keyset_descending:
+                beyond = column < values[i]
+            else:
+                beyond = column > values[i]
+            equal_prefix = [keyset[j] == values[j] for j in range(i)]
+            conditions.append(and_(*equal_prefix, beyond) if equal_prefix else beyond)
+        return or_(*conditions)
+
+    def paginate(self, query: Query, params: PaginationParams) -> PaginatedResponse:
+        """
+        分页查询：一次 COUNT 取总数，再只取当前页的数据。
+        查询上的 joinedload/selectinload 等选项只作用于当前页。
+        支持 page/size 偏移分页，以及 cursor 游标分页（响应中的 next_cursor）；
+        游标分页不执行 COUNT（大表上 COUNT 需要扫描全部匹配行），total 为 None。
+        """
+        total = self.count_query(query) if not params.cursor else None
+        items, next_cursor = self.fetch_page(
+            query, limit=params.size, offset=params.get_offset(), cursor=params.cursor
+        )
+        return PaginatedResponse.create(
+            items=items,
+            total=total,
+            page=params.page,
+            size=params.size,
+            next_cursor=next_cursor
+        )
 
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
         obj_in_data = jsonable_encoder(obj_in)
@@ -62,5 +185,171 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             db.commit()
         return obj
 
+    def upgrade_password_hash(self, db: Session, *, db_obj: ModelType, new_hash: str) -> None:
+        """
+        登录成功后按当前哈希参数替换旧哈希。
+        直接执行 UPDATE，不触发令牌版本递增，已签发的令牌继续有效。
+        提交后在此处（调用方的线程池中）重新加载对象，避免之后在事件循环中访问属性时触发同步刷新。
+        """
+        column = getattr(self.model, self.password_hash_field)
+        db.query(self.model).filter(self.model.id == db_obj.id).update(
+            {column: new_hash}, synchronize_session=False
+        )
+        db.commit()
+        db.refresh(db_obj)
+
     def count(self, db: Session) -> int:
-        return db.query(self.model).filter(self.model.is_deleted == False).count()
+        return self.count_query(self.query_active(db))
+
+    def status_histogram(
+        self,
+        db: Session,
+        *,
+        column: Any = None,
+        aggregates: Optional[Dict[str, Any]] = None,
+        filters: Sequence[Any] = ()
+    ) -> Dict[Any, Dict[str, Any]]:
+        """
+        一次 GROUP BY 统计未删除记录按某列（默认 status）的分布。
+        aggregates 为 {名称: 聚合表达式}，与计数在同一条查询中计算。
+        返回 {分组值: {"count": 数量, <名称>: 聚合值}}，枚举分组值转换为其 value，
+        没有记录的分组不会出现在结果中。
+        """
+        statement = self._histogram_select(column, aggregates, filters)
+        return self._histogram_rows(db.execute(statement).all(), aggregates)
+
+    def _histogram_select(self, column: Any, aggregates: Optional[Dict[str, Any]], filters: Sequence[Any]) -> Select:
+        if column is None:
+            column = self.model.status
+        columns = [column, func.count(self.model.id).label("count")]
+        for name, expression in (aggregates or {}).items():
+            columns.append(expression.label(name))
+        return select(*columns).filter(
+            self.model.is_deleted == False, *filters
+        ).group_by(column)
+
+    def _histogram_rows(self, rows: Sequence[Any], aggregates: Optional[Dict[str, Any]]) -> Dict[Any, Dict[str, Any]]:
+        histogram = {}
+        for row in rows:
+            values = row._asdict()
+            key = row[0].value if hasattr(row[0], "value") else row[0]
+            histogram[key] = {name: values[name] for name in ["count", *(aggregates or {})]}
+        return histogram
+
+    def status_counts(self, db: Session, *, column: Any = None, filters: Sequence[Any] = ()) -> Dict[Any, int]:
+        """按某列（默认 status）分组计数，返回 {分组值: 数量}"""
+        histogram = self.status_histogram(db, column=column, filters=filters)
+        return {key: stats["count"] for key, stats in histogram.items()}
+
+
+    # ---------- 异步会话（async def 接口使用） ----------
+    # 与上面的同步方法一一对应，查询用 select() 语句构造，
+    # 等待数据库期间让出事件循环，不占用线程池中的线程。
+
+    def select_active(self) -> Select:
+        """未删除记录的基础语句，供分页等场景继续追加条件"""
+        return select(self.model).filter(self.model.is_deleted == False)
+
+    async def get_async(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
+        result = await db.execute(
+            select(self.model).filter(and_(self.model.id == id, self.model.is_deleted == False)).limit(1)
+        )
+        return result.scalars().first()
+
+    async def get_multi_async(
+        self, db: AsyncSession, *, skip: int = 0, limit: int = 100
+    ) -> List[ModelType]:
+        result = await db.execute(self.select_active().offset(skip).limit(limit))
+        return list(result.scalars().all())
+
+    async def count_select_async(self, db: AsyncSession, statement: Select) -> int:
+        """对语句执行 SELECT COUNT，保留过滤和连接条件，去掉排序（预加载选项对计数列不生效）"""
+        count_statement = statement.with_only_columns(func.count(self.model.id)).order_by(None)
+        return await db.scalar(count_statement) or 0
+
+    async def count_async(self, db: AsyncSession) -> int:
+        return await self.count_select_async(db, self.select_active())
+
+    async def fetch_page_async(
+        self,
+        db: AsyncSession,
+        statement: Select,
+        *,
+        limit: int,
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """fetch_page 的异步版本"""
+        statement = self._order_by_keyset(statement, offset=offset, cursor=cursor)
+        result = await db.execute(statement.limit(limit + 1))
+        # joinedload 集合关系时同一实体会出现在多行中
+        rows = result.unique().scalars().all()
+        return self._split_page(rows, limit)
+
+    async def paginate_async(self, db: AsyncSession, statement: Select, params: PaginationParams) -> PaginatedResponse:
+        """paginate 的异步版本"""
+        total = await self.count_select_async(db, statement) if not params.cursor else None
+        items, next_cursor = await self.fetch_page_async(
+            db, statement, limit=params.size, offset=params.get_offset(), cursor=params.cursor
+        )
+        return PaginatedResponse.create(
+            items=items,
+            total=total,
+            page=params.page,
+            size=params.size,
+            next_cursor=next_cursor
+        )
+
+    async def create_async(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
+        obj_in_data = jsonable_encoder(obj_in)
+        db_obj = self.model(**obj_in_data)
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def update_async(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+    ) -> ModelType:
+        obj_data = jsonable_encoder(db_obj)
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        for field in obj_data:
+            if field in update_data:
+                setattr(db_obj, field, update_data[field])
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def remove_async(self, db: AsyncSession, *, id: int) -> ModelType:
+        obj = await db.get(self.model, id)
+        if obj:
+            obj.soft_delete()
+            db.add(obj)
+            await db.commit()
+        return obj
+
+    async def status_histogram_async(
+        self,
+        db: AsyncSession,
+        *,
+        column: Any = None,
+        aggregates: Optional[Dict[str, Any]] = None,
+        filters: Sequence[Any] = ()
+    ) -> Dict[Any, Dict[str, Any]]:
+        """status_histogram 的异步版本"""
+        result = await db.execute(self._histogram_select(column, aggregates, filters))
+        return self._histogram_rows(result.all(), aggregates)
+
+    async def status_counts_async(
+        self, db: AsyncSession, *, column: Any = None, filters: Sequence[Any] = ()
+    ) -> Dict[Any, int]:
+        histogram = await self.status_histogram_async(db, column=column, filters=filters)
+        return {key: stats["count"] for key, stats in histogram.items()}
@@ -1,14 +1,17 @@
 from typing import Optional, List
 from datetime import datetime
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc, func
+from sqlalchemy.orm import Session, Query
+from sqlalchemy import and_, desc, func, case
 
 from app.crud.base import CRUDBase
+from app.core.cache import invalidate_on_write
 from app.models.feedback import Feedback, FeedbackStatus, FeedbackType
 from app.schemas.feedback import FeedbackCreate, FeedbackUpdate, FeedbackAdminUpdate
 
 
 class CRUDFeedback(CRUDBase[Feedback, FeedbackCreate, FeedbackUpdate]):
+    keyset_columns = (Feedback.created_at, Feedback.id)
+    keyset_descending = True
     
     def create_feedback(self, db: Session, *, obj_in: FeedbackCreate, user_id: int) -> Feedback:
         """创建反馈"""
@@ -45,12 +48,16 @@ class CRUDFeedback(CRUDBase[Feedback, FeedbackCreate, FeedbackUpdate]):
         limit: int = 100
     ) -> List[Feedback]:
         """根据状态获取反馈"""
+        return self.query_by_status(db, status=status).offset(skip).limit(limit).all()
+
+    def query_by_status(self, db: Session, *, status: FeedbackStatus) -> Query:
+        """按状态过滤反馈的查询，按创建时间倒序"""
         return db.query(self.model).filter(
             and_(
                 self.model.status == status,
                 self.model.is_deleted == False
             )
-        ).order_by(desc(self.model.created_at)).offset(skip).limit(limit).all()
+        ).order_by(desc(self.model.created_at))
     
     def get_by_type(
         self, 
@@ -61,12 +68,16 @@ class CRUDFeedback(CRUDBase[Feedback, FeedbackCreate, FeedbackUpdate]):
         limit: int = 100
     ) -> List[Feedback]:
         """根据类型获取反馈"""
+        return self.query_by_type(db, feedback_type=feedback_type).offset(skip).limit(limit).all()
+
+    def query_by_type(self, db: Session, *, feedback_type: FeedbackType) -> Query:
+        """按类型过滤反馈的查询，按创建时间倒序"""
         return db.query(self.model).filter(
             and_(
                 self.model.feedback_type == feedback_type,
                 self.model.is_deleted == False
             )
-        ).order_by(desc(self.model.created_at)).offset(skip).limit(limit).all()
+        ).order_by(desc(self.model.created_at))
     
     def get_published(
         self, 
@@ -127,61 +138,28 @@ class CRUDFeedback(CRUDBase[Feedback, FeedbackCreate, FeedbackUpdate]):
         return self.update(db, db_obj=db_obj, obj_in=obj_data)
     
     def get_statistics(self, db: Session) -> dict:
-        """获取反馈统计"""
-        total_feedback = db.query(func.count(self.model.id)).filter(
-            self.model.is_deleted == False
-        ).scalar()
-        
-        pending_count = db.query(func.count(self.model.id)).filter(
-            and_(
-                self.model.status == FeedbackStatus.PENDING,
-                self.model.is_deleted == False
-            )
-        ).scalar()
-        
-        published_count = db.query(func.count(self.model.id)).filter(
-            and_(
-                self.model.status == FeedbackStatus.PUBLISHED,
-                self.model.is_deleted == False
-            )
-        ).scalar()
+        """获取反馈统计（按状态、按类型各一次 GROUP BY）"""
+        # 按状态统计，评分的总和与数量作为附加聚合在同一查询中计算
+        histogram = self.status_histogram(db, aggregates={
+            "rating_sum": func.sum(self.model.rating),
+            "rating_count": func.sum(case((self.model.rating.isnot(None), 1), else_=0)),
+        })
         
-        rejected_count = db.query(func.count(self.model.id)).filter(
-            and_(
-                self.model.status == FeedbackStatus.REJECTED,
-                self.model.is_deleted == False
-            )
-        ).scalar()
+        def status_count(status: FeedbackStatus) -> int:
+            return histogram.get(status.value, {}).get("count", 0)
         
-        # 评分统计
-        rating_stats = db.query(
-            func.avg(self.model.rating).label('avg_rating'),
-            func.count(self.model.rating).label('rating_count')
-        ).filter(
-            and_(
-                self.model.rating.isnot(None),
-                self.model.is_deleted == False
-            )
-        ).first()
-        
-        avg_rating = float(rating_stats.avg_rating) if rating_stats.avg_rating else 0
-        rating_count = rating_stats.rating_count or 0
+        rating_sum = sum(float(stats["rating_sum"] or 0) for stats in histogram.values())
+        rating_count = sum(int(stats["rating_count"] or 0) for stats in histogram.values())
+        avg_rating = rating_sum / rating_count if rating_count else 0
         
         # 按类型统计
-        type_stats = db.query(
-            self.model.feedback_type,
-            func.count(self.model.id).label('count')
-        ).filter(
-            self.model.is_deleted == False
-        ).group_by(self.model.feedback_type).all()
-        
-        type_distribution = {stat.feedback_type.value: stat.count for stat in type_stats}
+        type_distribution = self.status_counts(db, column=self.model.feedback_type)
         
         return {
-            "total_feedback": total_feedback,
-            "pending_count": pending_count,
-            "published_count": published_count,
-            "rejected_count": rejected_count,
+            "total_feedback": sum(stats["count"] for stats in histogram.values()),
+            "pending_count": status_count(FeedbackStatus.PENDING),
+            "published_count": status_count(FeedbackStatus.PUBLISHED),
+            "rejected_count": status_count(FeedbackStatus.REJECTED),
             "average_rating": round(avg_rating, 2),
             "total_ratings": rating_count,
             "type_distribution": type_distribution
@@ -200,4 +178,7 @@ class CRUDFeedback(CRUDBase[Feedback, FeedbackCreate, FeedbackUpdate]):
         return self.remove(db, id=id)
 
 
-feedback_crud = CRUDFeedback(Feedback) 
\ No newline at end of file
+feedback_crud = CRUDFeedback(Feedback)
+
+# 写入提交后使分析缓存失效
+invalidate_on_write(Feedback)
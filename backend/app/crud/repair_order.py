@@ -1,14 +1,19 @@
-from typing import Optional, List
+from typing import Optional, List, Dict, Any, Union
 from datetime import datetime
 from decimal import Decimal
-from sqlalchemy.orm import Session, joinedload, selectinload
-from sqlalchemy import and_, or_, func
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, Query, joinedload, selectinload
+from sqlalchemy import Select, and_, or_, func, select
 from app.crud.base import CRUDBase
+from app.core.cache import invalidate_on_write
+from app.crud.analytics_rollup import analytics_rollup_crud
 from app.models.repair_order import RepairOrder, OrderStatus
 from app.models.repair_worker import RepairWorker, WorkerStatus
 from app.models.repair_order_worker import RepairOrderWorker
 from app.models.material import Material
 from app.models.repair_material import RepairMaterial
+from app.models.repair_order_service import RepairOrderService
 from app.models.wage import Wage
 from app.schemas.repair_order import RepairOrderCreate, RepairOrderUpdate, RepairOrderComplete, WorkCompletionUpdate
 import random
@@ -18,6 +23,9 @@ OVERTIME_RATE_MULTIPLIER = Decimal("1.5")
 
 
 class CRUDRepairOrder(CRUDBase[RepairOrder, RepairOrderCreate, RepairOrderUpdate]):
+    keyset_columns = (RepairOrder.create_time, RepairOrder.id)
+    keyset_descending = True
+
     def get_by_order_number(self, db: Session, *, order_number: str) -> Optional[RepairOrder]:
         """根据订单编号获取维修订单"""
         return db.query(RepairOrder).filter(
@@ -44,12 +52,31 @@ class CRUDRepairOrder(CRUDBase[RepairOrder, RepairOrderCreate, RepairOrderUpdate
 
     def get_by_status_with_details(self, db: Session, *, status: OrderStatus, skip: int = 0, limit: int = 100) -> List[RepairOrder]:
         """根据状态获取维修订单（包含详细信息）"""
-        return db.query(RepairOrder).options(
+        return self.query_with_details(db, status=status).offset(skip).limit(limit).all()
+
+    def query_with_details(self, db: Session, *, status: Optional[OrderStatus] = None) -> Query:
+        """维修订单列表查询（预加载车辆和用户），可按状态过滤"""
+        query = db.query(RepairOrder).options(
             joinedload(RepairOrder.vehicle),
             joinedload(RepairOrder.user)
-        ).filter(
-            and_(RepairOrder.status == status, RepairOrder.is_deleted == False)
-        ).offset(skip).limit(limit).all()
+        ).filter(RepairOrder.is_deleted == False)
+        if status:
+            query = query.filter(RepairOrder.status == status)
+        return query
+
+    def select_with_details(self, *, status: Optional[OrderStatus] = None) -> Select:
+        """
+        query_with_details 对应的语句（异步会话使用）。
+        异步会话不能延迟加载，响应中的工人信息也一并预加载
+        """
+        statement = select(RepairOrder).options(
+            joinedload(RepairOrder.vehicle),
+            joinedload(RepairOrder.user),
+            selectinload(RepairOrder.assigned_workers).selectinload(RepairOrderWorker.worker)
+        ).filter(RepairOrder.is_deleted == False)
+        if status:
+            statement = statement.filter(RepairOrder.status == status)
+        return statement
 
     def get_pending_orders(self, db: Session, skip: int = 0, limit: int = 100) -> List[RepairOrder]:
         """获取待处理的维修订单"""
@@ -89,6 +116,7 @@ class CRUDRepairOrder(CRUDBase[RepairOrder, RepairOrderCreate, RepairOrderUpdate
                 hourly_rate=assigned_worker.hourly_rate
             )
             db.add(assignment)
+            analytics_rollup_crud.apply_assignment(db, skill_type=assigned_worker.skill_type, delta=1)
             
             # 更新订单状态
             db_obj.status = OrderStatus.IN_PROGRESS
@@ -102,6 +130,7 @@ class CRUDRepairOrder(CRUDBase[RepairOrder, RepairOrderCreate, RepairOrderUpdate
         order = self.get(db, id=order_id)
         if not order:
             return None
+        rollup_before = analytics_rollup_crud.order_snapshot(order)
         
         order.status = status
         if notes:
@@ -112,20 +141,50 @@ class CRUDRepairOrder(CRUDBase[RepairOrder, RepairOrderCreate, RepairOrderUpdate
             order.actual_completion_time = datetime.utcnow()
         
         db.add(order)
+        analytics_rollup_crud.apply_order_change(db, rollup_before, analytics_rollup_crud.order_snapshot(order))
         db.commit()
         db.refresh(order)
         return order
 
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: RepairOrder,
+        obj_in: Union[RepairOrderUpdate, Dict[str, Any]]
+    ) -> RepairOrder:
+        """更新维修订单，状态、费用或完成时间变化时在同一事务中同步分析汇总表"""
+        rollup_before = analytics_rollup_crud.order_snapshot(db_obj)
+        obj_data = jsonable_encoder(db_obj)
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        for field in obj_data:
+            if field in update_data:
+                setattr(db_obj, field, update_data[field])
+        db.add(db_obj)
+        db.flush()
+        if "vehicle_id" in update_data:
+            # 换车后按新车型计入车型汇总
+            db.expire(db_obj, ["vehicle"])
+        analytics_rollup_crud.apply_order_change(db, rollup_before, analytics_rollup_crud.order_snapshot(db_obj))
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+
     def calculate_total_cost(self, db: Session, *, order_id: int) -> Optional[RepairOrder]:
         """计算订单总费用"""
         order = self.get(db, id=order_id)
         if not order:
             return None
+        rollup_before = analytics_rollup_crud.order_snapshot(order)
         
         # 计算总费用（人工费 + 材料费 + 服务费）
         order.total_cost = order.total_labor_cost + order.total_material_cost + order.total_service_cost
         
         db.add(order)
+        analytics_rollup_crud.apply_order_change(db, rollup_before, analytics_rollup_crud.order_snapshot(order))
         db.commit()
         db.refresh(order)
         return order
@@ -147,27 +206,19 @@ class CRUDRepairOrder(CRUDBase[RepairOrder, RepairOrderCreate, RepairOrderUpdate
         return order_number
 
     def get_statistics(self, db: Session) -> dict:
-        """获取订单统计信息"""
-        total = self.count(db)
-        pending = db.query(func.count(RepairOrder.id)).filter(
-            and_(RepairOrder.status == OrderStatus.PENDING, RepairOrder.is_deleted == False)
-        ).scalar()
-        in_progress = db.query(func.count(RepairOrder.id)).filter(
-            and_(RepairOrder.status == OrderStatus.IN_PROGRESS, RepairOrder.is_deleted == False)
-        ).scalar()
-        completed = db.query(func.count(RepairOrder.id)).filter(
-            and_(RepairOrder.status == OrderStatus.COMPLETED, RepairOrder.is_deleted == False)
-        ).scalar()
-        cancelled = db.query(func.count(RepairOrder.id)).filter(
-            and_(RepairOrder.status == OrderStatus.CANCELLED, RepairOrder.is_deleted == False)
-        ).scalar()
-        
+        """获取订单统计信息（单次 GROUP BY status）"""
+        return self._statistics(self.status_counts(db))
+
+    async def get_statistics_async(self, db: AsyncSession) -> dict:
+        return self._statistics(await self.status_counts_async(db))
+
+    def _statistics(self, counts: Dict[Any, int]) -> dict:
         return {
-            "total": total,
-            "pending": pending,
-            "in_progress": in_progress,
-            "completed": completed,
-            "cancelled": cancelled
+            "total": sum(counts.values()),
+            "pending": counts.get(OrderStatus.PENDING.value, 0),
+            "in_progress": counts.get(OrderStatus.IN_PROGRESS.value, 0),
+            "completed": counts.get(OrderStatus.COMPLETED.value, 0),
+            "cancelled": counts.get(OrderStatus.CANCELLED.value, 0)
         }
 
     def get_with_details(self, db: Session, id: int) -> Optional[RepairOrder]:
@@ -183,44 +234,69 @@ class CRUDRepairOrder(CRUDBase[RepairOrder, RepairOrderCreate, RepairOrderUpdate
 
     def get_by_user_with_details(self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100) -> List[RepairOrder]:
         """获取用户的维修订单（包含车辆和工人详情）"""
+        return self.query_by_user_with_details(db, user_id=user_id).offset(skip).limit(limit).all()
+
+    def query_by_user_with_details(self, db: Session, *, user_id: int) -> Query:
+        """用户维修订单查询（包含车辆和工人详情），按创建时间倒序"""
         return db.query(RepairOrder).options(
             joinedload(RepairOrder.vehicle),
             joinedload(RepairOrder.user),
             selectinload(RepairOrder.assigned_workers).selectinload(RepairOrderWorker.worker)
         ).filter(
             and_(RepairOrder.user_id == user_id, RepairOrder.is_deleted == False)
-        ).order_by(RepairOrder.create_time.desc()).offset(skip).limit(limit).all()
+        ).order_by(RepairOrder.create_time.desc())
+
+    def select_by_user_with_details(self, *, user_id: int) -> Select:
+        """query_by_user_with_details 对应的语句（异步会话使用）"""
+        return select(RepairOrder).options(
+            joinedload(RepairOrder.vehicle),
+            joinedload(RepairOrder.user),
+            selectinload(RepairOrder.assigned_workers).selectinload(RepairOrderWorker.worker)
+        ).filter(
+            and_(RepairOrder.user_id == user_id, RepairOrder.is_deleted == False)
+        ).order_by(RepairOrder.create_time.desc())
 
     def get_by_worker_with_details(self, db: Session, *, worker_id: int, skip: int = 0, limit: int = 100) -> (List[RepairOrder], int):
         """获取分配给维修工人的维修订单（包含详细信息）"""
-        query = db.query(RepairOrder).join(
+        query = self.query_by_worker_with_details(db, worker_id=worker_id)
+        total = self.count_query(query)
+        orders = query.offset(skip).limit(limit).all()
+        return orders, total
+
+    def query_by_worker_with_details(self, db: Session, *, worker_id: int) -> Query:
+        """分配给维修工人的维修订单查询（包含详细信息），按创建时间倒序"""
+        return db.query(RepairOrder).join(
             RepairOrder.assigned_workers
+        ).options(
+            joinedload(RepairOrder.vehicle),
+            joinedload(RepairOrder.user)
         ).filter(
             RepairOrderWorker.worker_id == worker_id,
             RepairOrder.is_deleted == False
-        )
-        total = query.count()
-        orders = query.options(
+        ).order_by(RepairOrder.create_time.desc())
+
+    def select_by_worker_with_details(self, *, worker_id: int) -> Select:
+        """query_by_worker_with_details 对应的语句（异步会话使用，同样预加载工人信息）"""
+        return select(RepairOrder).join(
+            RepairOrder.assigned_workers
+        ).options(
             joinedload(RepairOrder.vehicle),
-            joinedload(RepairOrder.user)
-        ).order_by(RepairOrder.create_time.desc()).offset(skip).limit(limit).all()
-        return orders, total
+            joinedload(RepairOrder.user),
+            selectinload(RepairOrder.assigned_workers).selectinload(RepairOrderWorker.worker)
+        ).filter(
+            RepairOrderWorker.worker_id == worker_id,
+            RepairOrder.is_deleted == False
+        ).order_by(RepairOrder.create_time.desc())
 
     def count_by_status(self, db: Session, *, status: OrderStatus) -> int:
         """根据状态计算订单数量"""
-        return db.query(RepairOrder).filter(
-            and_(
-                RepairOrder.status == status,
-                RepairOrder.is_deleted == False
-            )
-        ).count()
+        return self.count_query(
+            self.query_active(db).filter(RepairOrder.status == status)
+        )
 
     def get_multi_with_details(self, db: Session, *, skip: int = 0, limit: int = 100) -> List[RepairOrder]:
         """获取多个维修订单（包含详细信息）"""
-        return db.query(RepairOrder).options(
-            joinedload(RepairOrder.vehicle),
-            joinedload(RepairOrder.user)
-        ).filter(RepairOrder.is_deleted == False).offset(skip).limit(limit).all()
+        return self.query_with_details(db).offset(skip).limit(limit).all()
 
     def accept_order(self, db: Session, *, order_id: int, worker_id: int) -> Optional[RepairOrder]:
         """维修工接受订单"""
@@ -242,6 +318,7 @@ class CRUDRepairOrder(CRUDBase[RepairOrder, RepairOrderCreate, RepairOrderUpdate
             hourly_rate=worker.hourly_rate  # 记录当前的小时费率
         )
         db.add(assignment)
+        analytics_rollup_crud.apply_assignment(db, skill_type=worker.skill_type, delta=1)
 
         order.status = OrderStatus.IN_PROGRESS
 
@@ -268,6 +345,7 @@ class CRUDRepairOrder(CRUDBase[RepairOrder, RepairOrderCreate, RepairOrderUpdate
             raise ValueError("订单不存在")
 
         # 删除分配记录
+        analytics_rollup_crud.apply_assignment(db, skill_type=assignment.worker.skill_type, delta=-1)
         db.delete(assignment)
         db.flush()  # 先执行删除，以便后续查询能看到变化
 
@@ -334,6 +412,7 @@ class CRUDRepairOrder(CRUDBase[RepairOrder, RepairOrderCreate, RepairOrderUpdate
         total_labor_cost = hourly_rate * Decimal(str(completion_data.work_hours))
 
         # 4. 更新订单主信息
+        rollup_before = analytics_rollup_crud.order_snapshot(order)
         order.status = OrderStatus.COMPLETED
         order.actual_completion_time = datetime.utcnow()
         order.total_material_cost = total_material_cost
@@ -342,6 +421,7 @@ class CRUDRepairOrder(CRUDBase[RepairOrder, RepairOrderCreate, RepairOrderUpdate
         order.internal_notes = (order.internal_notes or "") + "\n[工作描述] " + (completion_data.work_description or "无")
 
         db.add(order)
+        analytics_rollup_crud.apply_order_change(db, rollup_before, analytics_rollup_crud.order_snapshot(order))
 
         # 发放工时费
         self.distribute_wages(db, order, work_hours=Decimal(str(completion_data.work_hours)))
@@ -392,14 +472,24 @@ class CRUDRepairOrder(CRUDBase[RepairOrder, RepairOrderCreate, RepairOrderUpdate
 
     def get_revenue_by_month(self, db: Session, year: int, month: int) -> Decimal:
         """根据年月计算总收入"""
-        total_revenue = db.query(func.sum(RepairOrder.total_cost)).filter(
+        total_revenue = db.execute(self._revenue_by_month_select(year, month)).scalar()
+        return total_revenue or Decimal(0)
+
+    async def get_revenue_by_month_async(self, db: AsyncSession, year: int, month: int) -> Decimal:
+        total_revenue = await db.scalar(self._revenue_by_month_select(year, month))
+        return total_revenue or Decimal(0)
+
+    def _revenue_by_month_select(self, year: int, month: int) -> Select:
+        return select(func.sum(RepairOrder.total_cost)).filter(
             and_(
                 func.extract('year', RepairOrder.actual_completion_time) == year,
                 func.extract('month', RepairOrder.actual_completion_time) == month,
                 RepairOrder.status == OrderStatus.COMPLETED
             )
-        ).scalar()
-        return total_revenue or Decimal(0)
+        )
+
 
+repair_order_crud = CRUDRepairOrder(RepairOrder)
 
-repair_order_crud = CRUDRepairOrder(RepairOrder) 
\ No newline at end of file
+# 写入提交后使分析缓存失效
+invalidate_on_write(RepairOrder, RepairOrderWorker, RepairMaterial, RepairOrderService)
@@ -1,16 +1,19 @@
-from typing import Optional, List
-from sqlalchemy.orm import Session
+from typing import Optional, List, Dict
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import and_
-from passlib.context import CryptContext
 from app.crud.base import CRUDBase
+from app.core.cache import invalidate_on_write, principal_cache
+from app.core.password_pool import password_pool
 from app.models.repair_worker import RepairWorker, SkillType, WorkerStatus
 from app.schemas.repair_worker import RepairWorkerCreate, RepairWorkerUpdate
-
-# 密码加密上下文
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.service.password_service import password_service
 
 
 class CRUDRepairWorker(CRUDBase[RepairWorker, RepairWorkerCreate, RepairWorkerUpdate]):
+    password_hash_field = "hashed_password"
+
     def get_by_employee_id(self, db: Session, *, employee_id: str) -> Optional[RepairWorker]:
         """根据员工编号获取维修工人"""
         return db.query(RepairWorker).filter(
@@ -19,13 +22,17 @@ class CRUDRepairWorker(CRUDBase[RepairWorker, RepairWorkerCreate, RepairWorkerUp
 
     def get_by_skill_type(self, db: Session, *, skill_type: SkillType, skip: int = 0, limit: int = 100) -> List[RepairWorker]:
         """根据技能类型获取维修工人列表"""
+        return self.query_by_skill_type(db, skill_type=skill_type).offset(skip).limit(limit).all()
+
+    def query_by_skill_type(self, db: Session, *, skill_type: SkillType) -> Query:
+        """按技能类型过滤在职维修工人的查询"""
         return db.query(RepairWorker).filter(
             and_(
                 RepairWorker.skill_type == skill_type.value,
                 RepairWorker.status == WorkerStatus.ACTIVE,
                 RepairWorker.is_deleted == False
             )
-        ).offset(skip).limit(limit).all()
+        )
 
     def get_available_workers(self, db: Session) -> List[RepairWorker]:
         """获取可用的维修工人"""
@@ -36,6 +43,20 @@ class CRUDRepairWorker(CRUDBase[RepairWorker, RepairWorkerCreate, RepairWorkerUp
             )
         ).all()
 
+    def count_available(self, db: Session) -> int:
+        """统计可用（在职）的维修工人数量"""
+        return self.status_counts(db).get(WorkerStatus.ACTIVE.value, 0)
+
+    async def count_available_async(self, db: AsyncSession) -> int:
+        return (await self.status_counts_async(db)).get(WorkerStatus.ACTIVE.value, 0)
+
+    def get_skill_distribution(self, db: Session) -> Dict[str, int]:
+        """按技能类型统计在职维修工人数量（单次 GROUP BY），未出现的技能计为 0"""
+        counts = self.status_counts(
+            db, column=RepairWorker.skill_type, filters=[RepairWorker.status == WorkerStatus.ACTIVE]
+        )
+        return {skill_type.value: counts.get(skill_type.value, 0) for skill_type in SkillType}
+
     def is_active(self, worker: RepairWorker) -> bool:
         """检查维修工人是否活跃"""
         return worker.status == WorkerStatus.ACTIVE
@@ -49,6 +70,18 @@ class CRUDRepairWorker(CRUDBase[RepairWorker, RepairWorkerCreate, RepairWorkerUp
             return None
         return worker
 
+    async def authenticate_async(self, db: Session, *, employee_id: str, password: str) -> Optional[RepairWorker]:
+        """维修工人认证（密码校验在专用线程池中执行，不阻塞事件循环）"""
+        worker = await run_in_threadpool(self.get_by_employee_id, db, employee_id=employee_id)
+        if not worker:
+            return None
+        verified, new_hash = await password_pool.verify_and_update(password, worker.hashed_password)
+        if not verified:
+            return None
+        if new_hash:
+            await run_in_threadpool(self.upgrade_password_hash, db, db_obj=worker, new_hash=new_hash)
+        return worker
+
     def create(self, db: Session, *, obj_in: RepairWorkerCreate) -> RepairWorker:
         """创建维修工人"""
         # 加密密码
@@ -76,11 +109,15 @@ class CRUDRepairWorker(CRUDBase[RepairWorker, RepairWorkerCreate, RepairWorkerUp
 
     def get_password_hash(self, password: str) -> str:
         """生成密码哈希"""
-        return pwd_context.hash(password)
+        return password_service.hash(password)
 
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """验证密码"""
-        return pwd_context.verify(plain_password, hashed_password)
+        return password_service.verify(plain_password, hashed_password)
+
 
+repair_worker_crud = CRUDRepairWorker(RepairWorker)
 
-repair_worker_crud = CRUDRepairWorker(RepairWorker)
\ No newline at end of file
+# 写入提交后使分析缓存和认证主体缓存失效
+invalidate_on_write(RepairWorker)
+principal_cache.register("worker", RepairWorker)
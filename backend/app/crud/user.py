@@ -1,14 +1,19 @@
 from typing import Optional
 from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import and_
 from app.crud.base import CRUDBase
-from app.models.user import User
+from app.core.cache import principal_cache
+from app.models.user import User, UserStatus
 from app.schemas.user import UserCreate, UserUpdate
 from app.core.security import get_password_hash, verify_password
+from app.core.password_pool import password_pool
 from app.config.logging import get_crud_logger, log_database_operation, log_security_event
 
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
+    password_hash_field = "password_hash"
+
     def __init__(self, model):
         super().__init__(model)
         self.logger = get_crud_logger()
@@ -101,10 +106,38 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         log_security_event("登录成功", f"用户登录 - 用户ID: {user.id}", user.id)
         return user
 
+    async def authenticate_async(self, db: Session, *, username: str, password: str) -> Optional[User]:
+        """用户认证（密码校验在专用线程池中执行，不阻塞事件循环）"""
+        self.logger.info(f"用户认证尝试 - 用户名: {username}")
+        
+        user = await run_in_threadpool(self.get_by_username, db, username=username)
+        if not user:
+            self.logger.warning(f"认证失败 - 用户不存在: {username}")
+            log_security_event("登录失败", f"用户不存在 - 用户名: {username}")
+            return None
+        
+        verified, new_hash = await password_pool.verify_and_update(password, user.password_hash)
+        if not verified:
+            self.logger.warning(f"认证失败 - 密码错误: {username}")
+            log_security_event("登录失败", f"密码错误 - 用户ID: {user.id}, 用户名: {username}", user.id)
+            return None
+        
+        if new_hash:
+            self.logger.info(f"按当前哈希参数升级密码哈希 - 用户ID: {user.id}")
+            await run_in_threadpool(self.upgrade_password_hash, db, db_obj=user, new_hash=new_hash)
+        
+        self.logger.info(f"用户认证成功 - 用户ID: {user.id}, 用户名: {username}")
+        log_security_event("登录成功", f"用户登录 - 用户ID: {user.id}", user.id)
+        return user
+
     def is_active(self, user: User) -> bool:
         """检查用户是否活跃"""
         return user.status == "active"
 
+    def count_active(self, db: Session) -> int:
+        """统计活跃用户数量"""
+        return self.count_query(self.query_active(db).filter(User.status == UserStatus.ACTIVE))
+
     def update_password(self, db: Session, *, user: User, new_password: str) -> User:
         """更新用户密码"""
         self.logger.info(f"更新用户密码 - 用户ID: {user.id}")
@@ -202,4 +235,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         return user
 
 
-user_crud = CRUDUser(User) 
\ No newline at end of file
+user_crud = CRUDUser(User)
+
+# 写入提交后使认证主体缓存失效
+principal_cache.register("user", User)
@@ -1,5 +1,5 @@
 from typing import Optional, List, Dict, Any
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session, Query, joinedload
 from sqlalchemy import and_, func
 from app.crud.base import CRUDBase
 from app.models.vehicle import Vehicle
@@ -7,6 +7,9 @@ from app.schemas.vehicle import VehicleCreate, VehicleUpdate
 
 
 class CRUDVehicle(CRUDBase[Vehicle, VehicleCreate, VehicleUpdate]):
+    keyset_columns = (Vehicle.id,)
+    keyset_descending = True
+
     def get_by_license_plate(self, db: Session, *, license_plate: str) -> Optional[Vehicle]:
         """根据车牌号获取车辆"""
         return db.query(Vehicle).filter(
@@ -38,9 +41,15 @@ class CRUDVehicle(CRUDBase[Vehicle, VehicleCreate, VehicleUpdate]):
 
     def get_multi(self, db: Session, *, skip: int = 0, limit: int = 100) -> List[Vehicle]:
         """获取多个车辆，并预加载车主信息"""
+        return self.query_with_owner(db).offset(skip).limit(limit).all()
+
+    def query_with_owner(self, db: Session) -> Query:
+        """车辆列表查询（预加载车主信息），按ID倒序"""
         return db.query(self.model).options(
             joinedload(self.model.owner)
-        ).order_by(self.model.id.desc()).offset(skip).limit(limit).all()
+        ).filter(
+            self.model.is_deleted == False
+        ).order_by(self.model.id.desc())
 
     def create(self, db: Session, *, obj_in: Dict[str, Any]) -> Vehicle:
         """创建车辆"""
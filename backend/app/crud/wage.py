@@ -1,29 +1,29 @@
-from typing import Optional, List, Dict, Any
-from sqlalchemy.orm import Session, joinedload
+from typing import Optional, List
+from sqlalchemy.orm import Query, Session, joinedload
 from sqlalchemy import and_, or_
 from decimal import Decimal
 
 from app.crud.base import CRUDBase
+from app.core.cache import invalidate_on_write
 from app.models.wage import Wage, WageStatus
 from app.models.repair_worker import RepairWorker
 from app.schemas.wage import WageCreate, WageUpdate
 
 
 class CRUDWage(CRUDBase[Wage, WageCreate, WageUpdate]):
-    def get_multi_with_filter(
+    keyset_columns = (Wage.period, Wage.id)
+    keyset_descending = True
+
+    def query_with_filter(
         self,
         db: Session,
         *,
-        skip: int = 0,
-        limit: int = 100,
         keyword: Optional[str] = None,
         status: Optional[WageStatus] = None,
         month: Optional[str] = None,
         min_amount: Optional[Decimal] = None,
-    ) -> Dict[str, Any]:
-        """
-        获取带筛选和分页的工资列表
-        """
+    ) -> Query:
+        """工资列表查询（预加载工人），可按工人姓名/工号关键词、状态、月份和最低金额过滤"""
         query = db.query(self.model).options(joinedload(self.model.worker))
 
         filters = []
@@ -31,7 +31,7 @@ class CRUDWage(CRUDBase[Wage, WageCreate, WageUpdate]):
             filters.append(
                 or_(
                     RepairWorker.name.ilike(f"%{keyword}%"),
-                    RepairWorker.worker_id.ilike(f"%{keyword}%")
+                    RepairWorker.employee_id.ilike(f"%{keyword}%")
                 )
             )
         if status:
@@ -43,11 +43,7 @@ class CRUDWage(CRUDBase[Wage, WageCreate, WageUpdate]):
 
         if filters:
             query = query.join(RepairWorker).filter(and_(*filters))
-
-        total = query.count()
-        wages = query.order_by(self.model.period.desc(), self.model.id.desc()).offset(skip).limit(limit).all()
-        
-        return {"total": total, "wages": wages}
+        return query
 
     def get_by_worker(
         self, db: Session, *, worker_id: int, start_date: Optional[str] = None, end_date: Optional[str] = None
@@ -77,4 +73,7 @@ class CRUDWage(CRUDBase[Wage, WageCreate, WageUpdate]):
         ).first()
 
 
-wage_crud = CRUDWage(Wage) 
\ No newline at end of file
+wage_crud = CRUDWage(Wage)
+
+# 写入提交后使分析缓存失效
+invalidate_on_write(Wage)
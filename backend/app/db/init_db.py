@@ -1,7 +1,7 @@
 """
 数据库初始化脚本
 """
-from sqlalchemy import text, create_engine
+from sqlalchemy import text, create_engine, inspect
 from sqlalchemy.exc import OperationalError, ProgrammingError
 import pymysql
 from app.config.database import engine, SessionLocal
@@ -17,6 +17,7 @@ from app.config.settings import settings
 from app.config.logging import get_database_logger
 from app.core.security import get_password_hash
 from app.db.init_data import init_materials
+from app.crud.analytics_rollup import analytics_rollup_crud
 
 logger = get_database_logger()
 
@@ -230,6 +231,70 @@ def add_missing_repair_order_columns():
         db.close()
 
 
+def add_missing_token_version_columns():
+    """为用户、管理员、维修工人表添加令牌版本字段"""
+    db = SessionLocal()
+    try:
+        for table_name in ("users", "admins", "repair_workers"):
+            if not check_table_exists(table_name):
+                continue
+            if check_column_exists(table_name, "token_version"):
+                continue
+            logger.info(f"正在为 {table_name} 表添加 token_version 字段...")
+            db.execute(text(
+                f"ALTER TABLE {table_name} ADD COLUMN token_version INT NOT NULL DEFAULT 0 COMMENT '令牌版本'"
+            ))
+            db.commit()
+            logger.info(f"{table_name}.token_version 字段添加成功")
+    except Exception as e:
+        logger.error(f"添加 token_version 字段失败: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def create_missing_indexes():
+    """为已存在的表补建模型中声明但数据库中缺失的索引"""
+    try:
+        inspector = inspect(engine)
+        existing_tables = set(inspector.get_table_names())
+        created = 0
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_indexes = {ix["name"] for ix in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing_indexes:
+                    continue
+                logger.info(f"正在为 {table.name} 表创建索引 {index.name}...")
+                index.create(bind=engine)
+                created += 1
+        if created:
+            logger.info(f"索引补建完成，共创建 {created} 个索引")
+        else:
+            logger.info("所有声明的索引均已存在，跳过创建")
+    except Exception as e:
+        logger.error(f"创建索引失败: {str(e)}")
+        raise
+
+
+def init_analytics_rollups():
+    """分析汇总表为空时从业务表回填（首次部署或新建汇总表后）"""
+    db = SessionLocal()
+    try:
+        if analytics_rollup_crud.is_empty(db):
+            logger.info("分析汇总表为空，正在从历史订单回填...")
+            analytics_rollup_crud.rebuild(db)
+        else:
+            logger.info("分析汇总表已存在，跳过回填")
+    except Exception as e:
+        logger.error(f"回填分析汇总表失败: {str(e)}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
 def create_default_super_admin():
     """创建默认超级管理员账号"""
     db = SessionLocal()
@@ -314,6 +379,9 @@ def init_database():
         add_username_column()
         update_phone_column()
         add_missing_repair_order_columns()
+        add_missing_token_version_columns()
+        create_missing_indexes()
+        init_analytics_rollups()
 
         # 4. 初始化基础数据
         db = SessionLocal()
@@ -353,6 +421,9 @@ def init_database_on_startup():
         add_username_column()
         update_phone_column()
         add_missing_repair_order_columns()
+        add_missing_token_version_columns()
+        create_missing_indexes()
+        init_analytics_rollups()
         
         # 创建默认超级管理员
         create_default_super_admin()
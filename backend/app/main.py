@@ -1,19 +1,22 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi.openapi.docs import get_swagger_ui_html
 from starlette.middleware.cors import CORSMiddleware
 # from fastapi.templating import Jinja2Templates
 
 from app.api.v1.api import api_router
-from app.core.middleware import (
-    ProcessTimeMiddleware, LoggingMiddleware, SecurityHeadersMiddleware, RateLimitMiddleware
-)
+from app.core.middleware import RequestPipelineMiddleware, default_stages
 from app.core.exceptions import setup_exception_handlers
 from app.config.settings import settings
 from app.config.logging import setup_logging, get_logger
 from app.db.init_db import init_database_on_startup
+from app.core.password_pool import password_pool
+from app.core.metrics import metrics
+from app.config.database import dispose_async_engine
+from app.core.log_index import log_indexer
+from app.core.log_stream import log_stream_hub
 
 # 初始化日志系统
 setup_logging()
@@ -32,16 +35,7 @@ app = FastAPI(
 logger.info("正在启动车辆维修管理系统...")
 
 # 中间件配置（注意顺序很重要）
-# 1. 安全头中间件
-app.add_middleware(SecurityHeadersMiddleware)
-
-# 2. 速率限制中间件
-app.add_middleware(RateLimitMiddleware, max_requests=100, window_seconds=60)
-
-# 3. 日志中间件
-app.add_middleware(LoggingMiddleware, debug_mode=True)
-
-# 4. CORS中间件
+# 1. CORS中间件
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # 生产环境应该限制具体域名
@@ -50,8 +44,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 5. 处理时间中间件
-app.add_middleware(ProcessTimeMiddleware)
+# 2. 请求处理管道：处理时间、访问日志、速率限制、安全头（含CSP）在同一个纯ASGI中间件中完成
+app.add_middleware(RequestPipelineMiddleware, stages=default_stages())
 
 # 静态文件
 app.mount("/static", StaticFiles(directory="../static"), name="static")
@@ -75,12 +69,24 @@ async def root():
 async def health_check():
     return {"status": "healthy", "message": "Vehicle Repair Management System is running"}
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics_endpoint():
+        """Prometheus 指标（多进程部署时汇总所有进程）"""
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.on_event("startup")
 async def startup_event():
     """应用启动事件"""
     logger.info("=" * 60)
     logger.info("车辆维修管理系统启动中...")
     logger.info("=" * 60)
+
+    # 多进程部署时定期写出本进程的指标快照
+    metrics.start()
+
+    # 后台增量索引访问/安全/错误日志（/logs/query）
+    log_indexer.start()
     
     # 初始化数据库
     logger.info("开始数据库初始化检查...")
@@ -101,19 +107,15 @@ async def startup_event():
     logger.info(f"🔍 健康检查: http://localhost:8000/health")
     logger.info("=" * 60)
 
-@app.middleware("http")
-async def add_csp_header(request, call_next):
-    response = await call_next(request)
-    # 允许 swagger ui 的 css 加载
-    response.headers["Content-Security-Policy"] = (
-        "default-src 'self'; style-src 'self' https://cdn.jsdelivr.net; script-src 'self' https://cdn.jsdelivr.net 'unsafe-inline'; img-src 'self' https://fastapi.tiangolo.com data:"
-    )
-    return response
-
 @app.on_event("shutdown")
 async def shutdown_event():
     """应用关闭事件"""
     logger.info("车辆维修管理系统正在关闭...")
+    password_pool.shutdown()
+    await dispose_async_engine()
+    metrics.stop()
+    log_indexer.stop()
+    log_stream_hub.close()
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,6 +1,6 @@
 from sqlalchemy import Column, Integer, String, Enum, DateTime, JSON
 from sqlalchemy.orm import relationship
-from app.models.base import BaseModel
+from app.models.base import BaseModel, TokenVersionMixin
 import enum
 
 
@@ -17,8 +17,9 @@ class AdminStatus(str, enum.Enum):
     LOCKED = "locked"
 
 
-class Admin(BaseModel):
+class Admin(TokenVersionMixin, BaseModel):
     __tablename__ = "admins"
+    token_revoking_fields = ("password_hash", "status", "role", "permissions", "is_deleted")
 
     username = Column(String(50), unique=True, nullable=False, index=True, comment="用户名")
     name = Column(String(100), nullable=False, comment="姓名")
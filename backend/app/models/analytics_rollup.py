@@ -0,0 +1,50 @@
+from sqlalchemy import Column, Integer, String, Enum, DECIMAL, UniqueConstraint
+from app.models.base import BaseModel
+import enum
+
+
+class RollupGranularity(str, enum.Enum):
+    DAY = "day"
+    MONTH = "month"
+
+
+class AnalyticsCostRollup(BaseModel):
+    """已完成订单费用汇总（按日 / 按月）"""
+    __tablename__ = "analytics_cost_rollups"
+    __table_args__ = (
+        UniqueConstraint("granularity", "period", name="uq_analytics_cost_rollups_granularity_period"),
+    )
+
+    granularity = Column(Enum(RollupGranularity), nullable=False, comment="汇总粒度")
+    period = Column(String(10), nullable=False, comment="汇总周期(YYYY-MM-DD / YYYY-MM)")
+    order_count = Column(Integer, nullable=False, default=0, comment="完成订单数")
+    labor_cost = Column(DECIMAL(14, 2), nullable=False, default=0, comment="人工费合计")
+    material_cost = Column(DECIMAL(14, 2), nullable=False, default=0, comment="材料费合计")
+    service_cost = Column(DECIMAL(14, 2), nullable=False, default=0, comment="服务费合计")
+    total_cost = Column(DECIMAL(14, 2), nullable=False, default=0, comment="总费用合计")
+
+    def __repr__(self):
+        return f"<AnalyticsCostRollup(granularity='{self.granularity}', period='{self.period}', total_cost={self.total_cost})>"
+
+
+class AnalyticsVehicleModelRollup(BaseModel):
+    """已完成订单按车型汇总"""
+    __tablename__ = "analytics_vehicle_model_rollups"
+
+    model = Column(String(100), unique=True, nullable=False, comment="车型")
+    repair_count = Column(Integer, nullable=False, default=0, comment="维修次数")
+    total_cost = Column(DECIMAL(14, 2), nullable=False, default=0, comment="维修总费用")
+
+    def __repr__(self):
+        return f"<AnalyticsVehicleModelRollup(model='{self.model}', repair_count={self.repair_count})>"
+
+
+class AnalyticsSkillTaskRollup(BaseModel):
+    """工单分配按工人技能类型汇总"""
+    __tablename__ = "analytics_skill_task_rollups"
+
+    skill_type = Column(String(50), unique=True, nullable=False, comment="技能类型")
+    task_count = Column(Integer, nullable=False, default=0, comment="任务数")
+
+    def __repr__(self):
+        return f"<AnalyticsSkillTaskRollup(skill_type='{self.skill_type}', task_count={self.task_count})>"
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, DateTime, Boolean
+from typing import Tuple
+from sqlalchemy import Column, Integer, DateTime, Boolean, event, inspect
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -23,4 +24,20 @@ class BaseModel(Base):
         """转换为字典"""
         return {c.name: getattr(self, c.name) for c in self.__table__.columns}
 
-    
\ No newline at end of file
+
+class TokenVersionMixin:
+    """
+    令牌版本：签发的访问令牌携带该版本号，版本号变化后旧令牌全部失效。
+    token_revoking_fields 中的字段（密码、状态、角色等）更新时自动递增。
+    """
+    token_revoking_fields: Tuple[str, ...] = ()
+
+    token_version = Column(Integer, default=0, server_default="0", nullable=False, comment="令牌版本")
+
+
+@event.listens_for(TokenVersionMixin, "before_update", propagate=True)
+def _bump_token_version(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in target.token_revoking_fields):
+        target.token_version = (target.token_version or 0) + 1
+
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Text, Enum, DateTime, ForeignKey, String
+from sqlalchemy import Column, Integer, Text, Enum, DateTime, ForeignKey, String, Index
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 import enum
@@ -22,6 +22,14 @@ class FeedbackStatus(str, enum.Enum):
 
 class Feedback(BaseModel):
     __tablename__ = "feedback"
+    __table_args__ = (
+        Index("ix_feedback_deleted_status_created", "is_deleted", "status", "created_at"),
+        Index("ix_feedback_deleted_type_created", "is_deleted", "feedback_type", "created_at"),
+        Index("ix_feedback_user_deleted_created", "user_id", "is_deleted", "created_at"),
+        Index("ix_feedback_order", "order_id"),
+        # 差评案例分析
+        Index("ix_feedback_rating", "rating"),
+    )
 
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, comment="用户ID")
     order_id = Column(Integer, ForeignKey("repair_orders.id"), nullable=True, comment="相关订单ID（可选）")
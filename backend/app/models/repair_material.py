@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, DECIMAL, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, DECIMAL, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 
 
 class RepairMaterial(BaseModel):
     __tablename__ = "repair_materials"
+    __table_args__ = (
+        Index("ix_repair_materials_order", "order_id"),
+    )
 
     order_id = Column(Integer, ForeignKey("repair_orders.id"), nullable=False, comment="订单ID")
     material_id = Column(Integer, ForeignKey("materials.id"), nullable=False, comment="材料ID")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Enum, DECIMAL, DateTime, ForeignKey, Table, Boolean
+from sqlalchemy import Column, Integer, String, Text, Enum, DECIMAL, DateTime, ForeignKey, Table, Boolean, Index
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 import enum
@@ -21,6 +21,17 @@ class OrderPriority(str, enum.Enum):
 
 class RepairOrder(BaseModel):
     __tablename__ = "repair_orders"
+    __table_args__ = (
+        # 管理员列表 / 按状态筛选，按 (create_time, id) 游标分页
+        Index("ix_repair_orders_deleted_status_ctime", "is_deleted", "status", "create_time"),
+        Index("ix_repair_orders_deleted_ctime", "is_deleted", "create_time"),
+        # 我的订单
+        Index("ix_repair_orders_user_deleted_ctime", "user_id", "is_deleted", "create_time"),
+        # 车辆维修记录
+        Index("ix_repair_orders_vehicle_deleted", "vehicle_id", "is_deleted"),
+        # 月度收入 / 费用趋势
+        Index("ix_repair_orders_status_completion", "status", "actual_completion_time"),
+    )
 
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, comment="用户ID")
     vehicle_id = Column(Integer, ForeignKey("vehicles.id"), nullable=False, comment="车辆ID")
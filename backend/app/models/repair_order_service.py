@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DECIMAL, Enum, ForeignKey, Text
+from sqlalchemy import Column, Integer, DECIMAL, Enum, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 import enum
@@ -12,6 +12,9 @@ class ServiceStatus(str, enum.Enum):
 
 class RepairOrderService(BaseModel):
     __tablename__ = "repair_order_services"
+    __table_args__ = (
+        Index("ix_repair_order_services_order", "order_id"),
+    )
 
     order_id = Column(Integer, ForeignKey("repair_orders.id"), nullable=False, comment="订单ID")
     service_id = Column(Integer, ForeignKey("services.id"), nullable=False, comment="服务ID")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DECIMAL, Enum, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, DECIMAL, Enum, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 import enum
@@ -12,6 +12,12 @@ class WorkerAssignmentStatus(str, enum.Enum):
 
 class RepairOrderWorker(BaseModel):
     __tablename__ = "repair_order_workers"
+    __table_args__ = (
+        # 订单分配记录查找（接单 / 退单 / 完成）
+        Index("ix_repair_order_workers_order_worker", "order_id", "worker_id"),
+        # 工人的订单列表
+        Index("ix_repair_order_workers_worker_order", "worker_id", "order_id"),
+    )
 
     order_id = Column(Integer, ForeignKey("repair_orders.id"), nullable=False, comment="订单ID")
     worker_id = Column(Integer, ForeignKey("repair_workers.id"), nullable=False, comment="工人ID")
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, Enum, Date, DECIMAL, Text
+from sqlalchemy import Column, Integer, String, Enum, Date, DECIMAL, Text, Index
 from sqlalchemy.orm import relationship
-from app.models.base import BaseModel
+from app.models.base import BaseModel, TokenVersionMixin
 import enum
 
 
@@ -28,8 +28,13 @@ class WorkerStatus(str, enum.Enum):
     ON_LEAVE = "on_leave"
 
 
-class RepairWorker(BaseModel):
+class RepairWorker(TokenVersionMixin, BaseModel):
     __tablename__ = "repair_workers"
+    __table_args__ = (
+        # 可用工人 / 按技能类型筛选
+        Index("ix_repair_workers_deleted_status_skill", "is_deleted", "status", "skill_type"),
+    )
+    token_revoking_fields = ("hashed_password", "status", "is_deleted")
 
     employee_id = Column(String(20), unique=True, nullable=False, index=True, comment="员工编号")
     name = Column(String(100), nullable=False, comment="姓名")
@@ -1,6 +1,6 @@
 from sqlalchemy import Column, Integer, String, Enum, DateTime
 from sqlalchemy.orm import relationship
-from app.models.base import BaseModel
+from app.models.base import BaseModel, TokenVersionMixin
 import enum
 
 
@@ -10,8 +10,9 @@ class UserStatus(str, enum.Enum):
     SUSPENDED = "suspended"
 
 
-class User(BaseModel):
+class User(TokenVersionMixin, BaseModel):
     __tablename__ = "users"
+    token_revoking_fields = ("password_hash", "status", "is_deleted")
 
     name = Column(String(100), nullable=False, comment="用户姓名")
     username = Column(String(50), unique=True, nullable=False, index=True, comment="用户名")
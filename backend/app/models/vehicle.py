@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Enum, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 import enum
@@ -12,6 +12,9 @@ class VehicleStatus(str, enum.Enum):
 
 class Vehicle(BaseModel):
     __tablename__ = "vehicles"
+    __table_args__ = (
+        Index("ix_vehicles_user_deleted", "user_id", "is_deleted"),
+    )
 
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, comment="车主ID")
     license_plate = Column(String(20), unique=True, nullable=False, index=True, comment="车牌号")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DECIMAL, Enum, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, DECIMAL, Enum, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 import enum
@@ -13,6 +13,12 @@ class WageStatus(str, enum.Enum):
 
 class Wage(BaseModel):
     __tablename__ = "wages"
+    __table_args__ = (
+        # 工人当月工资单查找、工人工资历史
+        Index("ix_wages_worker_period", "worker_id", "period"),
+        # 工资列表按 (period, id) 排序分页
+        Index("ix_wages_period", "period"),
+    )
 
     worker_id = Column(Integer, ForeignKey("repair_workers.id"), nullable=False, comment="工人ID")
     period = Column(String(7), nullable=False, comment="工资周期(YYYY-MM)")
@@ -18,6 +18,8 @@ class BaseResponse(BaseSchema):
 class PaginationParams(BaseSchema):
     page: int = 1
     size: int = 20
+    # 游标分页：传入上一页返回的 next_cursor 时按游标取下一页，忽略 page
+    cursor: Optional[str] = None
     
     def get_offset(self) -> int:
         return (self.page - 1) * self.size
@@ -25,20 +27,23 @@ class PaginationParams(BaseSchema):
 
 class PaginatedResponse(BaseSchema, Generic[T]):
     items: List[T]
-    total: int
+    # 游标分页不统计总数，total/pages 为 None
+    total: Optional[int] = None
     page: int
     size: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None
     
     @classmethod
-    def create(cls, items: List[T], total: int, page: int, size: int):
-        pages = (total + size - 1) // size
+    def create(cls, items: List[T], total: Optional[int], page: int, size: int, next_cursor: Optional[str] = None):
+        pages = (total + size - 1) // size if total is not None else None
         return cls(
             items=items,
             total=total,
             page=page,
             size=size,
-            pages=pages
+            pages=pages,
+            next_cursor=next_cursor
         )
 
 
@@ -66,6 +66,9 @@ class TokenData(BaseSchema):
 
 class TokenPayload(BaseSchema):
     """JWT 载荷"""
-    sub: Optional[int] = Field(None, description="主题（用户ID）")
+    sub: int = Field(..., description="主题（主体ID）")
     exp: Optional[int] = Field(None, description="过期时间")
-    user_type: Optional[str] = Field(default="user", description="用户类型")
\ No newline at end of file
+    typ: str = Field(..., description="主体类型（user/admin/worker）")
+    role: Optional[str] = Field(None, description="管理员角色")
+    perm: int = Field(default=0, description="管理员权限位图")
+    ver: int = Field(default=0, description="令牌版本")
@@ -1,15 +1,13 @@
 from datetime import datetime, timedelta
 from typing import Any, Union, Optional
 from jose import jwt
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 
 from app.config.settings import settings
 from app.models.user import User
 from app.models.admin import Admin
 from app.models.repair_worker import RepairWorker
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.service.password_service import password_service
 
 
 class AuthService:
@@ -29,11 +27,11 @@ class AuthService:
 
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
-        return pwd_context.verify(plain_password, hashed_password)
+        return password_service.verify(plain_password, hashed_password)
 
     @staticmethod
     def get_password_hash(password: str) -> str:
-        return pwd_context.hash(password)
+        return password_service.hash(password)
 
     @staticmethod
     def authenticate_user(
@@ -0,0 +1,42 @@
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+
+from app.config.settings import settings
+
+
+class PasswordService:
+    """
+    统一的密码哈希服务。
+    bcrypt 成本因子由 BCRYPT_ROUNDS 配置；成本因子与配置不一致的已有哈希
+    会被 needs_update 标记，在下次登录成功时用新参数重新哈希。
+    """
+
+    def __init__(self, rounds: int):
+        self.rounds = rounds
+        # 最小/最大轮数与默认值一致：调高或调低配置后，旧哈希都会在登录时升级
+        self.context = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__default_rounds=rounds,
+            bcrypt__min_rounds=rounds,
+            bcrypt__max_rounds=rounds,
+        )
+
+    def hash(self, password: str) -> str:
+        """生成密码哈希"""
+        return self.context.hash(password)
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """验证密码"""
+        return self.context.verify(plain_password, hashed_password)
+
+    def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """验证密码，哈希参数过期时同时返回按当前参数生成的新哈希"""
+        return self.context.verify_and_update(plain_password, hashed_password)
+
+    def needs_update(self, hashed_password: str) -> bool:
+        """哈希是否需要按当前参数重新生成"""
+        return self.context.needs_update(hashed_password)
+
+
+password_service = PasswordService(settings.BCRYPT_ROUNDS)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+同步/异步数据库访问并发基准测试
+对同一个订单列表查询（我的订单，预加载车辆、用户和工人）分别提供：
+  sync  - def 接口 + Session，在 Starlette 线程池（默认 40 个线程）中执行
+  async - async def 接口 + AsyncSession，等待数据库时让出事件循环
+每个请求先执行一次模拟网络/数据库延迟的语句（MySQL: SLEEP，SQLite: 注册的 sleep 函数），
+再分页取订单。两种路径使用各自的连接池，大小相同（--pool），
+并发数超过线程池大小时，同步路径的吞吐受线程数限制，异步路径只受连接池限制。
+使用当前配置的数据库（DATABASE_URL，异步驱动见 ASYNC_DATABASE_URL），只执行查询。
+使用方法: python benchmark_async_db.py [--requests 400] [--concurrency 50 100 200] [--latency-ms 20]
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from pathlib import Path
+from typing import Any, Dict, List
+
+# 添加项目根目录到Python路径
+sys.path.append(str(Path(__file__).parent))
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config.settings import settings
+from app.config.database import async_database_url
+from app.crud.repair_order import repair_order_crud
+from app.schemas.base import PaginatedResponse, PaginationParams
+from app.schemas.repair_order import RepairOrderDetail
+
+
+def latency_statement(dialect: str):
+    if dialect == "mysql":
+        return text("SELECT SLEEP(:seconds)")
+    if dialect == "postgresql":
+        return text("SELECT pg_sleep(:seconds)")
+    return text("SELECT sleep(:seconds)")
+
+
+def register_sqlite_sleep(sync_engine) -> None:
+    """SQLite 没有 SLEEP，注册一个在数据库连接所在线程中休眠的函数"""
+    if sync_engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def _sleep_function(dbapi_connection, connection_record):
+        dbapi_connection.create_function("sleep", 1, time.sleep)
+
+
+def build_app(pool: int, user_id: int, latency_seconds: float):
+    options = {"pool_size": pool, "max_overflow": 0, "pool_timeout": 60}
+    sync_engine = create_engine(settings.DATABASE_URL, **options)
+    async_engine = create_async_engine(async_database_url(), **options)
+    register_sqlite_sleep(sync_engine)
+    register_sqlite_sleep(async_engine.sync_engine)
+    latency = latency_statement(sync_engine.dialect.name)
+    SyncSession = sessionmaker(bind=sync_engine, autoflush=False)
+    AsyncSessionFactory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    def get_sync_db():
+        db = SyncSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with AsyncSessionFactory() as db:
+            yield db
+
+    app = FastAPI()
+
+    @app.get("/sync", response_model=PaginatedResponse[RepairOrderDetail])
+    def sync_orders(db: Session = Depends(get_sync_db), pagination: PaginationParams = Depends()) -> Any:
+        db.execute(latency, {"seconds": latency_seconds})
+        query = repair_order_crud.query_by_user_with_details(db, user_id=user_id)
+        return repair_order_crud.paginate(query, pagination)
+
+    @app.get("/async", response_model=PaginatedResponse[RepairOrderDetail])
+    async def async_orders(db: AsyncSession = Depends(get_async_db), pagination: PaginationParams = Depends()) -> Any:
+        await db.execute(latency, {"seconds": latency_seconds})
+        statement = repair_order_crud.select_by_user_with_details(user_id=user_id)
+        return await repair_order_crud.paginate_async(db, statement, pagination)
+
+    return app, sync_engine, async_engine
+
+
+async def run(client: httpx.AsyncClient, path: str, count: int, concurrency: int) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    durations: List[float] = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(path, params={"size": 20})
+            durations.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} 返回 {response.status_code}: {response.text[:200]}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(count)))
+    elapsed = time.perf_counter() - started
+    durations.sort()
+    return {
+        "throughput": count / elapsed,
+        "p50": durations[len(durations) // 2],
+        "p99": durations[max(0, int(len(durations) * 0.99) - 1)],
+        "mean": statistics.fmean(durations),
+    }
+
+
+async def main_async(args) -> None:
+    app, sync_engine, async_engine = build_app(args.pool, args.user_id, args.latency_ms / 1000)
+    transport = httpx.ASGITransport(app=app)
+    results = []
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            # 预热（建立连接、编译语句）
+            for path in ("/sync", "/async"):
+                await run(client, path, min(args.pool, 50), min(args.pool, 50))
+            for concurrency in args.concurrency:
+                for mode in ("sync", "async"):
+                    results.append((concurrency, mode, await run(client, f"/{mode}", args.requests, concurrency)))
+    finally:
+        await async_engine.dispose()
+        sync_engine.dispose()
+
+    print("=" * 72)
+    print(f"同步/异步数据库访问基准测试  数据库: {sync_engine.dialect.name}  "
+          f"每请求模拟延迟: {args.latency_ms} ms  连接池: {args.pool}")
+    print(f"请求数: {args.requests}/组  Starlette 线程池: 40 个线程（默认）")
+    print("=" * 72)
+    print(f"{'并发':>6} {'路径':<6} {'吞吐(req/s)':>12} {'平均(ms)':>10} {'p50(ms)':>10} {'p99(ms)':>10}")
+    print("-" * 72)
+    for concurrency, mode, stats in results:
+        print(f"{concurrency:>6} {mode:<6} {stats['throughput']:>12.1f} {stats['mean']:>10.1f} "
+              f"{stats['p50']:>10.1f} {stats['p99']:>10.1f}")
+    print("=" * 72)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="同步/异步数据库访问并发基准测试")
+    parser.add_argument("--requests", type=int, default=400, help="每组请求数 (默认: 400)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[20, 100, 200], help="并发数 (默认: 20 100 200)")
+    parser.add_argument("--latency-ms", type=float, default=20, help="每个请求模拟的数据库延迟毫秒数 (默认: 20)")
+    parser.add_argument("--pool", type=int, default=200, help="两种路径各自的连接池大小 (默认: 200)")
+    parser.add_argument("--user-id", type=int, default=1, help="查询的用户ID (默认: 1)")
+    args = parser.parse_args()
+    if not async_database_url():
+        parser.error(f"数据库 {settings.DATABASE_URL} 没有对应的异步驱动，请配置 ASYNC_DATABASE_URL")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
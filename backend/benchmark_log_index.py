@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+日志索引基准测试工具
+按访问日志格式生成当前文件和 .1-.N 轮转文件（默认 10 个轮转文件，每个 10 MB），比较：
+  scan  - 逐个文件从末尾向前扫描（app.core.log_reader，/logs/content 的方式）
+  index - app.core.log_index 的磁盘索引（/logs/query 的方式）
+场景：按请求ID查找一条、按IP取最新 100 条、按状态码取最新 100 条、路径前缀 + 时间范围、只按时间范围。
+同时输出首次建立索引和追加写入后增量同步的耗时，以及索引库的大小。
+使用方法: python benchmark_log_index.py [--rotations 10] [--file-mb 10] [--keep]
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import tempfile
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, List
+
+# 添加项目根目录到Python路径
+sys.path.append(str(Path(__file__).parent))
+
+from app.core import log_reader
+from app.core.log_index import LogIndex
+
+LIMIT = 100
+START = datetime(2026, 1, 1)
+PATHS = (
+    "/api/v1/repair-orders/my-orders",
+    "/api/v1/repair-orders/available",
+    "/api/v1/analytics/dashboard",
+    "/api/v1/users/me",
+    "/api/v1/vehicles/",
+)
+
+
+def access_line(n: int) -> str:
+    """第 n 条访问日志（每秒一条）"""
+    return json.dumps({
+        "timestamp": (START + timedelta(seconds=n)).strftime("%Y-%m-%d %H:%M:%S"),
+        "level": "INFO",
+        "logger": "app.access",
+        "message": "请求完成",
+        "request_id": str(uuid.UUID(int=n)),
+        "method": "GET",
+        "path": PATHS[n % len(PATHS)],
+        "client_ip": f"10.{n % 4}.{n % 250}.{n % 97}",
+        "status_code": 500 if n % 1000 == 0 else 200,
+        "process_time": 0.012,
+        "db_queries": n % 9,
+    }, ensure_ascii=False) + "\n"
+
+
+def generate(directory: Path, rotations: int, file_mb: int) -> int:
+    """生成 access.log.N ... access.log，返回总条数"""
+    n = 0
+    target = file_mb * 1024 * 1024
+    names = [f"access.log.{i}" for i in range(rotations, 0, -1)] + ["access.log"]
+    for name in names:
+        written = 0
+        with open(directory / name, "w", encoding="utf-8") as f:
+            while written < target:
+                block = "".join(access_line(n + i) for i in range(2000))
+                f.write(block)
+                written += len(block.encode("utf-8"))
+                n += 2000
+    return n
+
+
+def scan(directory: Path, rotations: int, matcher, limit: int) -> List[str]:
+    """从当前文件开始依次向前扫描各个文件，找够 limit 条即停止"""
+    results: List[str] = []
+    names = ["access.log"] + [f"access.log.{i}" for i in range(1, rotations + 1)]
+    for name in names:
+        found = log_reader.search_lines(directory / name, matcher, limit - len(results))
+        results = found + results
+        if len(results) >= limit:
+            break
+    return results
+
+
+def timed(func: Callable[[], int], rounds: int):
+    best = float("inf")
+    count = 0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        count = func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日志索引基准测试")
+    parser.add_argument("--rotations", type=int, default=10, help="轮转文件数 (默认: 10)")
+    parser.add_argument("--file-mb", type=int, default=10, help="每个文件的大小 MB (默认: 10)")
+    parser.add_argument("--rounds", type=int, default=3, help="每项重复次数，取最短耗时 (默认: 3)")
+    parser.add_argument("--dir", default=None, help="生成文件的目录 (默认: 临时目录)")
+    parser.add_argument("--keep", action="store_true", help="保留生成的文件")
+    args = parser.parse_args()
+
+    directory = Path(args.dir or tempfile.mkdtemp(prefix="log-index-bench-"))
+    directory.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    total = generate(directory, args.rotations, args.file_mb)
+    size_mb = sum(p.stat().st_size for p in directory.glob("access.log*")) / 1024 / 1024
+    print(f"生成 {args.rotations + 1} 个文件，共 {size_mb:.0f} MB、{total} 条，{time.perf_counter() - started:.1f} 秒")
+
+    index = LogIndex("access.log", directory, directory / ".index", args.rotations)
+    started = time.perf_counter()
+    index.sync()
+    build_seconds = time.perf_counter() - started
+    index_mb = sum(p.stat().st_size for p in (directory / ".index").iterdir()) / 1024 / 1024
+
+    with open(directory / "access.log", "a", encoding="utf-8") as f:
+        for i in range(1000):
+            f.write(access_line(total + i))
+    total += 1000
+    started = time.perf_counter()
+    index.sync()
+    append_ms = (time.perf_counter() - started) * 1000
+
+    old_id = str(uuid.UUID(int=total // 20))
+    old_ip = "10.1.33.7"
+    window_start = START + timedelta(seconds=total // 2)
+    window_end = window_start + timedelta(minutes=10)
+    scenarios = [
+        # 名称, 扫描使用的关键词, 索引查询条件
+        ("request_id", f'"request_id": "{old_id}"', {"request_id": old_id}),
+        ("ip", f'"client_ip": "{old_ip}"', {"ip": old_ip}),
+        ("status=500", '"status_code": 500', {"status": 500}),
+        ("path+time", None, {"path": "/api/v1/analytics", "start": window_start, "end": window_end}),
+        ("time range", None, {"start": window_start, "end": window_end}),
+    ]
+
+    print("=" * 76)
+    print(f"日志索引基准测试  每项最多返回 {LIMIT} 条，耗时取 {args.rounds} 次中的最短")
+    print(f"首次建立索引: {build_seconds:.1f} 秒  索引库: {index_mb:.0f} MB  追加 1000 条后增量同步: {append_ms:.1f} ms")
+    print("=" * 76)
+    print(f"{'场景':<12} {'扫描(ms)':>12} {'索引(ms)':>12} {'条数':>6} {'加速':>10}")
+    print("-" * 76)
+    for name, keyword, conditions in scenarios:
+        index_ms, index_count = timed(lambda: index.query(limit=LIMIT, **conditions)["count"], args.rounds)
+        if keyword is None:
+            # 扫描方式无法按时间范围过滤
+            print(f"{name:<12} {'-':>12} {index_ms:>12.2f} {index_count:>6}")
+            continue
+        matcher = log_reader.compile_matcher(keyword)
+        scan_ms, scan_count = timed(lambda: len(scan(directory, args.rotations, matcher, LIMIT)), 1)
+        if scan_count != index_count:
+            raise RuntimeError(f"{name}: 结果条数不一致 scan={scan_count} index={index_count}")
+        print(f"{name:<12} {scan_ms:>12.1f} {index_ms:>12.2f} {index_count:>6} {scan_ms / index_ms:>9.0f}x")
+    print("=" * 76)
+
+    if args.keep:
+        print(f"测试文件保留在 {directory}")
+    else:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+日志读取基准测试工具
+生成合成访问日志，比较 /logs 接口旧的读取方式（readlines() 读入整个文件后过滤）
+与 app.core.log_reader（从末尾按块向前读取、找够即停止）的耗时和内存峰值：
+  tail        - 最后 100 行
+  search-hit  - 搜索常见关键词的最后 100 条（很快找够）
+  search-rare - 搜索只在文件开头出现的关键词（需要扫描整个文件）
+  search-none - 搜索不存在的关键词
+默认在 10 MB（单个日志文件的轮转大小）和 1 GB 两个文件上测试；
+旧方式在 1 GB 文件上需要数倍于文件大小的内存，只在指定 --legacy-all 时执行。
+使用方法: python benchmark_log_reader.py [--sizes-mb 10 1024] [--legacy-all] [--keep]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List, Optional
+
+# 添加项目根目录到Python路径
+sys.path.append(str(Path(__file__).parent))
+
+from app.core import log_reader
+
+LINES = 100
+RARE = "needle-only-at-start"
+MISSING = "keyword-that-never-appears"
+
+
+def legacy_read(path: Path, lines: int, search: Optional[str]) -> List[str]:
+    """旧的 read_log_file 实现"""
+    with open(path, "r", encoding="utf-8") as f:
+        all_lines = f.readlines()
+    if search:
+        filtered_lines = [line for line in all_lines if search.lower() in line.lower()]
+        return filtered_lines[-lines:] if len(filtered_lines) > lines else filtered_lines
+    return all_lines[-lines:] if len(all_lines) > lines else all_lines
+
+
+def generate_log(path: Path, size_mb: int) -> None:
+    """按访问日志的格式生成约 size_mb MB 的文件，开头几行包含 RARE 关键词"""
+    methods = ("GET", "POST", "PUT", "DELETE")
+    paths = ("/api/v1/repair-orders/my-orders", "/api/v1/analytics/dashboard", "/api/v1/users/me", "/health")
+    target = size_mb * 1024 * 1024
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(3):
+            f.write(f"2024-01-01 00:00:0{i} - app.access - WARNING - 请求完成 {{\"note\": \"{RARE}\"}}\n")
+        written = 0
+        block_number = 0
+        while written < target:
+            lines = []
+            for i in range(2000):
+                n = block_number * 2000 + i
+                lines.append(
+                    f"2024-01-01 12:{n // 60 % 60:02d}:{n % 60:02d} - app.access - INFO - 请求完成 "
+                    f"{{\"request_id\": \"{n:012x}\", \"method\": \"{methods[n % 4]}\", \"path\": \"{paths[n % 4]}\", "
+                    f"\"status_code\": {200 if n % 17 else 500}, \"client_ip\": \"10.0.{n % 250}.{n % 200}\", "
+                    f"\"process_time\": 0.0{n % 90:02d}, \"db_queries\": {n % 9}}}\n"
+                )
+            block = "".join(lines)
+            f.write(block)
+            written += len(block.encode("utf-8"))
+            block_number += 1
+
+
+def measure(func: Callable[[], List[str]], rounds: int):
+    """返回 (最短耗时 ms, 内存峰值 MB, 结果行数)；内存峰值单独测一次"""
+    best = float("inf")
+    result: List[str] = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1000, peak / (1024 * 1024), len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日志读取基准测试")
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[10, 1024], help="测试文件大小 MB (默认: 10 1024)")
+    parser.add_argument("--legacy-all", action="store_true", help="在所有文件上执行旧方式（1 GB 需要数 GB 内存）")
+    parser.add_argument("--legacy-max-mb", type=int, default=64, help="不指定 --legacy-all 时旧方式只测不超过该大小的文件 (默认: 64)")
+    parser.add_argument("--rounds", type=int, default=3, help="每项重复次数，取最短耗时 (默认: 3)")
+    parser.add_argument("--dir", default=None, help="生成文件的目录 (默认: 临时目录)")
+    parser.add_argument("--keep", action="store_true", help="保留生成的文件")
+    args = parser.parse_args()
+
+    directory = Path(args.dir or tempfile.mkdtemp(prefix="log-bench-"))
+    directory.mkdir(parents=True, exist_ok=True)
+    scenarios = [
+        ("tail", None),
+        ("search-hit", "status_code\": 500"),
+        ("search-rare", RARE),
+        ("search-none", MISSING),
+    ]
+
+    print("=" * 84)
+    print(f"日志读取基准测试  每项返回 {LINES} 行，耗时取 {args.rounds} 次中的最短")
+    print("=" * 84)
+    print(f"{'文件':>8} {'场景':<12} {'实现':<8} {'耗时(ms)':>12} {'内存峰值(MB)':>14} {'行数':>6} {'加速':>8}")
+    print("-" * 84)
+    for size_mb in args.sizes_mb:
+        path = directory / f"synthetic-{size_mb}mb.log"
+        if not path.exists():
+            started = time.perf_counter()
+            generate_log(path, size_mb)
+            print(f"生成 {path.name}: {os.path.getsize(path) / 1024 / 1024:.0f} MB，"
+                  f"{time.perf_counter() - started:.1f} 秒")
+        run_legacy = args.legacy_all or size_mb <= args.legacy_max_mb
+        rounds = args.rounds if size_mb <= args.legacy_max_mb else 1
+        for name, search in scenarios:
+            new_ms, new_mb, new_count = measure(lambda: log_reader.read_lines(path, LINES, search), args.rounds)
+            speedup = ""
+            if run_legacy:
+                old_ms, old_mb, old_count = measure(lambda: legacy_read(path, LINES, search), rounds)
+                if old_count != new_count:
+                    raise RuntimeError(f"{name}: 结果行数不一致 {old_count} != {new_count}")
+                print(f"{size_mb:>6}MB {name:<12} {'legacy':<8} {old_ms:>12.1f} {old_mb:>14.1f} {old_count:>6}")
+                speedup = f"{old_ms / new_ms:>7.1f}x"
+            print(f"{size_mb:>6}MB {name:<12} {'reader':<8} {new_ms:>12.1f} {new_mb:>14.2f} {new_count:>6} {speedup:>8}")
+        if not run_legacy:
+            print(f"{size_mb:>6}MB 旧方式已跳过（需要数倍于文件大小的内存，使用 --legacy-all 执行）")
+        print("-" * 84)
+
+    if not args.keep:
+        for size_mb in args.sizes_mb:
+            (directory / f"synthetic-{size_mb}mb.log").unlink(missing_ok=True)
+        if not args.dir:
+            directory.rmdir()
+    else:
+        print(f"测试文件保留在 {directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+中间件开销基准测试工具
+直接以 ASGI 方式调用应用（不经过网络和测试客户端），比较三种配置的单请求耗时：
+  none     - 不加中间件
+  legacy   - 旧结构：每个功能一层 BaseHTTPMiddleware（CSP、两个计时层、日志、限流、安全头）
+  pipeline - 单个纯 ASGI 的 RequestPipelineMiddleware
+legacy 与 pipeline 执行的是同一组阶段代码，差值即多层 BaseHTTPMiddleware 本身的开销。
+使用方法: python benchmark_middleware.py [--requests 5000] [--path /items]
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from pathlib import Path
+from typing import List
+
+# 添加项目根目录到Python路径
+sys.path.append(str(Path(__file__).parent))
+
+from fastapi import FastAPI
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.middleware import (
+    RequestContext, PipelineStage, RequestPipelineMiddleware,
+    ProcessTimeStage, AccessLogStage, RateLimitStage, SecurityHeadersStage,
+)
+from app.core.rate_limit import RateLimiter, RateLimitPolicy
+
+
+class LegacyStageMiddleware(BaseHTTPMiddleware):
+    """把一个管道阶段包装成一层 BaseHTTPMiddleware，模拟旧的中间件结构"""
+
+    def __init__(self, app, stage: PipelineStage):
+        super().__init__(app)
+        self.stage = stage
+
+    async def dispatch(self, request, call_next):
+        stage = self.stage
+        ctx = RequestContext(request.scope, request.receive)
+        response = await stage.on_request(ctx)
+        if response is None:
+            try:
+                response = await call_next(request)
+            except Exception as exc:
+                stage.on_complete(ctx, exc)
+                raise
+        ctx.status_code = response.status_code
+        stage.on_response_start(ctx, response.raw_headers)
+        ctx.response_headers = response.raw_headers
+        if not hasattr(response, "body_iterator"):
+            ctx.response_size = len(response.body)
+            stage.on_complete(ctx, None)
+            return response
+
+        body_iterator = response.body_iterator
+
+        async def tee():
+            async for chunk in body_iterator:
+                ctx.response_size += len(chunk)
+                stage.on_response_body(ctx, chunk)
+                yield chunk
+            stage.on_complete(ctx, None)
+
+        response.body_iterator = tee()
+        return response
+
+
+def build_stages() -> List[PipelineStage]:
+    # 限额设得足够大，测量过程中不触发429（限流本身的开销见 benchmark_rate_limit.py）
+    limiter = RateLimiter([RateLimitPolicy("ip", 10 ** 9, 60)], max_keys=1000)
+    return [
+        ProcessTimeStage(),
+        AccessLogStage(debug_mode=False),
+        RateLimitStage(limiter),
+        SecurityHeadersStage(),
+    ]
+
+
+def build_app(mode: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    @app.get("/items")
+    async def items():
+        return [{"id": i, "name": f"item-{i}", "price": i * 1.5} for i in range(200)]
+
+    if mode == "pipeline":
+        app.add_middleware(RequestPipelineMiddleware, stages=build_stages())
+    elif mode == "legacy":
+        process_time, access_log, rate_limit, security_headers = build_stages()
+        csp = "Content-Security-Policy"
+        csp_only = SecurityHeadersStage({csp: SecurityHeadersStage.DEFAULT_HEADERS[csp]})
+        # 与旧 main.py 相同的添加顺序（后添加的在外层）
+        for stage in (security_headers, rate_limit, access_log, ProcessTimeStage(), process_time, csp_only):
+            app.add_middleware(LegacyStageMiddleware, stage=stage)
+    return app
+
+
+async def run(app, path: str, count: int) -> List[float]:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": b"page=1",
+        "headers": [(b"host", b"bench"), (b"user-agent", b"benchmark"), (b"accept", b"application/json")],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            raise RuntimeError(f"unexpected status {message['status']}")
+
+    # 预热（构建中间件栈、路由缓存）
+    for _ in range(200):
+        await app(dict(scope), receive, send)
+
+    durations = []
+    for _ in range(count):
+        started = time.perf_counter()
+        await app(dict(scope), receive, send)
+        durations.append((time.perf_counter() - started) * 1_000_000)
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="中间件开销基准测试")
+    parser.add_argument("--requests", type=int, default=5000, help="每种配置的请求数 (默认: 5000)")
+    parser.add_argument("--path", default="/ping", choices=["/ping", "/items"], help="测试接口 (默认: /ping)")
+    parser.add_argument("--rounds", type=int, default=3, help="重复轮数，取中位数 (默认: 3)")
+    args = parser.parse_args()
+
+    modes = ["none", "legacy", "pipeline"]
+    apps = {mode: build_app(mode) for mode in modes}
+    results = {mode: [] for mode in modes}
+    loop = asyncio.new_event_loop()
+    for _ in range(args.rounds):
+        # 交替执行，减少机器负载波动的影响
+        for mode in modes:
+            results[mode].append(loop.run_until_complete(run(apps[mode], args.path, args.requests)))
+    loop.close()
+
+    print("=" * 72)
+    print(f"中间件开销基准测试  接口: {args.path}  请求数: {args.requests} x {args.rounds} 轮")
+    print("=" * 72)
+    print(f"{'配置':<10} {'平均(µs)':>10} {'p50(µs)':>10} {'p99(µs)':>10} {'中间件开销(µs)':>16}")
+    print("-" * 72)
+    baseline = None
+    summary = {}
+    for mode in modes:
+        means = [statistics.fmean(d) for d in results[mode]]
+        best = min(range(len(means)), key=lambda i: means[i])
+        durations = sorted(results[mode][best])
+        mean = statistics.median(means)
+        summary[mode] = mean
+        if baseline is None:
+            baseline = mean
+        p50 = durations[len(durations) // 2]
+        p99 = durations[int(len(durations) * 0.99) - 1]
+        overhead = "-" if mode == "none" else f"{mean - baseline:.1f}"
+        print(f"{mode:<10} {mean:>10.1f} {p50:>10.1f} {p99:>10.1f} {overhead:>16}")
+    print("=" * 72)
+    legacy_overhead = summary["legacy"] - baseline
+    pipeline_overhead = summary["pipeline"] - baseline
+    if pipeline_overhead > 0:
+        print(f"管道中间件开销为旧结构的 {pipeline_overhead / legacy_overhead:.1%}，"
+              f"每请求节省 {legacy_overhead - pipeline_overhead:.1f} µs")
+    else:
+        print(f"每请求节省 {legacy_overhead - pipeline_overhead:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
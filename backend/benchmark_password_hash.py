@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+密码哈希参数基准测试工具
+在部署主机上测量不同 bcrypt 成本因子的哈希/校验耗时，
+并模拟集中登录（并发校验经过与 password_pool 相同大小的线程池），
+推荐满足登录 p99 目标的最大 BCRYPT_ROUNDS。
+使用方法: python benchmark_password_hash.py [--rounds 10-14] [--target-p99-ms 300] [--concurrency 16]
+"""
+
+import sys
+import os
+import time
+import math
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+# 添加项目根目录到Python路径
+sys.path.append(str(Path(__file__).parent))
+
+from app.config.settings import settings
+from app.service.password_service import PasswordService
+
+# 低于此成本因子的 bcrypt 不再推荐使用
+MIN_SAFE_ROUNDS = 10
+SAMPLE_PASSWORD = "Benchmark-Passw0rd!"
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """最近秩法百分位数"""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def parse_rounds(value: str) -> List[int]:
+    """解析 "10-14" 或 "10,12,14" 形式的成本因子列表"""
+    if "-" in value:
+        start, end = value.split("-", 1)
+        return list(range(int(start), int(end) + 1))
+    return [int(item) for item in value.split(",")]
+
+
+def measure_sequential(func, samples: int) -> List[float]:
+    durations = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - started) * 1000)
+    return durations
+
+
+def measure_burst(service: PasswordService, hashed: str, workers: int, concurrency: int, bursts: int) -> List[float]:
+    """每轮同时提交 concurrency 个校验任务，记录每个任务从提交到完成的耗时（含排队）"""
+    durations = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for _ in range(bursts):
+            submitted = time.perf_counter()
+            futures = [
+                executor.submit(lambda: (service.verify(SAMPLE_PASSWORD, hashed), time.perf_counter())[1])
+                for _ in range(concurrency)
+            ]
+            durations.extend((future.result() - submitted) * 1000 for future in futures)
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bcrypt 成本因子基准测试")
+    parser.add_argument("--rounds", default="10-13", help="待测成本因子，如 10-14 或 10,12 (默认: 10-13)")
+    parser.add_argument("--samples", type=int, default=10, help="每个成本因子的顺序测量次数 (默认: 10)")
+    parser.add_argument("--target-p99-ms", type=float, default=300.0, help="登录校验 p99 目标，毫秒 (默认: 300)")
+    parser.add_argument("--workers", type=int, default=settings.PASSWORD_POOL_WORKERS,
+                        help=f"密码线程池大小 (默认: PASSWORD_POOL_WORKERS={settings.PASSWORD_POOL_WORKERS})")
+    parser.add_argument("--concurrency", type=int, default=0,
+                        help="模拟同时登录的请求数，0 表示与线程池大小相同 (默认: 0)")
+    parser.add_argument("--bursts", type=int, default=3, help="并发模拟轮数 (默认: 3)")
+    args = parser.parse_args()
+
+    rounds_list = parse_rounds(args.rounds)
+    concurrency = args.concurrency or args.workers
+
+    print("=" * 80)
+    print("bcrypt 成本因子基准测试")
+    print(f"CPU 核数: {os.cpu_count()}, 线程池大小: {args.workers}, 并发登录数: {concurrency}")
+    print(f"当前配置 BCRYPT_ROUNDS={settings.BCRYPT_ROUNDS}, 目标 p99: {args.target_p99_ms:.0f} ms")
+    print("=" * 80)
+    print(f"{'rounds':>6} {'hash p50':>10} {'verify p50':>11} {'verify p99':>11} {'并发 p99':>10}  结果")
+    print("-" * 80)
+
+    recommended = None
+    for rounds in rounds_list:
+        service = PasswordService(rounds)
+        hashed = service.hash(SAMPLE_PASSWORD)
+        hash_times = measure_sequential(lambda: service.hash(SAMPLE_PASSWORD), args.samples)
+        verify_times = measure_sequential(lambda: service.verify(SAMPLE_PASSWORD, hashed), args.samples)
+        burst_times = measure_burst(service, hashed, args.workers, concurrency, args.bursts)
+
+        burst_p99 = percentile(burst_times, 99)
+        meets_target = burst_p99 <= args.target_p99_ms
+        if meets_target and rounds >= MIN_SAFE_ROUNDS:
+            recommended = rounds
+        print(
+            f"{rounds:>6} {percentile(hash_times, 50):>8.1f}ms {percentile(verify_times, 50):>9.1f}ms "
+            f"{percentile(verify_times, 99):>9.1f}ms {burst_p99:>8.1f}ms  {'✅ 达标' if meets_target else '❌ 超出'}"
+        )
+        if not meets_target:
+            # 成本因子每加一耗时翻倍，之后的更不可能达标
+            break
+
+    print("=" * 80)
+    if recommended is None:
+        print(f"❌ 没有不低于 {MIN_SAFE_ROUNDS} 的成本因子满足目标，")
+        print("   请增加 PASSWORD_POOL_WORKERS / CPU，或放宽 p99 目标，不建议降低到 10 以下")
+        sys.exit(1)
+    print(f"✅ 推荐配置: BCRYPT_ROUNDS={recommended}")
+    if recommended != settings.BCRYPT_ROUNDS:
+        print("   修改后已有用户的密码哈希会在下次登录成功时自动升级")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+速率限制压力测试工具
+用大量不同的客户端IP（X-Forwarded-For）请求限流阶段，测量单次检查耗时和计数器内存，
+验证耗时不随跟踪的IP数量增长、内存不超过 RATE_LIMIT_MAX_KEYS 的上限。
+--legacy 同时测量旧的按IP保存时间戳列表的算法作为对照（IP多时很慢）。
+使用方法: python benchmark_rate_limit.py [--ips 1000,10000,100000] [--requests 50000] [--redis-url redis://...]
+"""
+
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tracemalloc
+from pathlib import Path
+from typing import List
+
+# 添加项目根目录到Python路径
+sys.path.append(str(Path(__file__).parent))
+
+from app.config.settings import settings
+from app.core.middleware import RequestContext, RateLimitStage
+from app.core.rate_limit import RateLimiter, RateLimitPolicy
+
+
+def make_scope(ip: str) -> dict:
+    return {
+        "type": "http", "method": "GET", "path": "/api/v1/repair-orders/", "query_string": b"",
+        "headers": [(b"x-forwarded-for", ip.encode())], "client": ("127.0.0.1", 50000),
+    }
+
+
+def make_ips(count: int) -> List[str]:
+    return [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(count)]
+
+
+async def noop_receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def run_stage(stage: RateLimitStage, scopes: List[dict], order: List[int]) -> List[float]:
+    durations = []
+    for index in order:
+        ctx = RequestContext(scopes[index], noop_receive)
+        started = time.perf_counter()
+        response = await stage.on_request(ctx)
+        durations.append((time.perf_counter() - started) * 1_000_000)
+        if response is not None:
+            raise RuntimeError("测试期间不应触发限流，请调大限额")
+    return durations
+
+
+class LegacyLimiter:
+    """旧算法：每个IP保存窗口内的时间戳列表，每次请求清理所有IP的记录"""
+
+    def __init__(self, max_requests: int, window_seconds: int):
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.requests = {}
+
+    def check(self, client_ip: str) -> bool:
+        current_time = time.time()
+        for ip in list(self.requests.keys()):
+            self.requests[ip] = [t for t in self.requests[ip] if current_time - t < self.window_seconds]
+            if not self.requests[ip]:
+                del self.requests[ip]
+        recent = self.requests.setdefault(client_ip, [])
+        if len(recent) >= self.max_requests:
+            return False
+        recent.append(current_time)
+        return True
+
+
+def summarize(durations: List[float]):
+    ordered = sorted(durations)
+    mean = sum(ordered) / len(ordered)
+    return mean, ordered[len(ordered) // 2], ordered[max(0, int(len(ordered) * 0.99) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="速率限制压力测试")
+    parser.add_argument("--ips", default="1000,10000,100000", help="不同客户端IP数量，逗号分隔 (默认: 1000,10000,100000)")
+    parser.add_argument("--requests", type=int, default=50000, help="每组测量的请求数 (默认: 50000)")
+    parser.add_argument("--max-keys", type=int, default=settings.RATE_LIMIT_MAX_KEYS,
+                        help=f"进程内计数器上限 (默认: RATE_LIMIT_MAX_KEYS={settings.RATE_LIMIT_MAX_KEYS})")
+    parser.add_argument("--redis-url", default=None, help="同时测试 Redis 后端")
+    parser.add_argument("--legacy", action="store_true", help="同时测量旧算法（每组只测 200 个请求）")
+    args = parser.parse_args()
+
+    ip_counts = [int(item) for item in args.ips.split(",")]
+    backends = [("memory", None)] + ([("redis", args.redis_url)] if args.redis_url else [])
+    loop = asyncio.new_event_loop()
+
+    print("=" * 88)
+    print(f"速率限制压力测试  每组请求数: {args.requests}  计数器上限: {args.max_keys}")
+    print("=" * 88)
+    print(f"{'后端':<8} {'IP数':>8} {'平均(µs)':>10} {'p50(µs)':>10} {'p99(µs)':>10} {'跟踪键数':>10} {'计数器内存':>12}")
+    print("-" * 88)
+    for backend_name, redis_url in backends:
+        for ip_count in ip_counts:
+            policy = RateLimitPolicy("ip", 10 ** 9, 60)
+            tracemalloc.start()
+            limiter = RateLimiter([policy], max_keys=args.max_keys, redis_url=redis_url)
+            stage = RateLimitStage(limiter)
+            scopes = [make_scope(ip) for ip in make_ips(ip_count)]
+            baseline_memory = tracemalloc.get_traced_memory()[0]
+            # 先让所有IP都被跟踪，再随机请求测量
+            loop.run_until_complete(run_stage(stage, scopes, list(range(ip_count))))
+            counters_memory = tracemalloc.get_traced_memory()[0] - baseline_memory
+            tracemalloc.stop()
+            requests = args.requests if backend_name == "memory" else min(args.requests, 5000)
+            order = [random.randrange(ip_count) for _ in range(requests)]
+            mean, p50, p99 = summarize(loop.run_until_complete(run_stage(stage, scopes, order)))
+            tracked = limiter.backend.size()
+            memory = f"{counters_memory / 1024 / 1024:.1f} MB" if backend_name == "memory" else "-"
+            print(f"{backend_name:<8} {ip_count:>8} {mean:>10.1f} {p50:>10.1f} {p99:>10.1f} "
+                  f"{tracked if tracked is not None else '-':>10} {memory:>12}")
+
+    if args.legacy:
+        for ip_count in ip_counts:
+            legacy = LegacyLimiter(10 ** 9, 60)
+            ips = make_ips(ip_count)
+            for ip in ips:
+                legacy.requests[ip] = [time.time()]
+            durations = []
+            for _ in range(200):
+                ip = random.choice(ips)
+                started = time.perf_counter()
+                legacy.check(ip)
+                durations.append((time.perf_counter() - started) * 1_000_000)
+            mean, p50, p99 = summarize(durations)
+            print(f"{'legacy':<8} {ip_count:>8} {mean:>10.1f} {p50:>10.1f} {p99:>10.1f} {len(legacy.requests):>10} {'-':>12}")
+    loop.close()
+    print("=" * 88)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+可疑请求检测微基准
+对比旧的逐个子串查找（每类一组 Python 循环）与预编译组合正则的单次扫描耗时，
+并列出两者对样例请求的检测结果，检查误报（如单独的引号、"update" 一词）和漏报；
+最后检查预筛后的检测结果与全部规则的组合正则逐条相同（回归样例加随机请求）。
+使用方法: python benchmark_threat_detection.py [--iterations 20000] [--fuzz 20000]
+"""
+
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+from typing import List, Tuple
+from urllib.parse import unquote_plus
+
+# 添加项目根目录到Python路径
+sys.path.append(str(Path(__file__).parent))
+
+from app.core.threat_detection import REQUEST_RULES, CompiledRules, ThreatDetector
+
+# (说明, 路径, 查询参数, User-Agent, 是否应当报警)
+SAMPLES: List[Tuple[str, str, str, str, bool]] = [
+    ("普通列表", "/api/v1/repair-orders/", "skip=0&limit=20", "Mozilla/5.0", False),
+    ("普通详情", "/api/v1/vehicles/123", "", "Mozilla/5.0", False),
+    ("带撇号的姓名", "/api/v1/users/", "search=O'Brien", "Mozilla/5.0", False),
+    ("含 update 的描述", "/api/v1/repair-orders/", "description=software+update+for+ECU", "Mozilla/5.0", False),
+    ("含 select 的单词", "/api/v1/parts/", "q=selected+drop-down+menu", "Mozilla/5.0", False),
+    ("长查询", "/api/v1/analytics/dashboard", "&".join(f"p{i}=value{i}" for i in range(30)), "Mozilla/5.0", False),
+    ("union select", "/api/v1/users/", "id=1+UNION+SELECT+password+FROM+users", "Mozilla/5.0", True),
+    ("引号恒真", "/api/v1/users/", "name=%27%20or%201%3D1--", "Mozilla/5.0", True),
+    ("堆叠查询", "/api/v1/users/", "id=1;drop table users", "Mozilla/5.0", True),
+    ("XSS", "/api/v1/search", "q=<script>alert(1)</script>", "Mozilla/5.0", True),
+    ("路径遍历", "/static/../../etc/passwd", "", "Mozilla/5.0", True),
+    ("扫描器", "/api/v1/users/", "", "sqlmap/1.7", True),
+]
+
+# 只由安全字符组成、但仍应被规则命中的请求（没有必需字符的规则），以及边界情况
+EQUIVALENCE_SAMPLES: List[Tuple[str, str]] = [
+    ("/api/v1/users", "q=union-select"),
+    ("/api/v1/users", "q=union/select"),
+    ("/api/v1/users", "q=UNION/**/SELECT"),
+    ("/api/v1/users", "onerror=1"),
+    ("/api/v1/users", "x=onload=alert"),
+    ("/api/v1/users", "q=onclick%3D1"),
+    ("/api/v1/users", "q=union%E3%80%80select"),
+    ("/api/v1/users", "q=select%1Cfrom%1Cusers"),
+    ("/api/v1/users", "name=张三+union+select"),
+    ("/api/v1/users", "skip=0&limit=20"),
+]
+
+# 随机请求的片段：规则关键词、特殊字符和普通单词
+FUZZ_PIECES = [
+    "union", "all", "select", "from", "drop", "table", "insert", "into", "delete", "update", "set",
+    "or", "and", "like", "sleep", "waitfor", "delay", "script", "javascript", "onerror", "onload",
+    "onmouseover", "onfocus", "onclick", "alert", "prompt", "confirm", "iframe", "document.cookie",
+    "users", "1", "x", " ", "+", "-", "/", "=", "'", '"', ";", "(", ")", "<", ">", ":", ".", "..",
+    "%2f", "%2e", "%5c", "%27", "%20", "%3d", "%e3%80%80", "%1c", "/*", "*/", "--", "#", "张",
+]
+
+
+def reference_scan(rules: CompiledRules, path: str, query_string: str) -> List[Tuple[str, str]]:
+    """全部规则的组合正则（不做预筛），与 ThreatDetector.scan 相同的解码和小写"""
+    target = f"{path}?{unquote_plus(query_string)}" if query_string else path
+    return [(match.rule, match.text) for match in rules.scan(target.lower())]
+
+
+def check_equivalence(detector: ThreatDetector, fuzz: int, seed: int = 0) -> List[Tuple[str, str]]:
+    """返回预筛结果与组合正则不同的请求"""
+    reference = CompiledRules(REQUEST_RULES)
+    rng = random.Random(seed)
+    requests = list(EQUIVALENCE_SAMPLES) + [(path, query) for _, path, query, _, _ in SAMPLES]
+    for _ in range(fuzz):
+        requests.append(("/api/v1/users", "q=" + "".join(rng.choice(FUZZ_PIECES) for _ in range(rng.randint(1, 8)))))
+    mismatches = []
+    for path, query in requests:
+        found = [(match.rule, match.text) for match in detector.scan(path, query)]
+        if found != reference_scan(reference, path, query):
+            mismatches.append((path, query))
+    return mismatches
+
+
+def legacy_detect(path: str, query_string: str, user_agent: str) -> List[str]:
+    """旧实现：每个类别一组子串，逐个在小写的查询参数和路径中查找"""
+    categories = []
+    query_string = query_string.lower()
+    path = path.lower()
+    for pattern in ["'", "union", "select", "drop", "insert", "delete", "update", "--", "/*"]:
+        if pattern in query_string or pattern in path:
+            categories.append("SQL注入尝试")
+            break
+    for pattern in ["<script", "javascript:", "onerror=", "onload=", "alert("]:
+        if pattern in query_string or pattern in path:
+            categories.append("XSS尝试")
+            break
+    if "../" in path or "..%2f" in path or "..%5c" in path:
+        categories.append("路径遍历尝试")
+    if any(agent in user_agent.lower() for agent in ["sqlmap", "nikto", "nmap", "masscan", "nessus"]):
+        categories.append("可疑User-Agent")
+    return categories
+
+
+def measure(func, args, iterations: int, rounds: int = 5) -> float:
+    """取多轮中最快一轮的平均耗时，减少机器负载波动的影响"""
+    best = float("inf")
+    per_round = max(1, iterations // rounds)
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(per_round):
+            func(*args)
+        best = min(best, (time.perf_counter() - started) / per_round)
+    return best * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="可疑请求检测微基准")
+    parser.add_argument("--iterations", type=int, default=20000, help="每个样例的重复次数 (默认: 20000)")
+    parser.add_argument("--fuzz", type=int, default=20000, help="一致性检查的随机请求数 (默认: 20000)")
+    args = parser.parse_args()
+
+    detector = ThreatDetector()
+    print("=" * 100)
+    print(f"可疑请求检测微基准  每个样例重复 {args.iterations} 次")
+    print("=" * 100)
+    print(f"{'样例':<14} {'旧实现(µs)':>10} {'新实现(µs)':>10}  {'应报警':<6} {'旧结果':<16} 新结果")
+    print("-" * 100)
+    legacy_total = detector_total = 0.0
+    legacy_errors = detector_errors = 0
+    for name, path, query, agent, expected in SAMPLES:
+        legacy_time = measure(legacy_detect, (path, query, agent), args.iterations)
+        detector_time = measure(detector.scan, (path, query, agent), args.iterations)
+        legacy_total += legacy_time
+        detector_total += detector_time
+        legacy_result = legacy_detect(path, query, agent)
+        matches = detector.scan(path, query, agent)
+        legacy_errors += bool(legacy_result) != expected
+        detector_errors += bool(matches) != expected
+        found = ", ".join(f"{match.category}:{match.describe()}" for match in matches) or "-"
+        print(f"{name:<14} {legacy_time:>10.2f} {detector_time:>10.2f}  {'是' if expected else '否':<6} "
+              f"{','.join(legacy_result) or '-':<16} {found}")
+    print("-" * 100)
+    print(f"平均耗时: 旧实现 {legacy_total / len(SAMPLES):.2f} µs，新实现 {detector_total / len(SAMPLES):.2f} µs")
+    print(f"判断错误的样例数: 旧实现 {legacy_errors}，新实现 {detector_errors}（共 {len(SAMPLES)} 个）")
+    mismatches = check_equivalence(detector, args.fuzz)
+    total = len(EQUIVALENCE_SAMPLES) + len(SAMPLES) + args.fuzz
+    print(f"与组合正则结果不同的请求: {len(mismatches)}（共 {total} 个）")
+    for path, query in mismatches[:10]:
+        print(f"  {path}?{query}")
+    print("=" * 100)
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
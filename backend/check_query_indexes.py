@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+检查热点CRUD查询是否命中索引
+对每个查询执行 EXPLAIN（MySQL）或 EXPLAIN QUERY PLAN（SQLite），
+若主表出现全表扫描则以非零状态退出
+"""
+
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+
+from app.config.database import engine, SessionLocal
+from app.config.logging import setup_logging, get_logger
+from app.db.init_db import create_tables, create_missing_indexes
+from app.crud.repair_order import repair_order_crud
+from app.crud.repair_worker import repair_worker_crud
+from app.crud.feedback import feedback_crud
+from app.crud.wage import wage_crud
+from app.crud.vehicle import vehicle_crud
+from app.models.repair_order import OrderStatus
+from app.models.repair_worker import SkillType
+from app.models.feedback import FeedbackStatus
+from app.models.wage import Wage
+
+
+def keyset_page(crud, query, size=20):
+    """按CRUD的键集排序取一页，与 CRUDBase.fetch_page 生成的SQL一致"""
+    keyset = crud.get_keyset()
+    ordering = [c.desc() if crud.keyset_descending else c.asc() for c in keyset]
+    return query.order_by(None).order_by(*ordering).limit(size + 1)
+
+
+def hot_queries(db):
+    """(名称, 主表, 查询) 列表"""
+    return [
+        ("管理员订单列表", "repair_orders",
+         keyset_page(repair_order_crud, repair_order_crud.query_with_details(db))),
+        ("按状态筛选订单", "repair_orders",
+         keyset_page(repair_order_crud, repair_order_crud.query_with_details(db, status=OrderStatus.PENDING))),
+        ("我的订单", "repair_orders",
+         keyset_page(repair_order_crud, repair_order_crud.query_by_user_with_details(db, user_id=1))),
+        ("工人订单", "repair_order_workers",
+         keyset_page(repair_order_crud, repair_order_crud.query_by_worker_with_details(db, worker_id=1))),
+        ("按技能筛选工人", "repair_workers",
+         repair_worker_crud.query_by_skill_type(db, skill_type=SkillType.ENGINE)),
+        ("按状态筛选反馈", "feedback",
+         keyset_page(feedback_crud, feedback_crud.query_by_status(db, status=FeedbackStatus.PENDING))),
+        ("工人当月工资单", "wages",
+         db.query(Wage).filter(Wage.worker_id == 1, Wage.period == "2024-01")),
+        ("工资列表", "wages",
+         keyset_page(wage_crud, db.query(Wage))),
+        ("用户车辆", "vehicles",
+         vehicle_crud.query_active(db).filter(vehicle_crud.model.user_id == 1)),
+    ]
+
+
+def explain(db, query):
+    """返回 (执行计划, 编译后的SQL)"""
+    sql = str(query.statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    if engine.dialect.name == "mysql":
+        rows = db.execute(text(f"EXPLAIN {sql}")).mappings().all()
+        plan = [dict(row) for row in rows]
+        return plan, sql
+    rows = db.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    return [row[-1] for row in rows], sql
+
+
+def uses_index(plan, table: str) -> bool:
+    if engine.dialect.name == "mysql":
+        rows = [row for row in plan if row.get("table") == table]
+        return bool(rows) and all(row.get("key") for row in rows)
+    # SQLite: "SCAN <table>" 且不带 USING INDEX 即为全表扫描
+    for detail in plan:
+        if detail.startswith(f"SCAN {table}") and "USING" not in detail:
+            return False
+    return any(table in detail for detail in plan)
+
+
+def check_query_indexes():
+    setup_logging()
+    logger = get_logger()
+
+    logger.info("=" * 50)
+    logger.info("开始检查热点查询的索引使用情况")
+    logger.info("=" * 50)
+
+    create_tables()
+    create_missing_indexes()
+
+    failures = 0
+    db = SessionLocal()
+    try:
+        for name, table, query in hot_queries(db):
+            plan, sql = explain(db, query)
+            if uses_index(plan, table):
+                logger.info(f"✅ {name}: 命中索引")
+            else:
+                failures += 1
+                logger.error(f"❌ {name}: 主表 {table} 未命中索引")
+                logger.error(f"SQL: {sql}")
+                logger.error(f"执行计划: {plan}")
+    finally:
+        db.close()
+
+    logger.info("=" * 50)
+    if failures:
+        logger.error(f"❌ {failures} 个查询未命中索引")
+        sys.exit(1)
+    logger.info("✅ 所有热点查询均命中索引")
+    logger.info("=" * 50)
+
+
+if __name__ == "__main__":
+    check_query_indexes()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+分析汇总表全量重建脚本
+清空 analytics_*_rollups 表并从维修订单、工单分配重新聚合，
+用于历史数据回填或修正手工改库造成的偏差
+"""
+
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.config.database import SessionLocal
+from app.config.logging import setup_logging, get_logger
+from app.db.init_db import create_tables
+from app.crud.analytics_rollup import analytics_rollup_crud
+
+
+def main():
+    """主函数"""
+    # 初始化日志
+    setup_logging()
+    logger = get_logger()
+
+    logger.info("=" * 50)
+    logger.info("开始重建分析汇总表")
+    logger.info("=" * 50)
+
+    db = SessionLocal()
+    try:
+        create_tables()
+        result = analytics_rollup_crud.rebuild(db)
+
+        logger.info("=" * 50)
+        logger.info("分析汇总表重建完成！")
+        logger.info(f"日汇总: {result['daily_periods']} 条, 月汇总: {result['monthly_periods']} 条")
+        logger.info(f"车型: {result['vehicle_models']} 个, 技能类型: {result['skill_types']} 个")
+        logger.info("=" * 50)
+
+    except Exception as e:
+        db.rollback()
+        logger.error("=" * 50)
+        logger.error(f"分析汇总表重建失败: {str(e)}")
+        logger.error("=" * 50)
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()